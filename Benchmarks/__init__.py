@@ -0,0 +1,61 @@
+import asyncio
+import os
+import resource
+import statistics
+import sys
+
+from aiohttp import web
+
+# APIRequest.configure reads these, benchmarks point APIRequest at a local stub once it is running
+os.environ.setdefault("API_URL", "http://127.0.0.1")
+os.environ.setdefault("API_TOKEN", "benchmark")
+
+
+class StubAPI:
+    """A minimal local stand in for the MFC API, answers every request with a small JSON body"""
+
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1"):
+        self.latency = latency
+        self.host = host
+        self.port = None
+        self.calls = 0
+        self._runner = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.json_response({"id": request.query.get("id"), "player_name": "Benchmark", "discord_id": None})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+def percentile(sorted_timings: list[float], fraction: float) -> float:
+    return sorted_timings[max(int(len(sorted_timings) * fraction + 0.5) - 1, 0)]
+
+
+def peak_rss_mb() -> float:
+    """The peak resident set size of this process so far, in MiB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024  # Bytes on macOS, KiB elsewhere
+
+
+def summarize(name: str, timings: list[float], elapsed: float) -> str:
+    timings = sorted(timings)
+    return (f"{name:<28} calls: {len(timings):>6}  mean: {statistics.mean(timings) * 1000:8.3f}ms  "
+            f"p50: {statistics.median(timings) * 1000:8.3f}ms  p95: {percentile(timings, 0.95) * 1000:8.3f}ms  "
+            f"p99: {percentile(timings, 0.99) * 1000:8.3f}ms  throughput: {len(timings) / elapsed:10.1f} req/s")
@@ -0,0 +1,147 @@
+"""
+Measures how commands respond while the API is down, with and without the circuit breaker
+
+A stand-in for the API is up, then stops answering (requests hang until they time out, or with `--outage error` are
+answered with 503s), then comes back. Concurrent clients act like commands the whole time: each checks the API's
+command check, replying "API unavailable" at once if it fails, and otherwise makes a GET. The report gives the
+latency of each phase, how many requests reached the API during the outage and how long after it ended the first
+request succeeded again.
+
+Run from the repository root with: python -m Benchmarks.api_outage
+"""
+import argparse
+import asyncio
+import logging
+import itertools
+import time
+
+from aiohttp import web
+
+import Benchmarks  # noqa: F401, sets the environment the Bot package expects
+from Benchmarks import percentile
+from Bot import APIRequest
+from Bot.API import CircuitBreaker
+
+
+class FlakyAPI:
+    """A local stand-in for the API that can be switched between answering, hanging and failing"""
+
+    def __init__(self):
+        self.mode = "up"
+        self.calls: dict[str, int] = {}
+        self.port = None
+        self._runner = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def handle(self, request: web.Request) -> web.Response:
+        mode = self.mode
+        self.calls[mode] = self.calls.get(mode, 0) + 1
+        if mode == "hang":
+            await asyncio.sleep(3600)
+        if mode == "error":
+            return web.json_response({}, status=503)
+        return web.json_response({"id": request.query.get("id"), "player_name": "Benchmark"})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+async def command(ids: itertools.count) -> str:
+    """What a command guarded by APIRequest.is_available does, returns how it ended"""
+    if not APIRequest.breaker.available():
+        return "unavailable"
+    response = await APIRequest.get(f"/player/stats?id={next(ids)}")  # Not a cached endpoint
+    return "ok" if response.status == 200 else f"status {response.status}"
+
+
+async def client(phase: list[str], results: list[tuple], ids: itertools.count, stop: asyncio.Event,
+                 think_time: float):
+    while not stop.is_set():
+        started_in = phase[0]
+        start = time.perf_counter()
+        outcome = await command(ids)
+        results.append((started_in, time.perf_counter() - start, outcome, time.perf_counter()))
+        await asyncio.sleep(think_time)
+
+
+async def run(breaker: bool, outage: str, clients: int, up: float, down: float, recovery: float,
+              think_time: float) -> tuple[list[tuple], FlakyAPI, float]:
+    api = FlakyAPI()
+    await api.start()
+    APIRequest.configure()
+    APIRequest.api_url = api.url
+    APIRequest.breaker = CircuitBreaker(failure_threshold=5 if breaker else 10 ** 9,
+                                        reset_timeout=APIRequest.breaker.reset_timeout)
+    phase = ["before"]
+    results = []
+    stop = asyncio.Event()
+    ids = itertools.count()
+    tasks = [asyncio.ensure_future(client(phase, results, ids, stop, think_time)) for _ in range(clients)]
+    await asyncio.sleep(up)
+    phase[0], api.mode = "outage", "hang" if outage == "hang" else "error"
+    await asyncio.sleep(down)
+    phase[0], api.mode = "after", "up"
+    recovered_at = time.perf_counter()
+    await asyncio.sleep(recovery)
+    stop.set()
+    await asyncio.gather(*tasks)
+    await APIRequest.close_session()
+    await api.stop()
+    return results, api, recovered_at
+
+
+def main(outage: str, clients: int, up: float, down: float, recovery: float, think_time: float, timeout: float,
+         reset_timeout: float):
+    APIRequest.configure()
+    APIRequest.timeout = timeout
+    print(f"{clients} clients, API up {up}s, then {'hanging' if outage == 'hang' else 'answering 503'} for {down}s, "
+          f"then up {recovery}s. {timeout}s request timeout, {APIRequest.retry.attempts} GET attempts, "
+          f"{reset_timeout}s before a half open probe")
+    for breaker in (False, True):
+        APIRequest.breaker.reset_timeout = reset_timeout
+        results, api, recovered_at = asyncio.run(run(breaker, outage, clients, up, down, recovery, think_time))
+        print(f"{'with' if breaker else 'without'} the circuit breaker: "
+              f"API calls during the outage: {sum(count for mode, count in api.calls.items() if mode != 'up')}")
+        for phase in ("before", "outage", "after"):
+            timings = sorted(latency for started_in, latency, _, _ in results if started_in == phase)
+            outcomes = {}
+            for started_in, _, outcome, _ in results:
+                if started_in == phase:
+                    outcomes[outcome] = outcomes.get(outcome, 0) + 1
+            print(f"  {phase:<7} commands: {len(timings):>5}  p50: {percentile(timings, 0.5) * 1000:8.1f}ms  "
+                  f"p95: {percentile(timings, 0.95) * 1000:8.1f}ms  max: {timings[-1] * 1000:8.1f}ms  "
+                  f"{dict(sorted(outcomes.items()))}")
+        first_success = min((finished for _, _, outcome, finished in results
+                             if outcome == "ok" and finished > recovered_at), default=None)
+        if first_success:
+            print(f"  first success {first_success - recovered_at:.2f}s after the API came back")
+        else:
+            print(f"  no command succeeded after the API came back")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--outage", choices=("hang", "error"), default="hang")
+    parser.add_argument("--clients", type=int, default=20)
+    parser.add_argument("--up", type=float, default=2.0, help="Seconds the API is up before the outage")
+    parser.add_argument("--down", type=float, default=8.0, help="Seconds the outage lasts")
+    parser.add_argument("--recovery", type=float, default=4.0, help="Seconds the API is up after the outage")
+    parser.add_argument("--think-time", type=float, default=0.05, help="Seconds each client waits between commands")
+    parser.add_argument("--timeout", type=float, default=1.0, help="The API request timeout")
+    parser.add_argument("--reset-timeout", type=float, default=2.0, help="Seconds the circuit stays open")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)  # Every failed request during the outage logs a warning
+    main(args.outage, args.clients, args.up, args.down, args.recovery, args.think_time, args.timeout,
+         args.reset_timeout)
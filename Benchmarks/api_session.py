@@ -0,0 +1,72 @@
+"""
+Compares a fresh ClientSession per API call (the old APIRequest behaviour) against the pooled, shared session
+
+Run from the repository root with: python -m Benchmarks.api_session
+"""
+import argparse
+import asyncio
+import time
+
+from aiohttp import ClientSession
+
+from Benchmarks import StubAPI
+from Benchmarks import summarize
+from Bot import APIRequest
+
+
+async def per_call_session(endpoint: str) -> APIRequest.Response:
+    async with ClientSession(headers=APIRequest.headers) as session:
+        async with session.get(APIRequest.api_url + endpoint, ssl=False) as response:
+            return APIRequest.Response(await response.json() or {}, response.status)
+
+
+async def pooled_session(endpoint: str) -> APIRequest.Response:
+    return await APIRequest.get(endpoint)
+
+
+async def sequential(request, calls: int) -> tuple[list[float], float]:
+    timings = []
+    start = time.perf_counter()
+    for call in range(calls):
+        call_start = time.perf_counter()
+        await request(f"/player/id?id={call}")
+        timings.append(time.perf_counter() - call_start)
+    return timings, time.perf_counter() - start
+
+
+async def concurrent(request, calls: int, concurrency: int) -> tuple[list[float], float]:
+    timings = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(call: int):
+        async with semaphore:
+            call_start = time.perf_counter()
+            await request(f"/player/id?id={call}")
+            timings.append(time.perf_counter() - call_start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(timed(call) for call in range(calls)))
+    return timings, time.perf_counter() - start
+
+
+async def main(calls: int, concurrency: int, latency: float):
+    stub = StubAPI(latency=latency)
+    await stub.start()
+    APIRequest.configure()
+    APIRequest.api_url = stub.url
+    try:
+        for name, request in (("per call session", per_call_session), ("pooled session", pooled_session)):
+            print(summarize(f"{name} (sequential)", *await sequential(request, calls)))
+            print(summarize(f"{name} (x{concurrency})", *await concurrent(request, calls, concurrency)))
+    finally:
+        await APIRequest.close_session()
+        await stub.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0, help="Artificial stub latency in seconds")
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.concurrency, args.latency))
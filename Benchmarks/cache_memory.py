@@ -0,0 +1,173 @@
+"""
+Compares the memory discord.py's caches hold under each cache profile for a synthetic guild of tens of thousands
+
+A guild of `--members` members is fed to a discord.py connection state built with each profile in `Bot.Gateway`,
+through the same parsers the gateway events go through: the guild create, the startup member chunks if the profile
+chunks, a stretch of traffic of the event types the profile's intents receive and the member lookups the cogs make.
+The report gives the memory traced while doing so and what was left in the member and message caches.
+
+Run from the repository root with: python -m Benchmarks.cache_memory
+"""
+import argparse
+import asyncio
+import gc
+import random
+import time
+import tracemalloc
+
+from datetime import datetime
+from datetime import timezone
+
+import discord
+
+from discord.member import Member
+
+import Benchmarks  # noqa: F401, sets the environment the Bot package expects
+from Bot.Gateway import cache_profiles
+
+guild_id = 797088210928009246
+
+base_id = 10 ** 17
+
+timestamp = datetime(2021, 6, 1, tzinfo=timezone.utc).isoformat()
+
+
+def user_data(user_id: int) -> dict:
+    return {"id": str(user_id), "username": f"member{user_id % 100000}", "discriminator": f"{user_id % 10000:04}",
+            "avatar": f"{user_id:032x}"}
+
+
+def member_data(user_id: int, role_ids: list[str]) -> dict:
+    return {"user": user_data(user_id), "roles": role_ids, "joined_at": timestamp, "deaf": False, "mute": False,
+            "nick": None}
+
+
+def presence_data(user_id: int, generator: random.Random) -> dict:
+    return {"guild_id": str(guild_id), "user": {"id": str(user_id)},
+            "status": generator.choice(("online", "idle", "dnd")),
+            "client_status": {"desktop": "online"},
+            "activities": [{"name": generator.choice(("Mordhau", "Spotify", "Visual Studio Code")), "type": 0,
+                            "created_at": 1622505600000, "details": "In a match", "state": "Frontline"}]}
+
+
+def message_data(message_id: int, channel_id: int, user_id: int, role_ids: list[str]) -> dict:
+    return {"id": str(message_id), "channel_id": str(channel_id), "guild_id": str(guild_id),
+            "author": user_data(user_id), "member": {k: v for k, v in member_data(user_id, role_ids).items()
+                                                     if k != "user"},
+            "content": "gg, same time next week?", "timestamp": timestamp, "edited_timestamp": None, "tts": False,
+            "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [], "embeds": [],
+            "pinned": False, "type": 0}
+
+
+def guild_data(members: list[dict], presences: list[dict], roles: int, channels: int, member_count: int) -> dict:
+    return {
+        "id": str(guild_id), "name": "Synthetic Guild", "owner_id": str(base_id), "region": "us-east",
+        "afk_timeout": 300, "verification_level": 1, "default_message_notifications": 1, "explicit_content_filter": 0,
+        "features": [], "mfa_level": 0, "premium_tier": 0, "large": True, "member_count": member_count,
+        "emojis": [], "voice_states": [], "members": members, "presences": presences,
+        "roles": [{"id": str(guild_id if role == 0 else base_id + role), "name": f"Team {role}", "color": 0,
+                   "hoist": False, "position": role, "permissions": "0", "managed": False, "mentionable": True}
+                  for role in range(roles)],
+        "channels": [{"id": str(base_id + 10 ** 6 + channel), "type": 0, "name": f"channel-{channel}",
+                      "position": channel, "permission_overwrites": []} for channel in range(channels)]
+    }
+
+
+def run_profile(profile_name: str, members: int, online: float, roles: int, channels: int, events: int,
+                lookups: int, seed: int) -> dict:
+    profile = cache_profiles[profile_name]
+    generator = random.Random(seed)
+    member_ids = [base_id + 10 ** 7 + member for member in range(members)]
+    online_ids = generator.sample(member_ids, int(members * online))
+    channel_ids = [base_id + 10 ** 6 + channel for channel in range(channels)]
+    member_roles = {member_id: [str(base_id + generator.randrange(1, roles))] for member_id in member_ids}
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    loop = asyncio.new_event_loop()
+    client = discord.Client(loop=loop, **profile.options())
+    state = client._connection
+    intents = state._intents
+
+    # Without the presences intent, Discord leaves the online members out of the guild create
+    create_members = [member_data(member_id, member_roles[member_id]) for member_id in online_ids] \
+        if intents.presences else []
+    create_presences = [presence_data(member_id, generator) for member_id in online_ids] if intents.presences else []
+    # What parse_guild_create does, without requesting member chunks from a gateway that is not there
+    guild = state._add_guild_from_data(guild_data(create_members, create_presences, roles, channels, members))
+    del create_members, create_presences
+
+    if profile.chunk_guilds_at_startup:
+        for chunk_start in range(0, members, 1000):
+            for member_id in member_ids[chunk_start:chunk_start + 1000]:
+                guild._add_member(Member(data=member_data(member_id, member_roles[member_id]), guild=guild,
+                                         state=state))
+
+    next_message_id = base_id + 10 ** 9
+    for _ in range(events):
+        kind = generator.random()
+        if kind < 0.6:
+            if intents.presences:
+                state.parse_presence_update(presence_data(generator.choice(online_ids), generator))
+        elif kind < 0.8:
+            if intents.typing:
+                member_id = generator.choice(online_ids)
+                state.parse_typing_start({"channel_id": str(generator.choice(channel_ids)),
+                                          "guild_id": str(guild_id), "user_id": str(member_id),
+                                          "timestamp": 1622505600,
+                                          "member": member_data(member_id, member_roles[member_id])})
+        elif kind < 0.99:
+            if intents.guild_messages:
+                next_message_id += 1
+                member_id = generator.choice(online_ids)
+                state.parse_message_create(message_data(next_message_id, generator.choice(channel_ids), member_id,
+                                                        member_roles[member_id]))
+        elif intents.members:
+            member_id = base_id + 10 ** 8 + generator.randrange(10 ** 6)
+            state.parse_guild_member_add({**member_data(member_id, []), "guild_id": str(guild_id)})
+
+    # The guild index resolves the members a command needs with a member query, which caches them
+    for member_id in generator.sample(member_ids, min(lookups, members)):
+        if guild.get_member(member_id) is None:
+            guild._add_member(Member(data=member_data(member_id, member_roles[member_id]), guild=guild, state=state))
+
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = {
+        "current": current,
+        "peak": peak,
+        "members": len(guild._members),
+        "messages": len(state._messages) if state._messages is not None else 0,
+        "elapsed": elapsed
+    }
+    loop.run_until_complete(client.close())
+    loop.close()
+    return result
+
+
+def main(profiles: list[str], members: list[int], online: float, roles: int, channels: int, events: int,
+         lookups: int):
+    print(f"{online:.0%} of members online, {roles} roles, {channels} channels, {events} gateway events, "
+          f"{lookups} member lookups")
+    for member_count in members:
+        for profile_name in profiles:
+            result = run_profile(profile_name, member_count, online, roles, channels, events, lookups, seed=0)
+            print(f"{member_count:>6} members  {profile_name:<8} held: {result['current'] / 1024 ** 2:8.1f}MiB  "
+                  f"peak: {result['peak'] / 1024 ** 2:8.1f}MiB  cached members: {result['members']:>6}  "
+                  f"cached messages: {result['messages']:>5}  built in {result['elapsed'] * 1000:8.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--profiles", nargs="+", choices=list(cache_profiles), default=list(cache_profiles))
+    parser.add_argument("--members", type=int, nargs="+", default=[10000, 50000])
+    parser.add_argument("--online", type=float, default=0.2, help="Fraction of the members online")
+    parser.add_argument("--roles", type=int, default=200)
+    parser.add_argument("--channels", type=int, default=50)
+    parser.add_argument("--events", type=int, default=20000, help="Gateway events received after startup")
+    parser.add_argument("--lookups", type=int, default=500, help="Members the bot looks up")
+    args = parser.parse_args()
+    main(args.profiles, args.members, args.online, args.roles, args.channels, args.events, args.lookups)
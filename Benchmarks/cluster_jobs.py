@@ -0,0 +1,187 @@
+"""
+Checks that a cluster's singleton jobs never double-post while its workers are killed, restarted and stalled
+
+A cluster coordinator and supervisor run `--workers` worker processes, each scheduling the same singleton job every
+`--interval` seconds. A run posts the worker's index and the leader term it believes it holds to a local stand-in
+for a Discord channel. Every `--chaos-interval` seconds the leader is killed, a follower is killed or the leader is
+stopped (SIGSTOP) for longer than its lease and then resumed.
+
+A double post is two posts less than half an interval apart, a stale post is one made under an older term than a
+post before it. Either makes the script exit with status 1. `--no-election` runs the job on every worker, as it
+would run without cluster mode, to show what the check catches.
+
+Run from the repository root with: python -m Benchmarks.cluster_jobs
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import signal
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+from aiohttp import ClientSession
+from aiohttp import web
+
+import Benchmarks  # noqa: F401, sets the environment the Bot package expects
+from Bot.API import ResponseCache
+from Bot.Cluster import ClusterClient
+from Bot.Cluster import ClusterCoordinator
+from Bot.Cluster import Supervisor
+from Bot.Config.config import Config
+from Bot.Scheduler import Scheduler
+
+
+class Channel:
+    """Records every post in the order it arrives"""
+
+    def __init__(self):
+        self.posts: list[dict] = []
+        self.port = None
+        self._runner = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.posts.append({**await request.json(), "received": time.monotonic()})
+        return web.json_response({})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/post", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+async def run_worker(index: int, socket_path: str, post_url: str, interval: float, singleton: bool):
+    config_path = Path(tempfile.mkdtemp()) / "config.json"
+    client = ClusterClient(index, Path(socket_path), ResponseCache({}, max_bytes=0), Config(config_path))
+    client.reconnect_delay = 0.1
+    scheduler = Scheduler()
+    scheduler.leader = client.is_leader
+    async with ClientSession() as session:
+        async def post():
+            async with session.post(post_url, json={"worker": index, "term": client.term, "pid": os.getpid()}):
+                pass
+
+        client.start()
+        scheduler.every(interval, post, name="team_board", singleton=singleton)
+        await asyncio.Event().wait()
+
+
+async def chaos(coordinator: ClusterCoordinator, duration: float, chaos_interval: float, lease: float,
+                generator: random.Random) -> list[str]:
+    actions = []
+    end = time.monotonic() + duration
+    while (remaining := end - time.monotonic()) > 0:
+        await asyncio.sleep(min(chaos_interval, remaining))
+        if time.monotonic() >= end:
+            break
+        leader = coordinator.workers.get(coordinator.leader) if coordinator.leader is not None else None
+        followers = [worker for index, worker in coordinator.workers.items() if index != coordinator.leader]
+        action = generator.choice(("kill leader", "kill follower", "stall leader"))
+        if action == "kill follower" and followers:
+            worker = generator.choice(followers)
+            os.kill(worker.pid, signal.SIGKILL)
+        elif leader is None:
+            actions.append("no leader to disrupt")
+            continue
+        elif action == "stall leader":
+            os.kill(leader.pid, signal.SIGSTOP)
+            await asyncio.sleep(lease * 2)
+            os.kill(leader.pid, signal.SIGCONT)
+            worker = leader
+        else:
+            os.kill(leader.pid, signal.SIGKILL)
+            worker = leader
+        actions.append(f"{action} (worker {worker.index})")
+    return actions
+
+
+def check(posts: list[dict], interval: float) -> tuple[list[tuple], list[dict]]:
+    double_posts = [(previous, post) for previous, post in zip(posts, posts[1:])
+                    if post["received"] - previous["received"] < interval / 2]
+    stale_posts = []
+    latest_term = 0
+    for post in posts:
+        if post["term"] < latest_term:
+            stale_posts.append(post)
+        latest_term = max(latest_term, post["term"])
+    return double_posts, stale_posts
+
+
+async def run(workers: int, interval: float, lease: float, duration: float, chaos_interval: float, seed: int,
+              election: bool) -> int:
+    channel = Channel()
+    await channel.start()
+    directory = tempfile.mkdtemp()
+    socket_path = os.path.join(directory, "cluster.sock")
+    coordinator = ClusterCoordinator(Path(socket_path), ResponseCache({}, max_bytes=0), lease=lease)
+
+    def command(index: int) -> list[str]:
+        return [sys.executable, "-m", "Benchmarks.cluster_jobs", "--worker", str(index), "--socket", socket_path,
+                "--post-url", f"http://127.0.0.1:{channel.port}/post", "--interval", str(interval),
+                *([] if election else ["--no-election"])]
+
+    supervisor = Supervisor(workers, command, coordinator)
+    supervisor.restart_delay = 0.5
+    await supervisor.start()
+    try:
+        actions = await chaos(coordinator, duration, chaos_interval, lease, random.Random(seed))
+    finally:
+        await supervisor.stop()
+        await channel.stop()
+
+    posts = channel.posts
+    double_posts, stale_posts = check(posts, interval)
+    gaps = sorted(post["received"] - previous["received"] for previous, post in zip(posts, posts[1:]))
+    print(f"{workers} workers, a post due every {interval}s, {lease}s leader lease, {duration}s of chaos")
+    for action in actions:
+        print(f"  {action}")
+    by_worker = {}
+    for post in posts:
+        by_worker[post["worker"]] = by_worker.get(post["worker"], 0) + 1
+    print(f"posts: {len(posts)}  by worker: {dict(sorted(by_worker.items()))}  "
+          f"terms: {len({post['term'] for post in posts})}  elections: {coordinator.elections}  "
+          f"restarts: {supervisor.restarts}")
+    if gaps:
+        print(f"gap between posts min: {gaps[0]:.3f}s  max (longest failover): {gaps[-1]:.3f}s")
+    print(f"double posts: {len(double_posts)}  stale posts: {len(stale_posts)}")
+    for previous, post in double_posts:
+        print(f"  double post: worker {previous['worker']} (term {previous['term']}) and worker {post['worker']} "
+              f"(term {post['term']}) {post['received'] - previous['received']:.3f}s apart")
+    for post in stale_posts:
+        print(f"  stale post: worker {post['worker']} posted under term {post['term']}")
+    if not posts:
+        print("Nothing was posted")
+        return 1
+    return 1 if double_posts or stale_posts else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=3)
+    parser.add_argument("--interval", type=float, default=0.2, help="Seconds between runs of the singleton job")
+    parser.add_argument("--lease", type=float, default=1.0, help="Seconds the leader's lease lasts")
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--chaos-interval", type=float, default=2.5, help="Seconds between disruptions")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-election", action="store_true", help="Run the job on every worker")
+    parser.add_argument("--worker", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--socket", help=argparse.SUPPRESS)
+    parser.add_argument("--post-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    if args.worker is not None:
+        asyncio.run(run_worker(args.worker, args.socket, args.post_url, args.interval, not args.no_election))
+    else:
+        sys.exit(asyncio.run(run(args.workers, args.interval, args.lease, args.duration, args.chaos_interval,
+                                 args.seed, not args.no_election)))
@@ -0,0 +1,185 @@
+"""
+A fake guild, channel and command context standing in for Discord in the benchmarks
+
+Only what the cogs use is implemented. Every call that would reach Discord's REST API waits `latency` seconds and is
+counted on the guild's `calls`.
+"""
+import asyncio
+import itertools
+
+from collections import Counter
+from typing import Optional
+
+snowflakes = itertools.count(900000000)
+
+
+class FakeRole:
+
+    def __init__(self, role_id: int, name: str):
+        self.id = role_id
+        self.name = name
+        self.mention = f"<@&{role_id}>"
+
+
+class FakeUser:
+
+    def __init__(self, user_id: int, name: str, roles: list[FakeRole] = (), bot: bool = False):
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.nick = name
+        self.roles = list(roles)
+        self.bot = bot
+        self.mention = f"<@{user_id}>"
+        self.avatar = f"avatar-{user_id}"
+        self.avatar_url = f"https://cdn.discordapp.com/avatars/{user_id}/{self.avatar}.png"
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class FakeUserIterator:
+
+    def __init__(self, guild: "FakeGuild", users: list[FakeUser]):
+        self.guild = guild
+        self.users = users
+
+    async def flatten(self) -> list[FakeUser]:
+        # Discord returns reaction users 100 per request
+        for _ in range(0, max(len(self.users), 1), 100):
+            await self.guild.rest("reaction users")
+        return self.users
+
+
+class FakeReaction:
+
+    def __init__(self, guild: "FakeGuild", emoji: str, users: list[FakeUser]):
+        self.guild = guild
+        self.emoji = emoji
+        self._users = users
+
+    def users(self) -> FakeUserIterator:
+        return FakeUserIterator(self.guild, self._users)
+
+
+class FakeMessage:
+
+    def __init__(self, channel: "FakeChannel", content: str = None, embed=None, reactions: list = None):
+        self.id = next(snowflakes)
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.embeds = [embed] if embed else []
+        self.reactions: list[FakeReaction] = reactions or []
+
+    async def edit(self, embed=None, **kwargs):
+        await self.guild.rest("edit message")
+        if embed:
+            self.embeds = [embed]
+
+    async def delete(self, **kwargs):
+        await self.guild.rest("delete message")
+        self.channel.messages.pop(self.id, None)
+
+    async def add_reaction(self, emoji):
+        await self.guild.rest("add reaction")
+
+
+class FakeChannel:
+
+    def __init__(self, guild: "FakeGuild", name: str):
+        self.id = next(snowflakes)
+        self.guild = guild
+        self.name = name
+        self.messages: dict[int, FakeMessage] = {}
+
+    def add_message(self, content: str = None, embed=None, reactions: list[FakeReaction] = None) -> FakeMessage:
+        """Puts a message in the channel without a REST call, as if it had been posted before the benchmark"""
+        message = FakeMessage(self, content, embed, reactions)
+        self.messages[message.id] = message
+        return message
+
+    async def send(self, content=None, *, embed=None, file=None, delete_after=None, **kwargs) -> FakeMessage:
+        await self.guild.rest("send message")
+        return self.add_message(content, embed)
+
+    async def fetch_message(self, message_id: int) -> FakeMessage:
+        await self.guild.rest("fetch message")
+        return self.messages[message_id]
+
+    async def purge(self, **kwargs):
+        await self.guild.rest("purge")
+        self.messages.clear()
+
+
+class FakeGuild:
+    """A guild of team roles and members, with `cached_members` of the members held in the member cache"""
+
+    def __init__(self, name: str = "Benchmark Guild", latency: float = 0.0):
+        self.id = next(snowflakes)
+        self.name = name
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self.roles: dict[int, FakeRole] = {}
+        self.members: dict[int, FakeUser] = {}
+        self.cached_members: dict[int, FakeUser] = {}
+        self.channels: dict[int, FakeChannel] = {}
+
+    async def rest(self, route: str):
+        self.calls[route] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def add_channel(self, name: str) -> FakeChannel:
+        channel = FakeChannel(self, name)
+        self.channels[channel.id] = channel
+        return channel
+
+    def get_role(self, role_id: int) -> Optional[FakeRole]:
+        return self.roles.get(role_id)
+
+    def get_member(self, member_id: int) -> Optional[FakeUser]:
+        return self.cached_members.get(member_id)
+
+    def get_channel(self, channel_id: int) -> Optional[FakeChannel]:
+        return self.channels.get(channel_id)
+
+    async def fetch_roles(self) -> list[FakeRole]:
+        await self.rest("fetch roles")
+        return list(self.roles.values())
+
+    async def query_members(self, user_ids: list[int], limit: int = 5, cache: bool = True) -> list[FakeUser]:
+        await self.rest("query members")
+        members = [member for user_id in user_ids if (member := self.members.get(user_id))]
+        if cache:
+            self.cached_members.update((member.id, member) for member in members)
+        return members
+
+
+class FakeCommand:
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class FakeContext:
+    """A command invocation by `author` in `channel`, replies are sent to the channel"""
+
+    def __init__(self, bot, guild: FakeGuild, channel: FakeChannel, author: FakeUser, command: str = ""):
+        self.bot = bot
+        self.guild = guild
+        self.channel = channel
+        self.author = author
+        self.command = FakeCommand(command)
+        self.prefix = "-"
+        self.message = FakeMessage(channel, content=f"-{command}")
+
+    async def send(self, content=None, **kwargs) -> FakeMessage:
+        return await self.channel.send(content, **kwargs)
+
+
+def fake_bot_user(user_id: int = 1) -> FakeUser:
+    return FakeUser(user_id, "MFC Bot", bot=True)
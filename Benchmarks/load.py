@@ -0,0 +1,164 @@
+"""
+Drives the leaderboard, player stats, team list and sign up dump commands under concurrent load
+
+The cogs run unchanged against the mock MFC API and a fake Discord guild. Each virtual user invokes commands in its
+own channel. The report gives p50/p95/p99 latency per command, the API and Discord calls it made, and the peak RSS.
+
+Run from the repository root with: python -m Benchmarks.load
+"""
+import argparse
+import asyncio
+import copy
+import logging
+import random
+import tempfile
+import time
+
+from collections import Counter
+from pathlib import Path
+
+from Benchmarks import peak_rss_mb
+from Benchmarks import summarize
+from Benchmarks.fake_discord import FakeContext
+from Benchmarks.fake_discord import FakeGuild
+from Benchmarks.fake_discord import FakeReaction
+from Benchmarks.fake_discord import FakeRole
+from Benchmarks.fake_discord import FakeUser
+from Benchmarks.fake_discord import fake_bot_user
+from Benchmarks.mock_api import MockMFCAPI
+from Bot import APIRequest
+from Bot import bot
+from Bot import bot_config
+from Bot.Cogs.MFC.match_planning import MatchPlanning
+from Bot.Cogs.MFC.player import Player
+from Bot.Cogs.MFC.team import Team
+from Bot.Stats import MatchStatsStore
+
+scenarios = ("top", "stats", "teams", "dump")
+
+
+def build_guild(api: MockMFCAPI, latency: float, signups: int, seed: int = 0) -> tuple[FakeGuild, list[FakeUser]]:
+    """
+    Builds a guild holding a role per API team, bar every twentieth, and a member per linked API player
+
+    Only half of the members are in the member cache. A match planning channel holds a sign up message per configured
+    day with `signups` reactions spread over them, the in memory config is pointed at it.
+    """
+    generator = random.Random(seed)
+    guild = FakeGuild(latency=latency)
+    for team_number, team in enumerate(api.teams):
+        role = FakeRole(team["discord_id"], team["team_name"])
+        if team_number % 20 != 19:
+            guild.roles[role.id] = role
+        for player in team["players"]:
+            if player["discord_id"]:
+                member = FakeUser(player["discord_id"], player["player_name"], [role])
+                guild.members[member.id] = member
+                if generator.random() < 0.5:
+                    guild.cached_members[member.id] = member
+
+    config_dict = copy.deepcopy(bot_config.config_dict)
+    planning_dict = config_dict["MFC-Guild"]["Match-Planning"]
+    channel = guild.add_channel("match-planning")
+    members = list(guild.members.values())
+    message_ids = []
+    for times in planning_dict["Days"].values():
+        users = {emoji: [] for emoji in times.values()}
+        for _ in range(signups // len(planning_dict["Days"])):
+            users[generator.choice(list(users))].append(generator.choice(members))
+        message = channel.add_message(reactions=[FakeReaction(guild, emoji, reaction_users)
+                                                 for emoji, reaction_users in users.items()])
+        message_ids.append(message.id)
+    planning_dict["Channel-ID"] = channel.id
+    planning_dict["Message-IDs"] = message_ids
+    bot_config.config_dict = config_dict  # Only ever held in memory, the benchmark never writes the config
+    return guild, members
+
+
+async def run_scenario(command, contexts: list[FakeContext], requests: int) -> tuple[list[float], float]:
+    """Has every context invoke the command in turn until `requests` invocations ran, the contexts concurrently"""
+    timings = []
+    remaining = iter(range(requests))
+
+    async def user(ctx: FakeContext):
+        for _ in remaining:
+            start = time.perf_counter()
+            await command(ctx)
+            timings.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user(ctx) for ctx in contexts))
+    return timings, time.perf_counter() - start
+
+
+def top_calls(calls: Counter, amount: int = 4) -> str:
+    return ", ".join(f"{name} x{count}" for name, count in calls.most_common(amount)) or "none"
+
+
+async def main(selected: list[str], requests: int, concurrency: int, api_latency: float, discord_latency: float,
+               teams: int, matches: int, signups: int, discord_limits: bool):
+    api = MockMFCAPI(latency=api_latency, teams=teams, matches=matches)
+    await api.start()
+    APIRequest.configure()
+    APIRequest.api_url = api.url
+    bot._connection.user = fake_bot_user()
+    if not discord_limits:
+        # Measure the bot itself rather than the client side pacing of a few channels
+        bot.outbox.route_limits = {route: (1_000_000, 1.0) for route in bot.outbox.route_limits}
+
+    guild, members = build_guild(api, discord_latency, signups)
+    generator = random.Random(1)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        Player.stats_store = MatchStatsStore(Path(temp_dir) / "match_stats.json")
+        player, team, planning = Player(bot), Team(bot), MatchPlanning(bot)
+        for cog in (player, team, planning):
+            bot.add_cog(cog)
+        planning.tally.tally_path = Path(temp_dir) / "signups.json"
+        commands = {
+            "top": lambda ctx: player.top_of_time_range(ctx, "all", generator.choice(("kd", "kda", "score")), 25),
+            "stats": lambda ctx: player.get_player_stats(ctx, generator.choice(members)),
+            "teams": lambda ctx: team.embed_teams(ctx.channel),
+            "dump": lambda ctx: planning.dump(ctx, False, "csv")
+        }
+        contexts = [FakeContext(bot, guild, guild.add_channel(f"user-{user}"), generator.choice(members), name)
+                    for user, name in enumerate(selected * concurrency)][:concurrency]
+
+        print(f"{teams} teams, {len(api.players)} players, {matches} matches, {signups} sign ups, "
+              f"API latency {api_latency * 1000:.0f}ms, Discord latency {discord_latency * 1000:.0f}ms, "
+              f"{concurrency} concurrent users")
+        try:
+            for name in selected:
+                api_calls, discord_calls = Counter(api.calls), Counter(guild.calls)
+                print(summarize(name, *await run_scenario(commands[name], contexts, requests)))
+                print(f"{'':<28} API: {top_calls(api.calls - api_calls)}")
+                print(f"{'':<28} Discord: {top_calls(guild.calls - discord_calls)}")
+                print(f"{'':<28} peak RSS: {peak_rss_mb():.1f}MiB")
+        finally:
+            for cog in (player, team, planning):
+                bot.remove_cog(cog.qualified_name)
+            await bot.outbox.close()
+            await APIRequest.close_session()
+            await api.stop()
+            for task in asyncio.all_tasks():
+                if task is not asyncio.current_task():
+                    task.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", nargs="+", choices=scenarios, default=list(scenarios))
+    parser.add_argument("--requests", type=int, default=200, help="Command invocations per scenario")
+    parser.add_argument("--concurrency", type=int, default=10, help="Users invoking commands at once")
+    parser.add_argument("--api-latency", type=float, default=0.005, help="Latency of each API call in seconds")
+    parser.add_argument("--discord-latency", type=float, default=0.005, help="Latency of each Discord REST call")
+    parser.add_argument("--teams", type=int, default=100)
+    parser.add_argument("--matches", type=int, default=2000)
+    parser.add_argument("--signups", type=int, default=2000, help="Sign up reactions spread over the plan days")
+    parser.add_argument("--discord-limits", action="store_true",
+                        help="Keep the outbox's per channel rate limits instead of lifting them")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    # The bot's scheduler and outbox are bound to its loop, so run there rather than in a new one
+    bot.loop.run_until_complete(main(args.scenarios, args.requests, args.concurrency, args.api_latency,
+                                     args.discord_latency, args.teams, args.matches, args.signups,
+                                     args.discord_limits))
@@ -0,0 +1,117 @@
+"""
+Measures how long logging stalls the event loop with the handlers inline and behind the logging queue
+
+Producer tasks log the bot's hot path lines at DEBUG while a heartbeat task sleeps `--interval` seconds at a time,
+the time each sleep overshoots by is the loop stall. Records go to a rotating file and a null stream, `--disk-delay`
+adds a delay to every file flush to stand in for a slow or busy disk.
+
+Run from the repository root with: python -m Benchmarks.log_stall
+"""
+import argparse
+import asyncio
+import io
+import logging
+import tempfile
+import time
+
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+
+import Benchmarks  # noqa: F401, sets the environment the Bot package expects
+from Benchmarks import percentile
+from Bot.Logging import JSONFormatter
+from Bot.Logging import QueueLogging
+
+standard_format = "[%(asctime)s][%(threadName)s][%(name)s.%(funcName)s:%(lineno)d][%(levelname)s] %(message)s"
+
+log = logging.getLogger("Bot")
+
+
+class SlowDiskHandler(RotatingFileHandler):
+    """A RotatingFileHandler whose flushes take `disk_delay` seconds longer"""
+
+    disk_delay = 0.0
+
+    def flush(self):
+        super().flush()
+        if self.disk_delay:
+            time.sleep(self.disk_delay)
+
+
+def configure(directory: Path, json_format: bool, disk_delay: float) -> list[logging.Handler]:
+    formatter = JSONFormatter() if json_format else logging.Formatter(standard_format)
+    file_handler = SlowDiskHandler(directory / "Bot.log", maxBytes=10 * 1024 ** 2, backupCount=2)
+    file_handler.disk_delay = disk_delay
+    stream_handler = logging.StreamHandler(io.StringIO())
+    stream_handler.setLevel(logging.INFO)
+    root = logging.getLogger()
+    root.setLevel(logging.DEBUG)
+    for handler in (file_handler, stream_handler):
+        handler.setFormatter(formatter)
+        root.addHandler(handler)
+    return [file_handler, stream_handler]
+
+
+async def produce(records: int, batch: int):
+    """Logs what a busy bot logs per command, yielding to the loop every `batch` records"""
+    for number in range(records):
+        log.debug("GET request issued to %s", f"http://127.0.0.1/player/id?id=player-{number}")
+        if number % 10 == 0:
+            log.info("%s (%s) invoked a command \"%s\" in the guild %s (%s) in channel %s (%s)",
+                     "Player#0001", 100000 + number, "-player top all kd 10", "MFC", 797088210928009246,
+                     "bot-commands", 727651164794912889)
+        if number % batch == 0:
+            await asyncio.sleep(0)
+
+
+async def heartbeat(interval: float, stalls: list[float], stop: asyncio.Event):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        stalls.append(max(time.perf_counter() - start - interval, 0.0))
+
+
+async def run(producers: int, records: int, batch: int, interval: float) -> tuple[list[float], float]:
+    stalls = []
+    stop = asyncio.Event()
+    monitor = asyncio.ensure_future(heartbeat(interval, stalls, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(produce(records, batch) for _ in range(producers)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+    return stalls, elapsed
+
+
+def main(producers: int, records: int, batch: int, interval: float, disk_delay: float, json_format: bool):
+    print(f"{producers} producers logging {records} records each, {'JSON' if json_format else 'standard'} format, "
+          f"{disk_delay * 1000:.2f}ms added per file flush")
+    for mode in ("inline", "queue"):
+        with tempfile.TemporaryDirectory() as directory:
+            handlers = configure(Path(directory), json_format, disk_delay)
+            queue_logging = QueueLogging()
+            if mode == "queue":
+                queue_logging.start()
+            stalls, elapsed = asyncio.run(run(producers, records, batch, interval))
+            drain_start = time.perf_counter()
+            queue_logging.stop()
+            drained = time.perf_counter() - drain_start
+            for handler in handlers:
+                logging.getLogger().removeHandler(handler)
+                handler.close()
+        stalls.sort()
+        print(f"{mode:<8} logged in {elapsed * 1000:8.1f}ms  heartbeats: {len(stalls):>5}  "
+              f"stall p50: {percentile(stalls, 0.5) * 1000:7.3f}ms  p99: {percentile(stalls, 0.99) * 1000:7.3f}ms  "
+              f"max: {stalls[-1] * 1000:7.3f}ms  queue drained in {drained * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--producers", type=int, default=10)
+    parser.add_argument("--records", type=int, default=2000, help="Records logged per producer")
+    parser.add_argument("--batch", type=int, default=5, help="Records logged between yields to the loop")
+    parser.add_argument("--interval", type=float, default=0.001, help="Seconds the heartbeat sleeps for")
+    parser.add_argument("--disk-delay", type=float, default=0.0002, help="Seconds added to every file flush")
+    parser.add_argument("--json", action="store_true", help="Format records with the JSON formatter")
+    args = parser.parse_args()
+    main(args.producers, args.records, args.batch, args.interval, args.disk_delay, args.json)
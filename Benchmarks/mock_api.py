@@ -0,0 +1,177 @@
+"""
+A local mock of the MFC API serving the endpoints the cogs call from generated teams, players and matches
+
+Run from the repository root with: python -m Benchmarks.mock_api, then point API_URL at the printed address
+"""
+import argparse
+import asyncio
+import random
+
+from collections import Counter
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+import orjson
+
+from aiohttp import web
+
+
+class MockMFCAPI:
+    """
+    Serves `/team/*`, `/player/*`, `/match/all` and `/user/verify` from generated data, after `latency` seconds
+
+    Every team has `players_per_team` players, all but every tenth of them linked to a discord id. Matches are spread
+    over the last `days` days and pit two random teams against each other over 3 sets of 5 rounds. Calls are counted
+    per path in `calls`.
+    """
+
+    def __init__(self, latency: float = 0.0, teams: int = 50, players_per_team: int = 5, matches: int = 500,
+                 days: int = 60, host: str = "127.0.0.1", seed: int = 0):
+        self.latency = latency
+        self.host = host
+        self.port = None
+        self.calls: Counter = Counter()
+        self._runner = None
+
+        generator = random.Random(seed)
+        now = datetime.now(tz=timezone.utc)
+        self.teams = []
+        self.players = []
+        for team_number in range(teams):
+            team = {
+                "id": f"team-{team_number}",
+                "team_name": f"Team {team_number}",
+                "discord_id": 1000 + team_number,
+                "elo": generator.randrange(800, 2400),
+                "players": []
+            }
+            for player_number in range(players_per_team):
+                player_index = len(self.players)
+                player = {
+                    "id": f"player-{player_index}",
+                    "player_name": f"Player {player_index}",
+                    "playfab_id": f"{player_index:016X}",
+                    "discord_id": None if player_index % 10 == 9 else 100000 + player_index,
+                    "team_id": team["id"],
+                    "ambassador": None
+                }
+                team["players"].append(player)
+                self.players.append(player)
+            self.teams.append(team)
+
+        def team_rows(team: dict) -> list[dict]:
+            return [{"player_id": player["id"],
+                     "score": generator.randrange(0, 500),
+                     "kills": generator.randrange(0, 8),
+                     "assists": generator.randrange(0, 5),
+                     "deaths": generator.randrange(0, 6)} for player in team["players"]]
+
+        self.matches = []
+        for match_number in range(matches):
+            team1, team2 = generator.sample(self.teams, 2)
+            created = now - timedelta(seconds=generator.randrange(days * 24 * 3600))
+            self.matches.append({
+                "id": f"match-{match_number}",
+                "creation": created.isoformat(),
+                "sets": [{"rounds": [{"team1_players": team_rows(team1), "team2_players": team_rows(team2)}
+                                     for _ in range(5)]}
+                         for _ in range(3)]
+            })
+        self.matches.sort(key=lambda match: match["creation"])
+
+        self.teams_by = {
+            "id": {team["id"]: team for team in self.teams},
+            "discord_id": {str(team["discord_id"]): team for team in self.teams}
+        }
+        self.players_by = {
+            "id": {player["id"]: player for player in self.players},
+            "discord_id": {str(player["discord_id"]): player for player in self.players if player["discord_id"]},
+            "playfab_id": {player["playfab_id"]: player for player in self.players}
+        }
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    @staticmethod
+    def respond(data, status: int = 200) -> web.Response:
+        return web.Response(body=orjson.dumps(data), status=status, content_type="application/json")
+
+    async def delay(self, request: web.Request):
+        self.calls[request.path] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    async def all_teams(self, request: web.Request) -> web.Response:
+        await self.delay(request)
+        return self.respond(self.teams)
+
+    async def team(self, request: web.Request) -> web.Response:
+        await self.delay(request)
+        key = "discord_id" if request.path.endswith("discord-id") else "id"
+        if team := self.teams_by[key].get(request.query.get(key, "")):
+            return self.respond(team)
+        return self.respond({"detail": "Team not found"}, 404)
+
+    async def player(self, request: web.Request) -> web.Response:
+        await self.delay(request)
+        key = request.path.rsplit("/", 1)[-1].replace("-", "_")
+        if player := self.players_by[key].get(request.query.get(key, "")):
+            return self.respond(player)
+        return self.respond({"detail": "Player not found"}, 404)
+
+    async def all_matches(self, request: web.Request) -> web.Response:
+        await self.delay(request)
+        matches = self.matches
+        if start_time := request.query.get("start_time"):
+            start_time = datetime.fromisoformat(start_time)
+            matches = [match for match in matches if datetime.fromisoformat(match["creation"]) >= start_time]
+        return self.respond(matches)
+
+    async def write(self, request: web.Request) -> web.Response:
+        await self.delay(request)
+        return self.respond({})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/team/all", self.all_teams)
+        app.router.add_get("/team/discord-id", self.team)
+        app.router.add_get("/team/id", self.team)
+        app.router.add_get("/player/discord-id", self.player)
+        app.router.add_get("/player/playfab-id", self.player)
+        app.router.add_get("/player/id", self.player)
+        app.router.add_get("/match/all", self.all_matches)
+        app.router.add_post("/{tail:.*}", self.write)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port or 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        await self._runner.cleanup()
+
+
+async def main(port: int, latency: float, teams: int, matches: int):
+    api = MockMFCAPI(latency=latency, teams=teams, matches=matches)
+    api.port = port
+    await api.start()
+    print(f"Serving {teams} teams, {len(api.players)} players and {matches} matches at {api.url}")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await api.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0, help="Artificial latency of each API call in seconds")
+    parser.add_argument("--teams", type=int, default=50)
+    parser.add_argument("--matches", type=int, default=500)
+    args = parser.parse_args()
+    try:
+        asyncio.run(main(args.port, args.latency, args.teams, args.matches))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,69 @@
+"""
+Compares the old nested loop permission check against the role to command index with hundreds of configured roles
+
+Run from the repository root with: python -m Benchmarks.permissions
+"""
+import argparse
+import random
+import timeit
+
+import Benchmarks  # noqa: F401, sets the environment the Bot package expects
+from Bot.Config.Permissions import Admin
+from Bot.Config.Permissions import CustomPerm
+from Bot.Config.Permissions import Moderator
+from Bot.Config.Permissions import PermissionIndex
+
+
+class FakeRole:
+
+    def __init__(self, role_id: int):
+        self.id = role_id
+
+
+def old_is_permitted(check_roles: list[list], member_roles: list[FakeRole], command_name: str) -> bool:
+    """The check Permissions.is_permitted ran before the index, kept here as the baseline"""
+    for internal_role in check_roles:
+        for role in internal_role:
+            for discord_role in member_roles:
+                if role.id == discord_role.id and \
+                        ("*" in role.permitted_commands or command_name in role.permitted_commands):
+                    return True
+    return False
+
+
+def main(roles: int, member_roles: int, number: int):
+    generator = random.Random(0)
+    command_names = [f"command {index}" for index in range(50)]
+    admins = [Admin(role_id) for role_id in range(5)]
+    moderators = [Moderator(role_id) for role_id in range(5, 15)]
+    custom_roles = [CustomPerm(role_id, generator.sample(command_names, 3)) for role_id in range(15, roles)]
+    index = PermissionIndex(admins + moderators + custom_roles)
+
+    # A member without any permitted role is the worst case for the old check, every pair is compared
+    members = [[FakeRole(generator.randrange(roles, roles * 10)) for _ in range(member_roles)] for _ in range(20)]
+    member_role_ids = [frozenset(role.id for role in member) for member in members]
+
+    def old_check():
+        for member in members:
+            old_is_permitted([admins, moderators, custom_roles], member, "command 1")
+
+    def new_check():
+        for member in members:
+            index.is_permitted(frozenset(role.id for role in member), "command 1")
+
+    def new_check_without_memo():
+        for role_ids in member_role_ids:
+            not role_ids.isdisjoint(index.command_roles("command 1"))
+
+    for name, check in (("old", old_check), ("index", new_check), ("index, ids built", new_check_without_memo)):
+        per_check = min(timeit.repeat(check, number=number, repeat=3)) / (number * len(members))
+        print(f"{name:<16} {roles} configured roles, {member_roles} member roles: {per_check * 1e6:10.3f}us per check")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--roles", type=int, default=500)
+    parser.add_argument("--member-roles", type=int, default=20)
+    parser.add_argument("--number", type=int, default=200)
+    args = parser.parse_args()
+    main(args.roles, args.member_roles, args.number)
@@ -0,0 +1,97 @@
+"""
+Compares the old sequential, nested loop sign up harvest of `plan dump` against the concurrent, indexed one
+
+Run from the repository root with: python -m Benchmarks.plan_dump
+"""
+import argparse
+import asyncio
+import itertools
+import random
+import time
+
+import Benchmarks  # noqa: F401, sets the environment the Bot package expects
+from Benchmarks.fake_discord import FakeChannel
+from Benchmarks.fake_discord import FakeGuild
+from Benchmarks.fake_discord import FakeReaction
+from Benchmarks.fake_discord import FakeRole
+from Benchmarks.fake_discord import FakeUser
+from Bot import bot_config
+from Bot.Cogs.MFC.match_planning import MatchPlanning
+
+
+def fake_guild(days: dict, teams: int, reactions: int, latency: float, seed: int = 0) -> tuple[FakeChannel, list[int]]:
+    """Builds a channel of one sign up message per day and `reactions` reactions from members of `teams` teams"""
+    generator = random.Random(seed)
+    guild = FakeGuild(latency=latency)
+    everyone = guild.roles[0] = FakeRole(0, "@everyone")
+    team_roles = [FakeRole(1000 + team, f"Team {team}") for team in range(teams)]
+    guild.roles.update((role.id, role) for role in team_roles)
+    channel = guild.add_channel("match-planning")
+    user_ids = itertools.count(1)
+    for times in days.values():
+        users = {emoji: [] for emoji in times.values()}
+        for _ in range(reactions // len(days)):
+            emoji = generator.choice(list(times.values()))
+            user_id = next(user_ids)
+            users[emoji].append(FakeUser(user_id, f"Player {user_id}", [everyone, generator.choice(team_roles)]))
+        channel.add_message(reactions=[FakeReaction(guild, emoji, reaction_users)
+                                       for emoji, reaction_users in users.items()])
+    return channel, [role.id for role in team_roles]
+
+
+async def old_dump(channel: FakeChannel, message_ids: list[int], days: dict, discord_team_ids: list[int]) -> dict:
+    """The aggregation `plan dump` used before, kept here as the baseline"""
+    react_messages = [await channel.fetch_message(message) for message in message_ids]
+    react_dict = {}
+    message_num = -1
+    for message in react_messages:
+        message_num += 1
+        for reaction in message.reactions:
+            users = await reaction.users().flatten()
+            for user in users:
+                for role in user.roles:
+                    for index, discord_team_id in enumerate(discord_team_ids):
+                        day = list(days.keys())[message_num]
+                        if not react_dict.get(day):
+                            react_dict[day] = {}
+                        if int(role.id) == int(discord_team_id):
+                            inv_map = {v: k for k, v in days[day].items()}
+                            if not react_dict[day].get(inv_map[str(reaction.emoji)]):
+                                react_dict[day][inv_map[str(reaction.emoji)]] = []
+                            react_dict[day][inv_map[str(reaction.emoji)]].append(role.name)
+    return react_dict
+
+
+async def new_dump(channel: FakeChannel, message_ids: list[int], days: dict, discord_team_ids: list[int]) -> dict:
+    cog = MatchPlanning.__new__(MatchPlanning)
+    harvested = await cog.harvest_reactions(channel, message_ids)
+    return cog.tally_signups(days, harvested, set(discord_team_ids))[0]
+
+
+async def main(teams: int, reactions: int, latency: float):
+    days = bot_config.config_dict["MFC-Guild"]["Match-Planning"]["Days"]
+    channel, team_ids = fake_guild(days, teams, reactions, latency)
+    message_ids = list(channel.messages)
+    for name, dump in (("old", old_dump), ("new", new_dump)):
+        channel.guild.calls.clear()
+        start = time.perf_counter()
+        react_dict = await dump(channel, message_ids, days, team_ids)
+        elapsed = time.perf_counter() - start
+        signups = sum(len(teams) for times in react_dict.values() for teams in times.values())
+        print(f"{name:<4} {teams} teams, {reactions} reactions: {elapsed * 1000:10.2f}ms ({signups} sign ups, "
+              f"{sum(channel.guild.calls.values())} Discord requests)")
+        if name == "old":
+            # The old dump listed a team once per member that reacted, the new one lists each team once
+            expected = {day: {time: list(dict.fromkeys(teams)) for time, teams in times.items()}
+                        for day, times in react_dict.items()}
+        elif react_dict != expected:
+            print("The new dump does not match the old dump!")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--teams", type=int, default=300)
+    parser.add_argument("--reactions", type=int, default=5000)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated latency of each Discord request")
+    args = parser.parse_args()
+    asyncio.run(main(args.teams, args.reactions, args.latency))
@@ -0,0 +1,64 @@
+"""
+Compares the pure Python and NumPy engines for summing player totals on synthetic seasons
+
+Run from the repository root with: python -m Benchmarks.player_data
+"""
+import argparse
+import random
+import time
+
+import Benchmarks  # noqa: F401, sets the environment the Bot package expects
+from Bot.Stats import calculate_ratios
+from Bot.Stats import python_sum_player_totals
+from Bot.Stats import vectorized
+
+
+def synthetic_season(rows: int, players: int = 500, players_per_team: int = 5, seed: int = 0) -> list[dict]:
+    """Builds matches of 3 sets of 5 rounds holding roughly `rows` player rows in total"""
+    generator = random.Random(seed)
+    rows_per_match = 3 * 5 * players_per_team * 2
+
+    def team():
+        return [{"player_id": f"player-{generator.randrange(players)}",
+                 "score": generator.randrange(0, 500),
+                 "kills": generator.randrange(0, 8),
+                 "assists": generator.randrange(0, 5),
+                 "deaths": generator.randrange(0, 6)} for _ in range(players_per_team)]
+
+    return [{"sets": [{"rounds": [{"team1_players": team(), "team2_players": team()} for _ in range(5)]}
+                      for _ in range(3)]}
+            for _ in range(max(rows // rows_per_match, 1))]
+
+
+def timed(engine, matches: list[dict], repeat: int) -> tuple[float, dict]:
+    best = float("inf")
+    result = {}
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = {player_id: calculate_ratios(totals) for player_id, totals in engine(matches).items()}
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(sizes: list[int], repeat: int):
+    if vectorized.np is None:
+        print("NumPy is not installed, only the pure Python engine can run")
+        return
+    for rows in sizes:
+        matches = synthetic_season(rows)
+        python_time, python_result = timed(python_sum_player_totals, matches, repeat)
+        numpy_time, numpy_result = timed(vectorized.sum_player_totals, matches, repeat)
+        flatten_start = time.perf_counter()
+        vectorized.flatten_rounds(matches)
+        flatten_time = time.perf_counter() - flatten_start
+        print(f"{rows:>9} rows  python: {python_time * 1000:9.2f}ms  numpy: {numpy_time * 1000:9.2f}ms "
+              f"(flatten {flatten_time * 1000:9.2f}ms)  speedup: {python_time / numpy_time:5.2f}x  "
+              f"identical: {python_result == numpy_result and list(python_result) == list(numpy_result)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    main(args.sizes, args.repeat)
@@ -0,0 +1,15 @@
+from Bot.API.cache import ResponseCache
+from Bot.API.resilience import APIUnavailable
+from Bot.API.resilience import CircuitBreaker
+from Bot.API.resilience import CircuitState
+from Bot.API.resilience import RetryPolicy
+from Bot.API.stream import JSONArrayDecoder
+
+__all__ = [
+    "APIUnavailable",
+    "CircuitBreaker",
+    "CircuitState",
+    "JSONArrayDecoder",
+    "ResponseCache",
+    "RetryPolicy"
+]
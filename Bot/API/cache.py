@@ -0,0 +1,135 @@
+import time
+
+from collections import OrderedDict
+from typing import Any
+from typing import Iterable
+from typing import Optional
+from urllib import parse
+
+
+class CacheEntry:
+
+    def __init__(self, value: Any, size: int, expires: float, tags: frozenset):
+        self.value = value
+        self.size = size
+        self.expires = expires
+        self.tags = tags
+
+
+class ResponseCache:
+    """
+    A least recently used cache of API responses, bounded by the total size of the cached bodies
+
+    Entries are keyed by endpoint (path and query) and only endpoints with a TTL in `ttls` are cached. Each entry
+    carries tags naming the API objects it contains, such as ("team", team id), so writes can invalidate exactly
+    the entries holding what they changed.
+
+    Every invalidation bumps `version`. A response fetched while an invalidation happened is not stored, so a
+    request racing a write can not put stale data back into the cache.
+    """
+
+    def __init__(self, ttls: dict[str, float], max_bytes: int):
+        self.ttls = ttls
+        self.max_bytes = max_bytes
+        self.entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self.tagged: dict[tuple, set[str]] = {}
+        self.total_bytes = 0
+        self.version = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def path(endpoint: str) -> str:
+        return parse.urlparse(endpoint).path
+
+    def cacheable(self, endpoint: str) -> bool:
+        return self.path(endpoint) in self.ttls
+
+    def get(self, endpoint: str) -> Optional[Any]:
+        if not self.cacheable(endpoint):
+            return None
+        entry = self.entries.get(endpoint)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires <= time.monotonic():
+            self.expirations += 1
+            self.misses += 1
+            self._remove(endpoint)
+            return None
+        self.entries.move_to_end(endpoint)
+        self.hits += 1
+        return entry.value
+
+    def put(self, endpoint: str, value: Any, size: int, tags: Iterable[tuple] = (), version: int = None,
+            ttl: float = None) -> bool:
+        """
+        Caches a value for the endpoint's TTL, or `ttl` seconds if that is shorter, returns False if it was not cached
+        (not cacheable, too large or raced a write)
+        """
+        if not self.cacheable(endpoint) or size > self.max_bytes:
+            return False
+        if version is not None and version != self.version:
+            return False
+        if endpoint in self.entries:
+            self._remove(endpoint)
+        if ttl is None or ttl > self.ttls[self.path(endpoint)]:
+            ttl = self.ttls[self.path(endpoint)]
+        entry = CacheEntry(value, size, time.monotonic() + ttl, frozenset(tags))
+        self.entries[endpoint] = entry
+        self.total_bytes += size
+        for tag in entry.tags:
+            self.tagged.setdefault(tag, set()).add(endpoint)
+        while self.total_bytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+            self.evictions += 1
+        return True
+
+    def invalidate(self, endpoints: Iterable[str] = (), tags: Iterable[tuple] = ()) -> int:
+        """Drops the given endpoints and every entry carrying one of the tags, returns how many were dropped"""
+        self.version += 1
+        dropped = set(endpoints)
+        for tag in tags:
+            dropped |= self.tagged.get(tag, set())
+        dropped &= self.entries.keys()
+        for endpoint in dropped:
+            self._remove(endpoint)
+        self.invalidations += len(dropped)
+        return len(dropped)
+
+    def clear(self):
+        self.version += 1
+        self.entries.clear()
+        self.tagged.clear()
+        self.total_bytes = 0
+
+    def _remove(self, endpoint: str):
+        entry = self.entries.pop(endpoint)
+        self.total_bytes -= entry.size
+        for tag in entry.tags:
+            if endpoints := self.tagged.get(tag):
+                endpoints.discard(endpoint)
+                if not endpoints:
+                    del self.tagged[tag]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations
+        }
+
+
+__all__ = [
+    "CacheEntry",
+    "ResponseCache"
+]
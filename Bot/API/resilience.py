@@ -0,0 +1,150 @@
+import logging
+import random
+import time
+
+from enum import IntEnum
+from typing import Optional
+
+from discord.ext import commands
+
+log = logging.getLogger(__name__)
+
+
+class CircuitState(IntEnum):
+    CLOSED = 0
+    HALF_OPEN = 1
+    OPEN = 2
+
+
+class CircuitBreaker:
+    """
+    Stops requests to a service that keeps failing, so callers fail at once instead of each waiting out a timeout
+
+    `failure_threshold` failures in a row open the circuit and every request is refused for `reset_timeout` seconds.
+    The circuit then turns half open and lets up to `half_open_probes` requests through at a time as probes, the
+    first to succeed closes it again and the first to fail opens it for another `reset_timeout` seconds.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30, half_open_probes: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_probes = half_open_probes
+        self._state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probes_in_flight = 0
+
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.opened = 0
+        self.probes = 0
+
+    @property
+    def state(self) -> CircuitState:
+        if self._state is CircuitState.OPEN and self.retry_after() == 0:
+            self._state = CircuitState.HALF_OPEN
+            self.probes_in_flight = 0
+            log.info("The API circuit is half open, probing the API")
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until an open circuit lets a probe through, 0 if it is not open"""
+        if self._state is not CircuitState.OPEN:
+            return 0.0
+        return max(self.opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def available(self) -> bool:
+        """Whether a request would be let through now, without taking a probe"""
+        state = self.state
+        return state is CircuitState.CLOSED or (state is CircuitState.HALF_OPEN and
+                                                self.probes_in_flight < self.half_open_probes)
+
+    def allow(self) -> bool:
+        """
+        Asks to make a request, each request let through must be followed by `record_success`, `record_failure` or
+        `release`
+        """
+        state = self.state
+        if state is CircuitState.CLOSED:
+            return True
+        if state is CircuitState.HALF_OPEN and self.probes_in_flight < self.half_open_probes:
+            self.probes_in_flight += 1
+            self.probes += 1
+            return True
+        self.rejected += 1
+        return False
+
+    def release(self):
+        """Hands back a request let through that never reached the service, so it tells nothing of its health"""
+        if self._state is CircuitState.HALF_OPEN and self.probes_in_flight:
+            self.probes_in_flight -= 1
+
+    def record_success(self):
+        self.successes += 1
+        self.consecutive_failures = 0
+        if self._state is not CircuitState.CLOSED:
+            log.info("An API probe succeeded, the API circuit is closed")
+            self._state = CircuitState.CLOSED
+            self.probes_in_flight = 0
+
+    def record_failure(self):
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self._state is CircuitState.HALF_OPEN or (self._state is CircuitState.CLOSED and
+                                                     self.consecutive_failures >= self.failure_threshold):
+            self.trip()
+
+    def trip(self):
+        if self._state is not CircuitState.OPEN:
+            self.opened += 1
+            log.warning(f"The API circuit is open after {self.consecutive_failures} failed requests, requests are "
+                        f"refused for {self.reset_timeout}s")
+        self._state = CircuitState.OPEN
+        self.opened_at = time.monotonic()
+        self.probes_in_flight = 0
+
+    def stats(self) -> dict:
+        return {
+            "state": int(self.state),
+            "retry_after": self.retry_after(),
+            "consecutive_failures": self.consecutive_failures,
+            "successes": self.successes,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "opened": self.opened,
+            "probes": self.probes
+        }
+
+
+class RetryPolicy:
+    """
+    Retries with exponential backoff and full jitter, the wait before retry `n` (from 0) is a random time of up to
+    `base_delay * 2 ** n` seconds, capped at `max_delay`, so clients retrying together spread out
+    """
+
+    def __init__(self, attempts: int = 3, base_delay: float = 0.2, max_delay: float = 2.0,
+                 generator: Optional[random.Random] = None):
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.generator = generator or random.Random()
+
+    def delay(self, retry: int) -> float:
+        return self.generator.uniform(0, min(self.max_delay, self.base_delay * 2 ** retry))
+
+
+class APIUnavailable(commands.CheckFailure):
+    """Raised by the API's command check while the API circuit is open"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"The MFC API is unavailable right now, please try again in {max(round(retry_after), 1)}s.")
+
+
+__all__ = [
+    "CircuitState",
+    "CircuitBreaker",
+    "RetryPolicy",
+    "APIUnavailable"
+]
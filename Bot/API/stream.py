@@ -0,0 +1,97 @@
+import re
+
+from typing import Any
+
+import orjson
+
+# Each pattern skips everything up to the next structural character outside of a string, strings included, and
+# captures it. Strings are matched whole so a string cut off by the end of the buffer stops the match. Inside an
+# element only brackets matter, so commas are skipped too.
+_to_structural = re.compile(rb'[^\[\]{}",]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^\[\]{}",]*)*([\[\]{},])', re.DOTALL)
+_to_bracket = re.compile(rb'[^\[\]{}"]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^\[\]{}"]*)*([\[\]{}])', re.DOTALL)
+_whitespace = b" \t\r\n"
+
+
+class JSONArrayDecoder:
+    """
+    Incrementally decodes a top level JSON array, one element at a time, as its bytes arrive
+
+    Only the structure between elements is scanned here, each complete element is decoded by orjson and the bytes
+    it occupied are released, so memory is bounded by the largest single element rather than the whole document.
+    A document that is not an array is buffered and decoded whole by `close`.
+    """
+
+    def __init__(self):
+        self._buffer = bytearray()
+        self._position = 0
+        self._depth = 0
+        self._element_start = None
+        self._is_array = None
+        self._finished = False
+
+    def feed(self, chunk: bytes) -> list[Any]:
+        """Adds the next chunk of the document, returning every element completed by it"""
+        self._buffer += chunk
+        if self._is_array is None:
+            stripped = self._buffer.lstrip(_whitespace)
+            if not stripped:
+                return []
+            self._is_array = stripped[:1] == b"["
+            if self._is_array:
+                self._position = len(self._buffer) - len(stripped)
+        if not self._is_array or self._finished:
+            return []
+        return self._scan()
+
+    def _scan(self) -> list[Any]:
+        elements = []
+        buffer = self._buffer
+        position = self._position
+        while match := (_to_structural if self._depth <= 1 else _to_bracket).match(buffer, position):
+            token = match.group(1)
+            position = match.end()
+            if token in b"[{":
+                self._depth += 1
+                if self._depth == 1:
+                    self._element_start = position
+            elif token == b",":
+                if self._depth == 1:
+                    elements.append(orjson.loads(buffer[self._element_start:match.start(1)]))
+                    self._element_start = position
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    if buffer[self._element_start:match.start(1)].strip(_whitespace):
+                        elements.append(orjson.loads(buffer[self._element_start:match.start(1)]))
+                    self._finished = True
+                    break
+
+        # Release everything before the element currently being read
+        if self._finished:
+            del buffer[:]
+            self._position = 0
+        elif self._element_start:
+            del buffer[:self._element_start]
+            self._position = position - self._element_start
+            self._element_start = 0
+        else:
+            self._position = position
+        return elements
+
+    def close(self) -> list[Any]:
+        """Ends the document, returning the elements of a document that was not streamed as an array"""
+        if self._is_array:
+            if not self._finished:
+                raise ValueError("The JSON array ended before it was closed")
+            return []
+        if not self._buffer.strip(_whitespace):
+            return []
+        document = orjson.loads(self._buffer)
+        if not isinstance(document, list):
+            raise ValueError(f"Expected a JSON array, got {type(document).__name__}")
+        return document
+
+
+__all__ = [
+    "JSONArrayDecoder"
+]
@@ -0,0 +1,15 @@
+from Bot.Cluster.client import ClusterClient
+from Bot.Cluster.client import SharedResponse
+from Bot.Cluster.coordinator import ClusterCoordinator
+from Bot.Cluster.coordinator import Supervisor
+from Bot.Cluster.protocol import shard_of
+from Bot.Cluster.protocol import worker_shard_ids
+
+__all__ = [
+    "ClusterClient",
+    "ClusterCoordinator",
+    "SharedResponse",
+    "Supervisor",
+    "shard_of",
+    "worker_shard_ids"
+]
@@ -0,0 +1,229 @@
+import asyncio
+import itertools
+import logging
+import os
+import time
+
+from pathlib import Path
+from typing import Any
+from typing import Iterable
+from typing import Optional
+
+from Bot.API.cache import ResponseCache
+from Bot.Cluster.protocol import decode
+from Bot.Cluster.protocol import decode_tags
+from Bot.Cluster.protocol import encode
+from Bot.Cluster.protocol import encode_tags
+from Bot.Cluster.protocol import frame_limit
+from Bot.Config.config import Config
+
+log = logging.getLogger(__name__)
+
+
+class SharedResponse:
+    """A response held in the coordinator's shared cache"""
+
+    def __init__(self, json: Any, size: int, ttl: float):
+        self.json = json
+        self.size = size
+        self.ttl = ttl
+
+
+class ClusterClient:
+    """
+    A worker's connection to the cluster coordinator
+
+    The coordinator grants leadership, the right to run singleton jobs, to one worker at a time as a lease that
+    expires at a time on the machine's monotonic clock, which every process on the machine shares. The leader renews
+    it with its heartbeats and stops considering itself the leader once it lapses, whether or not it has heard that
+    it was replaced, so two workers never run the singleton jobs at once. It stops `lease_margin` of the lease early,
+    so a job it was running has stopped writing by the time the coordinator can elect another leader.
+
+    Responses missing from the worker's API cache are looked up in the coordinator's shared cache before the API is
+    asked, and responses the worker fetches are shared back. Invalidations and config writes are sent to the other
+    workers. The connection is made again whenever it drops, the worker is never the leader while disconnected.
+    """
+
+    reconnect_delay = 1
+
+    request_timeout = 0.5
+
+    lease_margin = 0.25
+
+    def __init__(self, index: int, socket_path: Path, cache: ResponseCache, config: Config, candidate: bool = True):
+        self.index = index
+        self.socket_path = Path(socket_path)
+        self.cache = cache
+        self.config = config
+        self.candidate = candidate
+
+        self.leader: Optional[int] = None
+        self.leader_pid: Optional[int] = None
+        self.term = 0
+        self.lease = 10.0
+        self.lease_expires = 0.0
+        self.shared_version = 0
+
+        self.reconnects = 0
+        self.shared_hits = 0
+        self.shared_misses = 0
+        self.invalidations_received = 0
+        self.config_refreshes = 0
+
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._requests: dict[int, asyncio.Future] = {}
+        self._request_ids = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        config.subscribe_writes(self.config_written)
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None and not self._writer.is_closing()
+
+    def is_leader(self) -> bool:
+        return (self.connected and self.holds_lease()
+                and time.monotonic() < self.lease_expires - self.lease * self.lease_margin)
+
+    def holds_lease(self) -> bool:
+        """Whether the lease was granted to this process, it may have run out since"""
+        return self.leader == self.index and self.leader_pid == os.getpid()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self.run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.config.unsubscribe_writes(self.config_written)
+
+    async def run(self):
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(str(self.socket_path), limit=frame_limit)
+            except OSError as error:
+                log.debug("Could not connect to the cluster coordinator at %s, error: %s", self.socket_path, error)
+                await asyncio.sleep(self.reconnect_delay)
+                continue
+            self._writer = writer
+            self.send({"op": "hello", "worker": self.index, "candidate": self.candidate, "pid": os.getpid()})
+            try:
+                while line := await reader.readline():
+                    self.handle(decode(line))
+            except (OSError, ValueError) as error:  # ValueError covers invalid JSON and a line over the limit
+                log.warning(f"The connection to the cluster coordinator failed, error: {error}")
+            finally:
+                if self._heartbeat_task:
+                    self._heartbeat_task.cancel()
+                self._writer = None
+                self.lease_expires = 0.0
+                writer.close()
+                for future in self._requests.values():
+                    if not future.done():
+                        future.set_result(None)
+                self._requests.clear()
+            self.reconnects += 1
+            log.warning(f"Lost the connection to the cluster coordinator, reconnecting in {self.reconnect_delay}s")
+            await asyncio.sleep(self.reconnect_delay)
+
+    async def heartbeat(self):
+        while True:
+            self.send({"op": "heartbeat", "sent": time.monotonic()})
+            await asyncio.sleep(self.lease / 3)
+
+    def send(self, message: dict):
+        if self.connected:
+            self._writer.write(encode(message))
+
+    def handle(self, message: dict):
+        op = message["op"]
+        if op == "welcome":
+            self.lease = message["lease"]
+            self.shared_version = message["version"]
+            self.set_leader(message)
+            # Started once the lease, and so how often to renew it, is known
+            self._heartbeat_task = asyncio.ensure_future(self.heartbeat())
+        elif op == "leader":
+            self.set_leader(message)
+        elif op == "lease":
+            if message["term"] == self.term and self.holds_lease():
+                self.lease_expires = message["expires"]
+        elif op == "cache":
+            if (future := self._requests.get(message["id"])) and not future.done():
+                future.set_result(message)
+        elif op == "invalidate":
+            self.shared_version = message["version"]
+            if message["worker"] != self.index:
+                self.invalidations_received += 1
+                self.cache.invalidate(endpoints=message["endpoints"], tags=decode_tags(message["tags"]))
+        elif op == "config":
+            if message["worker"] != self.index:
+                self.config_refreshes += 1
+                asyncio.ensure_future(self.config.refresh())
+
+    def set_leader(self, message: dict):
+        was_leader = self.is_leader()
+        self.leader = message["leader"]
+        self.leader_pid = message["pid"]
+        self.term = message["term"]
+        self.lease_expires = message["expires"] if self.holds_lease() else 0.0
+        if self.is_leader() and not was_leader:
+            log.info(f"Worker {self.index} is now the cluster leader, term {self.term}")
+        elif was_leader and not self.is_leader():
+            log.info(f"Worker {self.index} is no longer the cluster leader")
+
+    async def cache_get(self, endpoint: str) -> Optional[SharedResponse]:
+        """Looks a response up in the shared cache, None if it is not there or the coordinator did not answer in time"""
+        if not self.connected:
+            return None
+        request_id = next(self._request_ids)
+        future = self._requests[request_id] = asyncio.get_event_loop().create_future()
+        self.send({"op": "cache_get", "id": request_id, "endpoint": endpoint})
+        try:
+            reply = await asyncio.wait_for(future, self.request_timeout)
+        except asyncio.TimeoutError:
+            reply = None
+        finally:
+            self._requests.pop(request_id, None)
+        if not reply or not reply["hit"]:
+            self.shared_misses += 1
+            return None
+        self.shared_hits += 1
+        return SharedResponse(reply["json"], reply["size"], reply["ttl"])
+
+    def publish_cache(self, endpoint: str, json: Any, size: int, tags: Iterable[tuple], version: int):
+        """
+        Shares a fetched response, `version` is the `shared_version` from before it was fetched so the coordinator
+        drops it if another worker invalidated it in the meantime
+        """
+        self.send({"op": "cache_put", "endpoint": endpoint, "json": json, "size": size, "tags": encode_tags(tags),
+                   "version": version})
+
+    def publish_invalidation(self, endpoints: Iterable[str], tags: Iterable[tuple]):
+        self.send({"op": "invalidate", "endpoints": list(endpoints), "tags": encode_tags(tags)})
+
+    def config_written(self):
+        self.send({"op": "config"})
+
+    def stats(self) -> dict:
+        return {
+            "connected": int(self.connected),
+            "leader": int(self.is_leader()),
+            "term": self.term,
+            "reconnects": self.reconnects,
+            "shared_hits": self.shared_hits,
+            "shared_misses": self.shared_misses,
+            "invalidations_received": self.invalidations_received,
+            "config_refreshes": self.config_refreshes
+        }
+
+
+__all__ = [
+    "SharedResponse",
+    "ClusterClient"
+]
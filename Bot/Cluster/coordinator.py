@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import os
+import time
+
+from pathlib import Path
+from typing import Callable
+from typing import Optional
+
+from Bot.API.cache import ResponseCache
+from Bot.Cluster.protocol import decode
+from Bot.Cluster.protocol import decode_tags
+from Bot.Cluster.protocol import encode
+from Bot.Cluster.protocol import frame_limit
+
+log = logging.getLogger(__name__)
+
+
+class WorkerConnection:
+
+    def __init__(self, index: int, candidate: bool, pid: int, writer: asyncio.StreamWriter):
+        self.index = index
+        self.candidate = candidate
+        self.pid = pid
+        self.writer = writer
+        self.last_heartbeat = time.monotonic()
+
+    def send(self, message: dict):
+        if not self.writer.is_closing():
+            self.writer.write(encode(message))
+
+
+class ClusterCoordinator:
+    """
+    The hub of a cluster, run by the supervising process and serving the workers on a Unix socket
+
+    The leader is the candidate with the lowest index among those that sent a heartbeat within the last `lease`
+    seconds, so a stalled worker is passed over while its connection is still open. Leadership belongs to the worker's
+    process, a restarted worker does not inherit it. The lease runs for `lease` seconds from the last heartbeat the
+    leader sent, and a new leader is only elected once it has run out, even if the leader's connection dropped sooner,
+    as a worker that lost its connection may still be running a job until its lease is up.
+
+    The shared cache holds the responses the workers fetched, with the TTLs of the workers' own caches. Invalidations
+    and config writes are passed on to every worker.
+    """
+
+    def __init__(self, socket_path: Path, cache: ResponseCache, lease: float = 10):
+        self.socket_path = Path(socket_path)
+        self.cache = cache
+        self.lease = lease
+        self.workers: dict[int, WorkerConnection] = {}
+        self.leader: Optional[int] = None
+        self.leader_pid: Optional[int] = None
+        self.term = 0
+        self.lease_expires = 0.0
+        self.elections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._monitor_task: Optional[asyncio.Task] = None
+        self._connection_tasks: set[asyncio.Task] = set()
+
+    async def start(self):
+        if self.socket_path.exists():
+            self.socket_path.unlink()  # Left behind by a coordinator that did not shut down cleanly
+        self._server = await asyncio.start_unix_server(self.serve, str(self.socket_path), limit=frame_limit)
+        self._monitor_task = asyncio.ensure_future(self.monitor())
+        log.info(f"Cluster coordinator listening on {self.socket_path}")
+
+    async def close(self):
+        if self._monitor_task:
+            self._monitor_task.cancel()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+        for worker in self.workers.values():
+            worker.writer.close()
+        # Each connection ends once its worker's writer is closed, it is left to finish rather than being cancelled
+        await asyncio.gather(*self._connection_tasks, return_exceptions=True)
+        self.workers.clear()
+        if self.socket_path.exists():
+            self.socket_path.unlink()
+
+    async def serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        worker = None
+        self._connection_tasks.add(task := asyncio.current_task())
+        try:
+            hello = decode(await reader.readline())
+            worker = WorkerConnection(hello["worker"], hello["candidate"], hello["pid"], writer)
+            if previous := self.workers.get(worker.index):
+                previous.writer.close()  # A restarted worker reconnecting before its old connection timed out
+            self.workers[worker.index] = worker
+            log.info(f"Worker {worker.index} (pid {worker.pid}) joined the cluster")
+            worker.send({"op": "welcome", "lease": self.lease, "version": self.cache.version, **self.leadership()})
+            self.check_leader()
+            while line := await reader.readline():
+                self.handle(worker, decode(line))
+        except (OSError, ValueError, KeyError) as error:
+            log.warning(f"Dropped a cluster connection, error: {error!r}")
+        finally:
+            self._connection_tasks.discard(task)
+            writer.close()
+            if worker and self.workers.get(worker.index) is worker:
+                del self.workers[worker.index]
+                log.warning(f"Worker {worker.index} (pid {worker.pid}) left the cluster")
+
+    def handle(self, worker: WorkerConnection, message: dict):
+        op = message["op"]
+        if op == "heartbeat":
+            worker.last_heartbeat = time.monotonic()
+            if worker.index == self.leader and worker.pid == self.leader_pid:
+                self.lease_expires = max(self.lease_expires, message["sent"] + self.lease)
+                worker.send({"op": "lease", "term": self.term, "expires": self.lease_expires})
+        elif op == "cache_get":
+            reply = {"op": "cache", "id": message["id"], "hit": False}
+            if (value := self.cache.get(message["endpoint"])) is not None:
+                entry = self.cache.entries[message["endpoint"]]
+                reply.update(hit=True, json=value, size=entry.size, ttl=entry.expires - time.monotonic())
+            worker.send(reply)
+        elif op == "cache_put":
+            self.cache.put(message["endpoint"], message["json"], message["size"], tags=decode_tags(message["tags"]),
+                           version=message["version"])
+        elif op == "invalidate":
+            self.cache.invalidate(endpoints=message["endpoints"], tags=decode_tags(message["tags"]))
+            self.broadcast({**message, "worker": worker.index, "version": self.cache.version})
+        elif op == "config":
+            self.broadcast({"op": "config", "worker": worker.index})
+
+    def broadcast(self, message: dict):
+        for worker in self.workers.values():
+            worker.send(message)
+
+    def leadership(self) -> dict:
+        return {"leader": self.leader, "pid": self.leader_pid, "term": self.term, "expires": self.lease_expires}
+
+    def check_leader(self):
+        """Revokes a lapsed lease and elects a leader if there is none"""
+        if self.leader is not None and time.monotonic() >= self.lease_expires:
+            log.warning(f"The lease of the cluster leader, worker {self.leader}, ran out")
+            self.leader = self.leader_pid = None
+            self.broadcast({"op": "leader", **self.leadership()})
+        if self.leader is None:
+            now = time.monotonic()
+            candidates = sorted(index for index, worker in self.workers.items()
+                                if worker.candidate and now - worker.last_heartbeat < self.lease)
+            if candidates:
+                self.leader = candidates[0]
+                self.leader_pid = self.workers[self.leader].pid
+                self.term += 1
+                self.elections += 1
+                self.lease_expires = time.monotonic() + self.lease
+                log.info(f"Elected worker {self.leader} the cluster leader, term {self.term}")
+                self.broadcast({"op": "leader", **self.leadership()})
+
+    async def monitor(self):
+        while True:
+            await asyncio.sleep(self.lease / 4)
+            self.check_leader()
+
+    def stats(self) -> dict:
+        return {
+            "workers": len(self.workers),
+            "leader": self.leader,
+            "term": self.term,
+            "elections": self.elections,
+            **self.cache.stats()
+        }
+
+
+class Supervisor:
+    """
+    Runs the coordinator and keeps a process running for each of `workers` workers, started with the command
+    `command` returns for the worker's index. A worker that exits is started again after `restart_delay` seconds.
+    """
+
+    restart_delay = 5
+
+    stop_timeout = 10
+
+    def __init__(self, workers: int, command: Callable[[int], list[str]], coordinator: ClusterCoordinator,
+                 env: dict = None):
+        self.workers = workers
+        self.command = command
+        self.coordinator = coordinator
+        self.env = env
+        self.processes: dict[int, asyncio.subprocess.Process] = {}
+        self.restarts = 0
+        self.stopping = False
+        self._tasks: list[asyncio.Task] = []
+
+    async def start(self):
+        await self.coordinator.start()
+        self._tasks = [asyncio.ensure_future(self.keep_running(index)) for index in range(self.workers)]
+
+    async def run(self):
+        await self.start()
+        await asyncio.gather(*self._tasks)
+
+    async def keep_running(self, index: int):
+        while not self.stopping:
+            process = self.processes[index] = await asyncio.create_subprocess_exec(
+                *self.command(index), env={**os.environ, **(self.env or {})}
+            )
+            log.info(f"Started worker {index} (pid {process.pid})")
+            code = await process.wait()
+            if self.stopping:
+                return
+            self.restarts += 1
+            log.warning(f"Worker {index} (pid {process.pid}) exited with code {code}, "
+                        f"restarting it in {self.restart_delay}s")
+            await asyncio.sleep(self.restart_delay)
+
+    async def stop(self):
+        self.stopping = True
+        running = [process for process in self.processes.values() if process.returncode is None]
+        for process in running:
+            process.terminate()
+        try:
+            await asyncio.wait_for(asyncio.gather(*(process.wait() for process in running)), self.stop_timeout)
+        except asyncio.TimeoutError:
+            for process in running:
+                if process.returncode is None:
+                    process.kill()
+        for task in self._tasks:
+            task.cancel()
+        await self.coordinator.close()
+
+
+__all__ = [
+    "WorkerConnection",
+    "ClusterCoordinator",
+    "Supervisor"
+]
@@ -0,0 +1,43 @@
+from typing import Any
+
+import orjson
+
+# Messages are one JSON object per line, the limit has to fit the largest cached API response
+frame_limit = 32 * 1024 * 1024
+
+
+def encode(message: dict) -> bytes:
+    return orjson.dumps(message) + b"\n"  # orjson never writes a raw newline, so a line is always one message
+
+
+def decode(line: bytes) -> dict:
+    return orjson.loads(line)
+
+
+def encode_tags(tags) -> list[list]:
+    return [list(tag) for tag in tags]
+
+
+def decode_tags(tags: list[list]) -> set[tuple]:
+    return {tuple(tag) for tag in tags}
+
+
+def shard_of(guild_id: Any, shard_count: int) -> int:
+    """The shard Discord sends a guild's events to"""
+    return (int(guild_id) >> 22) % shard_count
+
+
+def worker_shard_ids(index: int, workers: int, shard_count: int) -> list[int]:
+    """The shards owned by the worker with the given index, every `workers`th shard starting at its index"""
+    return list(range(index, shard_count, workers))
+
+
+__all__ = [
+    "frame_limit",
+    "encode",
+    "decode",
+    "encode_tags",
+    "decode_tags",
+    "shard_of",
+    "worker_shard_ids"
+]
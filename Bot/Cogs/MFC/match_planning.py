@@ -1,33 +1,230 @@
 import logging
 import asyncio
 import csv
-import os
+import importlib.util
+import io
 
 from datetime import datetime
-from datetime import timezone
 from pathlib import Path
+from typing import Optional
 
+import aiofiles
 import discord
-from discord.ext import tasks
+import orjson
 
 from Bot import Bot
 from Bot import bot_config
+from Bot import signups_path
 from Bot import APIRequest
 from Bot.Cogs import BaseCog
 from Bot.Cogs import command
+from Bot.Cogs import listener
 from Bot.Config.Permissions import Permissions
+from Bot.Config.config import write_atomically
+from Bot.Scheduler import ensure_leader
+from Bot.Scheduler import get_timezone
+from Bot.Scheduler import weekdays
+
+# openpyxl is optional and slow to import, it is only imported once an XLSX dump is asked for
+openpyxl_installed = importlib.util.find_spec("openpyxl") is not None
 
 log = logging.getLogger(__name__)
 
 
+class SignupTally:
+    """
+    The teams signed up for each day and time of the current match planning, kept up to date from reaction events
+
+    Each slot maps the role id of a signed up team to the ids of the team's members that reacted, a team stays
+    signed up until the last of them removes their reaction. The tally is saved to `tally_path` a few seconds after
+    it changes and is only trusted (`ready`) once it has been reconciled against the sign up messages.
+
+    Reactions from members without a known team role are kept in `unmatched` until they are removed, so they count
+    once `set_team_role_ids` learns of a team created since the team roles were last fetched. Between
+    `begin_rebuild` and `rebuild` every event is also buffered, and replayed over the harvested sign ups so events
+    arriving while the messages are harvested are not lost.
+    """
+
+    save_delay = 5
+
+    def __init__(self, tally_path: Path):
+        self.tally_path = tally_path
+        self.message_ids: list[int] = []
+        self.signups: dict[str, dict[str, dict[int, set[int]]]] = {}
+        self.team_role_ids: list[int] = []
+        self.unmatched: dict[tuple[str, str, int], tuple[int, ...]] = {}
+        self.ready = False
+        self._buffer: Optional[list[tuple]] = None
+        self._save_task: Optional[asyncio.Task] = None
+
+    @property
+    def listening(self) -> bool:
+        """Whether reaction events should be applied, the tally is ready or being rebuilt"""
+        return self.ready or self._buffer is not None
+
+    def reset(self, message_ids: list[int], days: dict):
+        self.message_ids = [int(message_id) for message_id in message_ids]
+        self.signups = {day: {time: {} for time in times} for day, times in days.items()}
+        self.unmatched.clear()
+
+    def slot(self, days: dict, message_id: int, emoji: str) -> Optional[tuple[str, str]]:
+        """Returns the (day, time) a reaction on a sign up message stands for, None for any other reaction"""
+        if message_id not in self.message_ids:
+            return None
+        day_index = self.message_ids.index(message_id)
+        if day_index >= len(days):
+            return None
+        day = list(days)[day_index]
+        for time, time_emoji in days[day].items():
+            if time_emoji == emoji:
+                return day, time
+        return None
+
+    def add(self, day: str, time: str, user_id: int, role_ids) -> bool:
+        """Signs up every team among `role_ids` the user has, returns True if the tally changed"""
+        role_ids = tuple(role_ids)
+        if self._buffer is not None:
+            self._buffer.append(("add", day, time, user_id, role_ids))
+        changed = False
+        teams = self.signups.setdefault(day, {}).setdefault(time, {})
+        if not (team_role_ids := set(role_ids).intersection(self.team_role_ids)):
+            self.unmatched[(day, time, user_id)] = role_ids
+        for role_id in team_role_ids:
+            if user_id not in (members := teams.setdefault(role_id, set())):
+                members.add(user_id)
+                changed = True
+        return changed
+
+    def remove(self, day: str, time: str, user_id: int) -> bool:
+        if self._buffer is not None:
+            self._buffer.append(("remove", day, time, user_id))
+        self.unmatched.pop((day, time, user_id), None)
+        changed = False
+        teams = self.signups.get(day, {}).get(time, {})
+        for role_id in list(teams):
+            if user_id in teams[role_id]:
+                teams[role_id].discard(user_id)
+                changed = True
+                if not teams[role_id]:
+                    del teams[role_id]
+        return changed
+
+    def clear(self, day: str, time: str = None):
+        if self._buffer is not None:
+            self._buffer.append(("clear", day, time))
+        for slot_time, teams in self.signups.get(day, {}).items():
+            if time is None or slot_time == time:
+                teams.clear()
+        for slot in [slot for slot in self.unmatched if slot[0] == day and (time is None or slot[1] == time)]:
+            del self.unmatched[slot]
+
+    def set_team_role_ids(self, team_role_ids: list[int]) -> bool:
+        """Replaces the known team roles and signs up the unmatched reactions now matching one, True if any did"""
+        self.team_role_ids = list(team_role_ids)
+        changed = False
+        for (day, time, user_id), role_ids in list(self.unmatched.items()):
+            if set(role_ids).intersection(self.team_role_ids):
+                del self.unmatched[(day, time, user_id)]
+                changed = self.add(day, time, user_id, role_ids) or changed
+        return changed
+
+    def begin_rebuild(self, message_ids: list[int], days: dict):
+        """Starts buffering reaction events for `rebuild` to replay, a tally not yet ready starts over empty"""
+        if not self.ready:
+            self.reset(message_ids, days)
+        self._buffer = []
+
+    def abort_rebuild(self):
+        self._buffer = None
+
+    def rebuild(self, message_ids: list[int], days: dict, harvested: list[list[tuple]], team_role_ids: list[int]):
+        """
+        Replaces the tally with the sign ups harvested from the messages, see MatchPlanning.harvest_reactions, then
+        replays the events buffered since `begin_rebuild` in the order they arrived
+        """
+        buffered, self._buffer = self._buffer or [], None
+        self.reset(message_ids, days)
+        self.team_role_ids = list(team_role_ids)
+        for message_id, reactions in zip(self.message_ids, harvested):
+            for emoji, users in reactions:
+                if not (slot := self.slot(days, message_id, emoji)):
+                    continue
+                for user in users:
+                    if not getattr(user, "bot", False):
+                        self.add(*slot, user.id, (role.id for role in getattr(user, "roles", ())))
+        for operation, *arguments in buffered:
+            getattr(self, operation)(*arguments)
+        self.ready = True
+
+    def react_dict(self, guild: discord.Guild) -> tuple[dict, set[int]]:
+        """Returns the tally as {day: {time: [team names]}} and the role ids of every team that signed up"""
+        react_dict = {}
+        signed_up_teams = set()
+        for day, times in self.signups.items():
+            react_dict[day] = {}
+            for time, teams in times.items():
+                for role_id in teams:
+                    if role := guild.get_role(role_id):
+                        react_dict[day].setdefault(time, []).append(role.name)
+                        signed_up_teams.add(role_id)
+        return react_dict, signed_up_teams
+
+    async def load(self, message_ids: list[int]) -> bool:
+        """Loads the saved tally, returns False if there is none or it was for other sign up messages"""
+        if not self.tally_path.exists():
+            return False
+        async with aiofiles.open(self.tally_path, "rb") as f:
+            stored = orjson.loads(await f.read())
+        if stored.get("message_ids") != [int(message_id) for message_id in message_ids]:
+            return False
+        self.message_ids = stored["message_ids"]
+        self.team_role_ids = stored["team_role_ids"]
+        self.signups = {day: {time: {int(role_id): set(members) for role_id, members in teams.items()}
+                              for time, teams in times.items()}
+                        for day, times in stored["signups"].items()}
+        return True
+
+    async def save(self):
+        stored = {
+            "message_ids": self.message_ids,
+            "team_role_ids": self.team_role_ids,
+            "signups": {day: {time: {role_id: list(members) for role_id, members in teams.items()}
+                              for time, teams in times.items()}
+                        for day, times in self.signups.items()}
+        }
+        await write_atomically(self.tally_path, orjson.dumps(stored, option=orjson.OPT_NON_STR_KEYS))
+
+    def schedule_save(self):
+        """Saves the tally after `save_delay` seconds, coalescing every change made in the meantime"""
+        if self._save_task and not self._save_task.done():
+            return
+
+        async def delayed_save():
+            await asyncio.sleep(self.save_delay)
+            await self.save()
+
+        self._save_task = asyncio.ensure_future(delayed_save())
+
+
 class MatchPlanning(BaseCog):
-    planning_posted = bot_config.config_dict["MFC-Guild"]["Match-Planning"]["Posted"]
+    harvest_concurrency = 5
+
+    dump_formats = ("csv", "json", "xlsx")
 
-    plan_loop_name = "match_plan_loop"
+    post_retry_delay = 600
+
+    team_roles_interval = 300
 
     def __init__(self, bot: Bot):
-        bot.loop.create_task(self.plan_loop(), name=self.plan_loop_name)
+        self.tally = SignupTally(signups_path)
+        self.planning_schedule: Optional[tuple[str, str]] = None
+        self._team_roles_task: Optional[asyncio.Task] = None
         super().__init__(bot)
+        self.schedule_planning(bot_config.config_dict)
+        bot.scheduler.every(self.team_roles_interval, self.refresh_team_roles, name="signup_team_roles", owner=self)
+        bot_config.subscribe(self.schedule_planning)
+        bot.loop.create_task(self.catch_up_planning())
+        bot.loop.create_task(self.reconcile_signups())
 
     @command.group(aliases=["pl"])
     async def plan(self, ctx: command.Context):
@@ -36,34 +233,81 @@ class MatchPlanning(BaseCog):
             await self.post_match_planning()
 
     def cog_unload(self):
-        for task in asyncio.all_tasks(self.bot.loop):
-            if task.get_name() == self.plan_loop_name:
-                task.cancel()
-
-    @tasks.loop(seconds=600)
-    async def plan_loop(self):
-        while True:
-            await asyncio.sleep(600)  # sleep for 10 minutes
-            log.debug(f"Checking if planning should be posted.")
-            await self.bot.wait_until_ready()
-            today = datetime.now(tz=timezone.utc).strftime("%A").casefold()
-            if today == bot_config.config_dict["MFC-Guild"]["Match-Planning"]["Post-Day"].casefold():
-                if not self.planning_posted:
-                    result = await self.post_match_planning()
-                    if result:
-                        self.planning_posted = True
-                        bot_config.config_dict["MFC-Guild"]["Match-Planning"]["Posted"] = True
-                        await bot_config.write(bot_config.config_dict)
-                    else:
-                        log.info(f"Match planning could not be fully posted")
-            elif self.planning_posted:
-                self.planning_posted = False
-                bot_config.config_dict["MFC-Guild"]["Match-Planning"]["Posted"] = False
+        bot_config.unsubscribe(self.schedule_planning)
+        super().cog_unload()
+
+    def schedule_planning(self, config_dict: dict):
+        """
+        Schedules posting the match planning at the start of the Post-Day in the configured Timezone, and clearing
+        the Posted flag at the start of the following day. Rescheduled whenever the config changes either of them.
+        """
+        planning_dict = config_dict["MFC-Guild"]["Match-Planning"]
+        schedule = (planning_dict["Post-Day"].casefold(), planning_dict["Timezone"])
+        if schedule == self.planning_schedule:
+            return
+        post_day, timezone_name = schedule
+        if post_day not in weekdays:
+            log.critical(f"The Post-Day of [Match-Planning], {planning_dict['Post-Day']}, is not a day of the week!")
+            return
+        self.planning_schedule = schedule
+        tz = get_timezone(timezone_name)
+        reset_day = weekdays[(weekdays.index(post_day) + 1) % len(weekdays)]
+        self.bot.scheduler.weekly(post_day, self.post_planning_job, tz=tz, name="match_planning_post", owner=self,
+                                  singleton=True)
+        self.bot.scheduler.weekly(reset_day, self.reset_planning_job, tz=tz, name="match_planning_reset", owner=self,
+                                  singleton=True)
+        log.info(f"Match planning will be posted every {post_day} at 00:00 {timezone_name}")
+
+    def is_post_day(self) -> bool:
+        planning_dict = bot_config.config_dict["MFC-Guild"]["Match-Planning"]
+        today = datetime.now(tz=get_timezone(planning_dict["Timezone"])).strftime("%A").casefold()
+        return today == planning_dict["Post-Day"].casefold()
+
+    async def catch_up_planning(self):
+        """Posts or resets the match planning if the bot was offline when it was due"""
+        await self.bot.wait_until_ready()
+        await self.bot.scheduler.wait_until_leader()  # In a cluster, the leader may be elected after the bot is ready
+        planning_posted = bot_config.config_dict["MFC-Guild"]["Match-Planning"]["Posted"]
+        if self.is_post_day() and not planning_posted:
+            job_name = "match_planning_post"
+        elif not self.is_post_day() and planning_posted:
+            job_name = "match_planning_reset"
+        else:
+            return
+        if job := self.bot.scheduler.jobs.get(job_name):
+            await job.run()  # Through the job, so the catch up can't overlap a scheduled run
+
+    async def post_planning_job(self):
+        """Posts the match planning, retrying throughout the Post-Day until it is fully posted"""
+        while not bot_config.config_dict["MFC-Guild"]["Match-Planning"]["Posted"]:
+            ensure_leader()  # Each retry, the run may have outlived the lease while it slept
+            if await self.post_match_planning():
+                bot_config.config_dict["MFC-Guild"]["Match-Planning"]["Posted"] = True
                 await bot_config.write(bot_config.config_dict)
+                return
+            log.info(f"Match planning could not be fully posted")
+            await asyncio.sleep(self.post_retry_delay)
+            if not self.is_post_day():
+                return
+
+    async def reset_planning_job(self):
+        log.debug(f"Clearing the match planning Posted flag")
+        bot_config.config_dict["MFC-Guild"]["Match-Planning"]["Posted"] = False
+        await bot_config.write(bot_config.config_dict)
 
     @plan.command()
+    @APIRequest.is_available()
     @Permissions.is_permitted()
-    async def dump(self, ctx: command.Context, delete: bool = True):
+    async def dump(self, ctx: command.Context, delete: bool = True, output_format: str = "csv"):
+        """Dumps the team sign ups as a csv, json or xlsx (output_format) file"""
+        output_format = output_format.strip().casefold()
+        if output_format not in self.dump_formats:
+            await ctx.send(f"The output format MUST be one of the following: "
+                           f"{', '.join(f'`{dump_format}`' for dump_format in self.dump_formats)}")
+            return
+        if output_format == "xlsx" and not openpyxl_installed:
+            await ctx.send(f"XLSX dumps are unavailable, `openpyxl` is not installed.")
+            return
         match_planning_dict = bot_config.config_dict["MFC-Guild"]["Match-Planning"]
         guild: discord.Guild = ctx.guild
         if not guild:
@@ -73,76 +317,246 @@ class MatchPlanning(BaseCog):
         if not channel:
             await ctx.send(f"Could not find the relevant channel to dump team sign ups.")
             return
-        react_messages: list[int] = match_planning_dict["Message-IDs"]
-        react_messages: list[discord.Message] = [await channel.fetch_message(message) for message in react_messages]
-        known_discord_teams = await APIRequest.get("/team/all")
-        if known_discord_teams.status != 200:
-            log.critical(f"Attempted to connect to the API, could not reach it!")
-            await ctx.send("Unable to connect to the API.")
-            return
-        discord_team_ids = [team.get("discord_id") for team in known_discord_teams.json]
-        signed_up_teams = []
-        days: dict = match_planning_dict["Days"]
-        react_dict = {}
-        message_num = -1
-        for message in react_messages:
-            message_num += 1
-            for reaction in message.reactions:
-                reaction: discord.Reaction
-                users = await reaction.users().flatten()
-                for user in users:
-                    for role in user.roles:
-                        role: discord.Role
-                        for index, discord_team_id in enumerate(discord_team_ids):
-                            day = list(days.keys())[message_num]
-                            if not react_dict.get(day):
-                                react_dict[day] = {}
-                            if int(role.id) == int(discord_team_id):
-                                inv_map = {v: k for k, v in days[day].items()}
-                                if not react_dict[day].get(inv_map[str(reaction.emoji)]):
-                                    react_dict[day][inv_map[str(reaction.emoji)]] = []
-                                react_dict[day][inv_map[str(reaction.emoji)]].append(role.name)
-                                signed_up_teams.append(discord_team_id)
+        if self.tally.ready:
+            discord_team_ids = self.tally.team_role_ids
+            react_dict, signed_up_teams = self.tally.react_dict(guild)
+        else:
+            known_discord_teams, harvested = await asyncio.gather(
+                APIRequest.get("/team/all"),
+                self.harvest_reactions(channel, match_planning_dict["Message-IDs"])
+            )
+            if known_discord_teams.status != 200:
+                log.critical(f"Attempted to connect to the API, could not reach it!")
+                await ctx.send("Unable to connect to the API.")
+                return
+            discord_team_ids = self.team_role_ids(known_discord_teams.json)
+            days: dict = match_planning_dict["Days"]
+            react_dict, signed_up_teams = self.tally_signups(days, harvested, set(discord_team_ids))
 
         teams_not_signed_up = []
         for team_id in discord_team_ids:
             if team_id not in signed_up_teams:
-                if _team := guild.get_role(int(team_id)):
+                if _team := guild.get_role(team_id):
                     teams_not_signed_up.append(_team.name)
 
-        def write_csv(react_dict: dict, file_path: Path):
-            with open(file_path, "w+") as f:
-                headers = ["Times (EST)"] + list(react_dict.keys())
-                csv_writer = csv.writer(f, delimiter=',', quotechar='"')
-                csv_writer.writerow(headers)
-                sign_ups = {}
-                for day, times in react_dict.items():
-                    for time, teams in times.items():
-                        if not sign_ups.get(time):
-                            sign_ups[time] = []
-                        sign_ups[time].append("\n".join(teams))
+        # Rendering, an XLSX workbook especially, is CPU bound, so it is kept off the event loop
+        dump_file = await asyncio.get_running_loop().run_in_executor(None, self.render_dump, react_dict,
+                                                                     teams_not_signed_up, output_format)
+        if delete:
+            await ctx.send("This dump will be deleted in 60 seconds.", delete_after=60)
+            await ctx.send(file=dump_file, delete_after=60)
+        else:
+            await ctx.send(file=dump_file)
+        log.info(f"Dumped sign ups for {ctx.author}.")
 
-                for time, teams in sign_ups.items():
-                    row = [time] + teams
-                    csv_writer.writerow(row)
+    @plan.command(aliases=["s"])
+    async def signups(self, ctx: command.Context):
+        """Shows which teams have signed up for each day and time so far"""
+        if not ctx.guild:
+            await ctx.send(f"This command must be used in a discord server")
+            return
+        if not self.tally.ready:
+            await ctx.send(f"Sign ups are still being counted, try again in a moment.")
+            return
+        embed = self.bot.default_embed(title="Match Planning Sign Ups",
+                                       description=f"Teams signed up for this week's matches")
+        for day, times in self.tally.signups.items():
+            lines = []
+            for time, teams in times.items():
+                team_mentions = [role.mention for role_id in teams if (role := ctx.guild.get_role(role_id))]
+                lines.append(f"**{time}:** {', '.join(team_mentions) or '`None`'}")
+            embed.add_field(name=day, value="\n".join(lines) or "`None`", inline=False)
+        await ctx.send(embed=embed)
 
-                csv_writer.writerow([])
-                csv_writer.writerow(["Teams Not Signed Up"])
-                csv_writer.writerow(["\n".join(teams_not_signed_up)])
+    @staticmethod
+    def team_role_ids(teams: list[dict]) -> list[int]:
+        return [int(team["discord_id"]) for team in teams if team.get("discord_id")]
 
+    async def refresh_team_roles(self):
+        """Fetches the team roles again, picking up teams created since the tally was reconciled"""
+        if not self.tally.listening:
+            return
+        teams = await APIRequest.get("/team/all")  # Usually served from the API cache
+        if teams.status != 200:
+            log.warning(f"Could not refresh the sign up team roles, status: {teams.status}")
+            return
+        if self.tally.set_team_role_ids(self.team_role_ids(teams.json)):
+            self.tally.schedule_save()
 
+    def schedule_team_roles_refresh(self):
+        """Refreshes the team roles in the background, coalescing requests made while a refresh is under way"""
+        if self._team_roles_task is None or self._team_roles_task.done():
+            self._team_roles_task = asyncio.ensure_future(self.refresh_team_roles())
+
+    async def reconcile_signups(self):
+        """
+        Rebuilds the sign up tally from the sign up messages once the bot is ready, reaction events arriving in the
+        meantime are buffered and replayed over the rebuilt tally
+        """
+        await self.bot.wait_until_ready()
+        planning_dict = bot_config.config_dict["MFC-Guild"]["Match-Planning"]
+        message_ids = planning_dict["Message-IDs"]
+        channel = self.bot.get_channel(int(planning_dict["Channel-ID"]))
+        if not channel or not message_ids:
+            log.warning(f"Match planning sign ups could not be reconciled, no sign up messages were found")
+            return
+        if await self.tally.load(message_ids):
+            # Serve the saved tally while it is checked against the messages
+            self.tally.ready = True
+            log.debug(f"Loaded the saved sign up tally")
+        self.tally.begin_rebuild(message_ids, planning_dict["Days"])
+        try:
+            teams = await APIRequest.get("/team/all")
+            if teams.status != 200:
+                log.error(f"Could not reconcile sign ups, status: {teams.status}, json: {teams.json}")
+                return
+            try:
+                harvested = await self.harvest_reactions(channel, message_ids)
+            except discord.HTTPException as error:
+                log.error(f"Could not reconcile sign ups from the sign up messages, error: {error}")
+                return
+            self.tally.rebuild(message_ids, planning_dict["Days"], harvested, self.team_role_ids(teams.json))
+        finally:
+            self.tally.abort_rebuild()  # Stops buffering if the rebuild never happened, a no-op after it
+        await self.tally.save()
+        log.info(f"Reconciled the match planning sign ups")
 
-        loop = asyncio.get_event_loop()
-        file_path = Path("signups.csv")
-        await loop.run_in_executor(None, write_csv, react_dict, file_path)
+    def reaction_slot(self, payload: discord.RawReactionActionEvent) -> Optional[tuple[str, str]]:
+        if not self.tally.listening or payload.user_id == self.bot.user.id:
+            return None
+        days = bot_config.config_dict["MFC-Guild"]["Match-Planning"]["Days"]
+        return self.tally.slot(days, payload.message_id, str(payload.emoji))
 
-        if delete:
-            await ctx.send("This dump will be deleted in 60 seconds.", delete_after=60)
-            await ctx.send(file=discord.File(file_path), delete_after=60)
+    @listener()
+    async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent):
+        if not (slot := self.reaction_slot(payload)) or not payload.member or payload.member.bot:
+            return
+        # Applied before anything is awaited, so a quick removal of the reaction can't be handled before it
+        if self.tally.add(*slot, payload.user_id, (role.id for role in payload.member.roles)):
+            self.tally.schedule_save()
+        elif (*slot, payload.user_id) in self.tally.unmatched:
+            self.schedule_team_roles_refresh()  # The member may belong to a team created since the last refresh
+
+    @listener()
+    async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent):
+        if not (slot := self.reaction_slot(payload)):
+            return
+        if self.tally.remove(*slot, payload.user_id):
+            self.tally.schedule_save()
+
+    @listener()
+    async def on_raw_reaction_clear(self, payload: discord.RawReactionClearEvent):
+        if self.tally.listening and payload.message_id in self.tally.message_ids:
+            days = list(bot_config.config_dict["MFC-Guild"]["Match-Planning"]["Days"])
+            self.tally.clear(days[self.tally.message_ids.index(payload.message_id)])
+            self.tally.schedule_save()
+
+    @listener()
+    async def on_raw_reaction_clear_emoji(self, payload: discord.RawReactionClearEmojiEvent):
+        days = bot_config.config_dict["MFC-Guild"]["Match-Planning"]["Days"]
+        if self.tally.listening and (slot := self.tally.slot(days, payload.message_id, str(payload.emoji))):
+            self.tally.clear(*slot)
+            self.tally.schedule_save()
+
+    async def harvest_reactions(self, channel: discord.TextChannel, message_ids: list[int]) -> list[list[tuple]]:
+        """
+        Fetches the sign up messages and the users behind each of their reactions concurrently
+
+        Returns, per message in `message_ids` order, a list of (emoji, users) pairs for each reaction on it. Reaction
+        users come back as discord.User, without roles, for members missing from the member cache, they are resolved
+        to members through the guild index. Users that have left the guild stay as they are.
+        """
+        semaphore = asyncio.Semaphore(self.harvest_concurrency)
+
+        async def bounded(coroutine):
+            async with semaphore:
+                return await coroutine
+
+        messages = await asyncio.gather(*(bounded(channel.fetch_message(int(message_id)))
+                                          for message_id in message_ids))
+        reactions = [(message_index, reaction) for message_index, message in enumerate(messages)
+                     for reaction in message.reactions]
+        reaction_users = await asyncio.gather(*(bounded(reaction.users().flatten()) for _, reaction in reactions))
+
+        if uncached := {user.id for users in reaction_users for user in users if not hasattr(user, "roles")}:
+            members = await self.bot.guild_index.resolve_members(channel.guild, uncached)
+            reaction_users = [[members.get(user.id, user) for user in users] for users in reaction_users]
+
+        harvested = [[] for _ in messages]
+        for (message_index, reaction), users in zip(reactions, reaction_users):
+            harvested[message_index].append((str(reaction.emoji), users))
+        return harvested
+
+    @staticmethod
+    def tally_signups(days: dict, harvested: list[list[tuple]], team_role_ids: set[int]) -> tuple[dict, set[int]]:
+        """
+        Tallies which teams signed up for each day and time, linear in the total number of reactions
+
+        The nth harvested message is the nth day in `days`. Every reacting member signs each of their team roles up
+        for the time their emoji stands for. Returns the tally as {day: {time: [team names]}} along with the role
+        ids of every team that signed up, laid out as SignupTally.react_dict lays out the same sign ups: each team
+        once per time, in the order they signed up, and the times in the order of `days`.
+        """
+        day_names = list(days.keys())
+        emoji_times = {day: {emoji: time for time, emoji in times.items()} for day, times in days.items()}
+        react_dict = {}
+        signed_up_teams = set()
+        for day, reactions in zip(day_names, harvested):
+            slots = {time: {} for time in days[day]}  # The names of the teams signed up, by role id
+            times = emoji_times[day]
+            for emoji, users in reactions:
+                if (time := times.get(emoji)) is None:
+                    continue
+                for user in users:
+                    if getattr(user, "bot", False):
+                        continue
+                    # Users that have since left the guild come back as discord.User, without roles
+                    for role in getattr(user, "roles", ()):
+                        if role.id in team_role_ids:
+                            slots[time].setdefault(role.id, role.name)
+                            signed_up_teams.add(role.id)
+            react_dict[day] = {time: list(teams.values()) for time, teams in slots.items() if teams}
+        return react_dict, signed_up_teams
+
+    @staticmethod
+    def signup_rows(react_dict: dict, teams_not_signed_up: list[str]) -> list[list[str]]:
+        rows = [["Times (EST)"] + list(react_dict.keys())]
+        sign_ups = {}
+        for day, times in react_dict.items():
+            for time, teams in times.items():
+                if not sign_ups.get(time):
+                    sign_ups[time] = []
+                sign_ups[time].append("\n".join(teams))
+
+        for time, teams in sign_ups.items():
+            rows.append([time] + teams)
+
+        rows.append([])
+        rows.append(["Teams Not Signed Up"])
+        rows.append(["\n".join(teams_not_signed_up)])
+        return rows
+
+    def render_dump(self, react_dict: dict, teams_not_signed_up: list[str], output_format: str) -> discord.File:
+        """Renders the sign ups into an in memory file, nothing is written to disk. Run in an executor"""
+        buffer = io.BytesIO()
+        if output_format == "json":
+            buffer.write(orjson.dumps({"signups": react_dict, "teams_not_signed_up": teams_not_signed_up},
+                                      option=orjson.OPT_INDENT_2))
+        elif output_format == "xlsx":
+            import openpyxl
+            workbook = openpyxl.Workbook()
+            worksheet = workbook.active
+            worksheet.title = "Sign Ups"
+            for row in self.signup_rows(react_dict, teams_not_signed_up):
+                worksheet.append(row)
+            workbook.save(buffer)
         else:
-            await ctx.send(file=discord.File(file_path))
-        os.remove(file_path)
-        log.info(f"Dumped sign ups for {ctx.author}.")
+            text = io.StringIO(newline="")
+            csv_writer = csv.writer(text, delimiter=',', quotechar='"')
+            csv_writer.writerows(self.signup_rows(react_dict, teams_not_signed_up))
+            buffer.write(text.getvalue().encode("utf-8"))
+        buffer.seek(0)
+        return discord.File(buffer, filename=f"signups.{output_format}")
 
     async def post_match_planning(self):
         log.info(f"Posting Match Planning")
@@ -157,8 +571,9 @@ class MatchPlanning(BaseCog):
                 return
             timezone = planning_dict["Timezone"]
             plan_days = planning_dict["Days"]
-            output_messages = [await channel.send(ping_role.mention + " Sign ups for this week."),
-                               await channel.send(f"__All times below are in {timezone}__"), ]
+            outbox = self.bot.outbox
+            output_messages = [await outbox.send(channel, content=ping_role.mention + " Sign ups for this week."),
+                               await outbox.send(channel, content=f"__All times below are in {timezone}__"), ]
             react_messages = []
             error = False
             for day in plan_days.keys():
@@ -181,18 +596,20 @@ class MatchPlanning(BaseCog):
                     signup_message += f"{emoji} for {time} "
                 if error:
                     for message in output_messages:
-                        await message.delete()
-                    await channel.send(f"`A config error occurred in Match-Planning.`")
+                        await outbox.delete(message)
+                    await outbox.send(channel, content=f"`A config error occurred in Match-Planning.`")
                     return
 
-                message = await channel.send(embed=self.bot.default_embed(title=day, description=signup_message))
-                for emoji in emojis:
-                    await message.add_reaction(emoji)
+                message = await outbox.send(channel,
+                                            embed=self.bot.default_embed(title=day, description=signup_message))
+                await outbox.add_reactions(message, emojis)
                 output_messages.append(message)
                 react_messages.append(message)
 
             bot_config.config_dict["MFC-Guild"]["Match-Planning"]["Message-IDs"] = \
                 [react_message.id for react_message in react_messages]
+            self.tally.reset([react_message.id for react_message in react_messages], plan_days)
+            self.bot.loop.create_task(self.reconcile_signups())
 
             await bot_config.write(bot_config.config_dict)
             return True
@@ -1,21 +1,79 @@
+import asyncio
 import logging
 
-from datetime import datetime
-from datetime import timedelta
+from itertools import islice
+from typing import Iterable
+from typing import Optional
 
 import discord
 
 from Bot import APIRequest
+from Bot import stats_path
 from Bot.Cogs import BaseCog
 from Bot.Cogs import command
 from Bot.Config.Permissions import Permissions
+from Bot.Outbox import Priority
+from Bot.Stats import LeaderboardIndex
+from Bot.Stats import MatchStatsStore
+from Bot.Stats import calculate_player_data
+from Bot.Stats import leaderboard_keys
 
 log = logging.getLogger(__name__)
 
 
+class PlayerResolver:
+    """
+    Resolves API player ids to their API json, issuing at most `concurrency` lookups at once
+
+    The API has no bulk player endpoint, so lookups fan out over `/player/id`. Set `Player.player_resolver` to a
+    subclass overriding `resolve` to stand in for the API.
+    """
+
+    def __init__(self, concurrency: int = 10):
+        self.concurrency = concurrency
+
+    async def fetch(self, api_id) -> Optional[dict]:
+        response = await APIRequest.get(f"/player/id?id={api_id}")
+        if response.status != 200:
+            log.info(f"Could not look up player by API id \"{api_id}\", status code: {response.status}")
+            return None
+        return response.json
+
+    async def resolve(self, api_ids: list) -> dict:
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded_fetch(api_id):
+            async with semaphore:
+                return await self.fetch(api_id)
+
+        results = await asyncio.gather(*(bounded_fetch(api_id) for api_id in api_ids))
+        return {api_id: result for api_id, result in zip(api_ids, results) if result}
+
+    async def resolve_ranked(self, ranked_ids: Iterable, amount: int) -> list[tuple]:
+        """
+        Resolves ranked ids in order until `amount` of them resolved, returning (api id, json) pairs in rank order
+
+        Each pass only fetches as many ids as are still missing, so failed lookups are topped up from further down
+        the ranking instead of fetching the whole ranking up front.
+        """
+        ranked_ids = iter(ranked_ids)
+        resolved = []
+        while len(resolved) < amount:
+            batch = list(islice(ranked_ids, amount - len(resolved)))
+            if not batch:
+                break
+            players = await self.resolve(batch)
+            resolved.extend((api_id, players[api_id]) for api_id in batch if api_id in players)
+        return resolved
+
+
 class Player(BaseCog):
     base_endpoint = "/player"
 
+    player_resolver = PlayerResolver()
+
+    stats_store = MatchStatsStore(stats_path)
+
     cached_match_stats = {}
 
     async def lookup_player_discord_id(self, discord_id: int):
@@ -35,6 +93,7 @@ class Player(BaseCog):
             return None
 
     @command.group(aliases=["p"])
+    @APIRequest.is_available()
     async def player(self, ctx: command.Context):
         """A group containing all MFC player related commands"""
 
@@ -50,8 +109,8 @@ class Player(BaseCog):
                            f"To rectify this please join a MFC server and type `!register`")
             return
         if discord_id := player["discord_id"]:
-            guild: discord.Guild = ctx.guild
-            if existing_player := await guild.get_member(discord_id):
+            existing_members = await self.bot.guild_index.resolve_members(ctx.guild, [discord_id])
+            if existing_player := existing_members.get(int(discord_id)):
                 await ctx.send(f"The player {existing_player.name} has already been assigned that playfab id!")
                 return
         response = await APIRequest.post(
@@ -90,111 +149,64 @@ class Player(BaseCog):
                 return
 
     async def calculate_player_data(self, matches: list[dict]) -> dict:
-
-        players = {}
-        for match in matches:
-            for set in match["sets"]:
-                for _round in set["rounds"]:
-                    team1_list: list = _round["team1_players"] or []
-                    team2_list: list = _round["team2_players"] or []
-                    team1_list.extend(team2_list)
-                    combined = team1_list
-                    for player in combined:
-                        if not players.get(player["player_id"], None):
-                            players[player["player_id"]] = {
-                                "score": 0,
-                                "kills": 0,
-                                "assists": 0,
-                                "deaths": 0
-                            }
-                        player_dict = players[player["player_id"]]
-                        player_dict["score"] += player["score"]
-                        player_dict["kills"] += player["kills"]
-                        player_dict["assists"] += player["assists"]
-                        player_dict["deaths"] += player["deaths"]
-                        kills = player_dict["kills"]
-                        assists = player_dict["assists"]
-                        deaths = player_dict["deaths"]
-                        if deaths == 0:
-                            player_dict["kda"] = 99999
-                            player_dict["kd"] = 99999
-                        else:
-                            player_dict["kda"] = round((kills + assists) / deaths, 2)  # ???
-                            player_dict["kd"] = round(kills / deaths, 2)  # ??? very strange int warning... idgaf
-
-        return players
+        return calculate_player_data(matches)
 
     @player.command(aliases=["t"], name="top")
     async def top_of_time_range(self, ctx: command.Context, time_range: str, top_of_type: str, amount: int = 10):
         """Gets the top 10 players of each time range and type and how many players stats to list out (amount)"""
-        current_time = datetime.utcnow()
-        time_ranges = {
-            "day": lambda: current_time - timedelta(days=1),
-            "week": lambda: current_time - timedelta(days=7),
-            "month": lambda: current_time - timedelta(days=30),
-            "all": "NO ACTION"
-        }
+        time_ranges = self.stats_store.windows
         time_range = time_range.casefold().strip()
-        if not time_ranges.get(time_range, None):
+        if time_range not in time_ranges:
             await ctx.send(f"The time range argument MUST be one of the following: "
                            f"{', '.join(range.capitalize() for range in time_ranges.keys())}")
             return
 
-        top_of_types = ("kd", "kda", "score", "kills", "deaths", "assists")
+        top_of_types = leaderboard_keys
         top_of_type = top_of_type.strip().casefold()
         if not top_of_type in top_of_types:
             await ctx.send(f"The top of type argument MUST be one of the following: "
                            f"{', '.join(top_type.capitalize() for top_type in top_of_types)}")
             return
-        start_time = current_time
-        if time_range != "all":
-            end_time = time_ranges.get(time_range)()
-            match_data = await APIRequest.get(f"/match/all?start_time={start_time}?end_time={end_time}")
-        else:
-            match_data = await APIRequest.get(f"/match/all")
-        if match_data.status != 200:
+        if not await self.stats_store.refresh():
             await ctx.send(f"Could not get data from the API, something has gone wrong!")
-            log.error(f"Could not reach the API, status: {match_data.status}, json: {match_data.json}")
             return
 
-        player_data = await self.calculate_player_data(match_data.json)
-        top_of_key_embeds = await self.top_of_key(ctx.guild, stats=player_data, key_name=top_of_type, amount=amount)
-        for embed in top_of_key_embeds:
-            await ctx.send(embed=embed)
+        leaderboard = self.stats_store.leaderboard(time_range, top_of_type)
+        top_of_key_embeds = await self.top_of_key(ctx.guild, leaderboard=leaderboard, amount=amount)
+        await self.bot.outbox.send_embeds(ctx.channel, top_of_key_embeds, Priority.INTERACTIVE)
 
-    async def top_of_key(self, guild: discord.Guild, stats: dict, key_name: str, amount: int = 10) -> \
+    async def top_of_key(self, guild: discord.Guild, leaderboard: LeaderboardIndex, amount: int = 10) -> \
             list[discord.Embed]:
 
         player_field_data: dict[int: list[list[str, str]]] = {}
 
-        players_added = 0
-        # Could use enumerate instead of tracking above
-        for player_api_data in reversed(sorted(stats.items(), key=lambda stat: stat[1][key_name])):
-            if players_added == amount:
-                break
-            api_id = player_api_data[0]
-            data = player_api_data[-1]
-            api_player = await APIRequest.get(f"/player/id?id={api_id}")
-            if api_player.status != 200:
-                continue
-            player_discord_id = api_player.json["discord_id"]
+        stats = leaderboard.stats
+        key_name = leaderboard.key_name
+        ranked_players = await self.player_resolver.resolve_ranked(leaderboard.ranked(), amount)
+        guild_index = self.bot.guild_index
+        members = await guild_index.resolve_members(guild, [player["discord_id"] for _, player in ranked_players
+                                                            if player["discord_id"]])
+
+        for players_added, (api_id, api_player) in enumerate(ranked_players, start=1):
+            player_discord_id = api_player["discord_id"]
             if not player_discord_id:
-                player_name = str(api_player.json["player_name"][:10])
+                player_name = str(api_player["player_name"][:10])
+            elif discord_player := members.get(int(player_discord_id)):
+                player_name = discord_player.mention
             else:
-                discord_player = guild.get_member(player_discord_id)
-                if not discord_player:
-                    discord_player = await guild.fetch_member(int(player_discord_id))
-                    if not discord_player:
-                        discord_player = '`' + str(api_player.json["player_name"][:10]) + '`'
-                    else:
-                        discord_player = discord_player.mention
-                else:
-                    discord_player = discord_player.mention
-                player_name = discord_player
-            players_added += 1
+                player_name = '`' + str(api_player["player_name"][:10]) + '`'
             if not player_field_data.get(players_added, None):
                 player_field_data[players_added] = []
-            player_field_data[players_added].append([player_name, data[key_name]])
+            player_field_data[players_added].append([player_name, stats[api_id][key_name]])
+
+        render_key = ("top_of_key", key_name, amount, tuple(
+            (ranking, player_name, value) for ranking, players in player_field_data.items()
+            for player_name, value in players
+        ))
+        return self.bot.render_embeds(render_key, lambda: self.top_of_key_embeds(player_field_data, key_name, amount))
+
+    def top_of_key_embeds(self, player_field_data: dict[int, list[list]], key_name: str, amount: int) -> \
+            list[discord.Embed]:
 
         def generic_embed(player_position, player_names, player_data):
             description =f"{key_name.capitalize()} rankings for the top `{amount}` players\n\n"
@@ -243,17 +255,10 @@ class Player(BaseCog):
                       f"json: \"{player_lookup.json}\"")
             return
         player_id = player_lookup.json["id"]
-        player_rounds = await APIRequest.get(f"/match/all")
-        if player_rounds.status != 200:
-            if player_rounds.status == 404:
-                await ctx.send(f"Was unable to find rounds for that player...")
-                return
+        if not await self.stats_store.refresh():
             await ctx.send(f"Unable to receive data from the API, something has gone wrong!")
-            log.error(f"Unable to retrieve data from the API, status: \"{player_lookup.status}\", "
-                      f"json: \"{player_lookup.json}\"")
         else:
-            stats_calculated = await self.calculate_player_data(player_rounds.json)
-            stats_calculated = stats_calculated.get(player_id, None)
+            stats_calculated = self.stats_store.player_stats(player_id)
             if not stats_calculated:
                 await ctx.send("Was unable to fetch data for that member...")
                 return
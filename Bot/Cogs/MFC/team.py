@@ -1,14 +1,15 @@
-import asyncio
 import logging
 
 import discord
-from discord.ext import tasks
 
 from Bot import APIRequest, bot_config
 from Bot.Cogs import BaseCog
 from Bot.Cogs import command
 from Bot.Cogs import listener
 from Bot.Config.Permissions import Permissions
+from Bot.Outbox import Priority
+from Bot.Scheduler import LeadershipLost
+from Bot.Scheduler import ensure_leader
 
 log = logging.getLogger(__name__)
 
@@ -16,11 +17,20 @@ log = logging.getLogger(__name__)
 class Team(BaseCog):
     embed_loop_team_json = {}
 
+    board_interval = 600
+
+    board_jitter = 30
+
     def __init__(self, bot):
-        bot.loop.create_task(self.embed_teams_loop(), name="embed_team_loop")
+        self.board_channel_id = None
+        self.board_messages: list[discord.Message] = []
+        self.board_signatures: list[tuple] = []
+        bot.scheduler.every(self.board_interval, self.embed_teams_job, name="team_board", jitter=self.board_jitter,
+                            owner=self, singleton=True)
         super().__init__(bot)
 
     @command.group(aliases=["t"])
+    @APIRequest.is_available()
     async def team(self, ctx: command.Context):
         """A group containing all MFC team related commands"""
 
@@ -56,18 +66,15 @@ class Team(BaseCog):
             await ctx.send(f"Could not find that team!")
             return
 
+        players = team_lookup.json["players"]
+        members = await self.bot.guild_index.resolve_members(ctx.guild, [player["discord_id"] for player in players
+                                                                          if player["discord_id"]])
         players_text_field = ""
-        for player in team_lookup.json["players"]:
-            player_discord_id = int(player["discord_id"])
-            if not player_discord_id:
-                player_name = '`' + str(player["player_name"]) + '`'
+        for player in players:
+            if member := members.get(int(player["discord_id"] or 0)):
+                player_name = member.mention
             else:
-                guild: discord.Guild = ctx.guild
-                member = guild.get_member(player_discord_id)
-                if member:
-                    player_name = member.mention
-                else:
-                    player_name = '`' + str(player["player_name"]) + '`'
+                player_name = '`' + str(player["player_name"]) + '`'
             players_text_field += f"{player_name}\n"
 
         embed = self.bot.default_embed(title=f"{team.name} Roster",
@@ -155,36 +162,108 @@ class Team(BaseCog):
         await player.remove_roles(team)
         await ctx.send(f"Removed {player.mention} from {team.mention}")
 
-    @tasks.loop(seconds=600)
-    async def embed_teams_loop(self):
-        while True:
-            await asyncio.sleep(600)  # sleep for 10 minutes
-            text_channel_id = bot_config.config_dict["MFC-Guild"]["Automated-ELO-Output"]["Channel-ID"]
-            channel: discord.TextChannel = self.bot.get_channel(int(text_channel_id))
-            if not channel or type(channel) is not discord.TextChannel:
-                log.error(f"Incorrect channel ID passed for Automated-ELO-Output")
-            else:
+    async def embed_teams_job(self):
+        text_channel_id = bot_config.config_dict["MFC-Guild"]["Automated-ELO-Output"]["Channel-ID"]
+        channel: discord.TextChannel = self.bot.get_channel(int(text_channel_id))
+        if not channel or type(channel) is not discord.TextChannel:
+            log.error(f"Incorrect channel ID passed for Automated-ELO-Output")
+        else:
+            await self.update_team_board(channel)
+
+    @staticmethod
+    def embed_signature(embed: discord.Embed) -> tuple:
+        """The parts of an embed the team board renders, used to tell if a posted board embed is out of date"""
+        return (embed.title,
+                embed.description,
+                getattr(embed.colour, "value", None),
+                (embed.author.name, embed.author.url, embed.author.icon_url),
+                embed.thumbnail.url,
+                (embed.footer.text, embed.footer.icon_url),
+                tuple((field.name, field.value, field.inline) for field in embed.fields))
+
+    async def load_team_board(self, channel: discord.TextChannel) -> bool:
+        """Loads the board messages recorded in the config, returns False if any of them no longer exist"""
+        message_ids = bot_config.config_dict["MFC-Guild"]["Automated-ELO-Output"].get("Message-IDs") or []
+        if not message_ids:
+            return False
+        board_messages = []
+        for message_id in message_ids:
+            try:
+                message = await channel.fetch_message(int(message_id))
+            except (discord.NotFound, discord.Forbidden):
+                log.info(f"The ELO board message {message_id} is missing, the board will be reposted")
+                return False
+            if not message.embeds:
+                return False
+            board_messages.append(message)
+        self.board_messages = board_messages
+        self.board_signatures = [self.embed_signature(message.embeds[0]) for message in board_messages]
+        return True
+
+    async def update_team_board(self, channel: discord.TextChannel) -> bool:
+        """
+        Brings the ELO board in the channel up to date, editing only the embeds whose content changed
+
+        Messages are only sent or deleted when the number of board pages changes, an unchanged board makes no writes.
+        """
+        embeds = await self.render_team_embeds(channel.guild)
+        if embeds is None:
+            return False
+        if self.board_channel_id != channel.id:
+            self.board_messages = []
+            self.board_signatures = []
+            self.board_channel_id = channel.id
+            if not await self.load_team_board(channel):
+                ensure_leader()  # The purge does not go through the outbox, which checks before every other write
                 await channel.purge()
-                await self.embed_teams(channel)
 
-    async def embed_teams(self, channel: discord.TextChannel):
-        guild: discord.Guild = channel.guild
+        previous_ids = [message.id for message in self.board_messages]
+        signatures = [self.embed_signature(embed) for embed in embeds]
+        try:
+            for page, (embed, signature) in enumerate(zip(embeds, signatures)):
+                if page < len(self.board_messages):
+                    if self.board_signatures[page] != signature:
+                        await self.bot.outbox.edit(self.board_messages[page], embed=embed)
+                        self.board_signatures[page] = signature
+                else:
+                    self.board_messages.append(await self.bot.outbox.send(channel, embed=embed))
+                    self.board_signatures.append(signature)
+            for message in self.board_messages[len(embeds):]:
+                await self.bot.outbox.delete(message)
+        except discord.NotFound:
+            # Someone removed a board message by hand, repost the whole board on the next update
+            log.warning(f"An ELO board message was deleted outside of the bot, the board will be reposted")
+            self.board_channel_id = None
+            bot_config.config_dict["MFC-Guild"]["Automated-ELO-Output"]["Message-IDs"] = []
+            await bot_config.write(bot_config.config_dict)
+            return False
+        except LeadershipLost:
+            self.board_channel_id = None  # The next leader may change the board, load it again before the next update
+            raise
+        del self.board_messages[len(embeds):]
+        del self.board_signatures[len(embeds):]
+
+        if [message.id for message in self.board_messages] != previous_ids:
+            bot_config.config_dict["MFC-Guild"]["Automated-ELO-Output"]["Message-IDs"] = \
+                [message.id for message in self.board_messages]
+            await bot_config.write(bot_config.config_dict)
+        return True
+
+    async def render_team_embeds(self, guild: discord.Guild):
+        """Renders the team board embeds from the API's teams, returns None if the API could not be reached"""
         team_lookup = await APIRequest.get(f"/team/all")
         if team_lookup.status != 200:
             log.error((f"Could not list teams, status: \"{team_lookup.status}\", json: \"{team_lookup.json}\""))
-            return False
+            return None
         unsorted_teams: [int, list[str]] = {}
         self.embed_loop_team_json = team_lookup.json
+        guild_index = self.bot.guild_index
+        roles = await guild_index.resolve_roles(guild, [team["discord_id"] for team in team_lookup.json
+                                                        if team["discord_id"]])
         for team in team_lookup.json:
             team: dict
             discord_id = team["discord_id"]
-            role = guild.get_role(int(discord_id))
-            if not role:
-                for role in await guild.fetch_roles():
-                    if role.id == discord_id:
-                        role = role
-                        break
-            if role:
+            if role := roles.get(int(discord_id or 0)):
                 role: discord.Role
                 elo = int(team["elo"])
                 if not unsorted_teams.get(elo, None):
@@ -196,6 +275,11 @@ class Team(BaseCog):
                             f"for id {team['discord_id']} was not found!")
 
         total_teams = len(team_lookup.json)
+        render_key = ("team_board", total_teams, tuple((elo, tuple(teams)) for elo, teams in unsorted_teams.items()))
+        return self.bot.render_embeds(render_key, lambda: self.team_embeds(unsorted_teams, total_teams))
+
+    def team_embeds(self, unsorted_teams: dict[int, list[str]], total_teams: int) -> list[discord.Embed]:
+        """Lays out the team mentions, grouped by ELO, over as many board embeds as they need"""
 
         def get_team_embed(team_pos_text, team_name_text, elo_text):
             embed = self.bot.default_embed(title="MFC Teams",
@@ -235,8 +319,13 @@ class Team(BaseCog):
 
         if team_position_field_text and team_name_field_text and team_elo_text:
             embeds.append(get_team_embed(team_position_field_text, team_name_field_text, team_elo_text))
-        for embed in embeds:
-            await channel.send(embed=embed)
+        return embeds
+
+    async def embed_teams(self, channel: discord.TextChannel):
+        embeds = await self.render_team_embeds(channel.guild)
+        if embeds is None:
+            return False
+        await self.bot.outbox.send_embeds(channel, embeds, Priority.INTERACTIVE)
         return True
 
     @team.command(aliases=["l"])
@@ -1,9 +1,10 @@
+import asyncio
 import importlib
-import pkgutil
-import json
 
 import logging
 
+from typing import Iterable
+
 from Bot import Bot
 
 from discord.ext import commands
@@ -12,35 +13,62 @@ from discord.ext.commands import Cog
 
 log = logging.getLogger(__name__)
 
+# The modules holding the cogs of each group, in load order. Only the modules listed here are imported at startup, a
+# new cog's module must be added to its group.
+cog_manifest = {
+    "general": (
+        "Bot.Cogs.search",
+        "Bot.Cogs.stats"
+    ),
+    "mfc": (
+        "Bot.Cogs.MFC.team",
+        "Bot.Cogs.MFC.player",
+        "Bot.Cogs.MFC.match_planning"
+    )
+}
+
 
 class BaseCog(commands.Cog):
 
     def __init__(self, bot: Bot):
         self.bot = bot
 
+    def cog_unload(self):
+        """Cancels every scheduler job the cog registered"""
+        self.bot.scheduler.cancel(owner=self)
+
+    @staticmethod
+    def module_cogs(module) -> list[type]:
+        """The cogs defined in a module, rather than imported into it"""
+        return [member for member in vars(module).values()
+                if isinstance(member, type) and issubclass(member, BaseCog) and member is not BaseCog
+                and member.__module__ == module.__name__]
+
+    @staticmethod
+    def load_module(bot: Bot, module_name: str) -> None:
+        for cog in BaseCog.module_cogs(importlib.import_module(module_name)):
+            bot.add_cog(cog(bot))
+            log.info(f"Loaded cog: {cog.__name__} ({module_name})")
+
     @staticmethod
-    def find_subclasses(package: str = "Bot.Cogs", recursive: bool = True) -> None:
-        """ Import all submodules of a module, recursively, including subpackages
-
-        Credit to: https://stackoverflow.com/a/25562415/13079078, Mr. B on stackoverflow
-
-        :param recursive: bool
-        :param package: package (name or actual module)
-        :type package: str | module
-        """
-        if isinstance(package, str):
-            package = importlib.import_module(package)
-        for loader, name, is_pkg in pkgutil.walk_packages(package.__path__):
-            full_name = package.__name__ + '.' + name
-            importlib.import_module(full_name)
-            if recursive and is_pkg:
-                BaseCog.find_subclasses(full_name, recursive)
+    def group_modules(groups: Iterable[str]) -> list[str]:
+        modules = []
+        for group in groups:
+            if group not in cog_manifest:
+                log.warning(f"There is no cog group named {group}, the groups are: {', '.join(cog_manifest)}")
+                continue
+            modules.extend(cog_manifest[group])
+        return modules
 
     @staticmethod
-    def load_cogs(bot: Bot) -> None:
-        for subclass in BaseCog.__subclasses__():
-            bot.add_cog(subclass(bot))
-            log.info(f"Loaded cog: {subclass.__name__} ({subclass.__module__})")
+    async def load_modules_lazily(bot: Bot, module_names: list[str]) -> None:
+        """Imports the modules on a worker thread, so the loop keeps serving while they load, then adds their cogs"""
+        for module_name in module_names:
+            try:
+                await asyncio.get_running_loop().run_in_executor(None, importlib.import_module, module_name)
+                BaseCog.load_module(bot, module_name)
+            except Exception:
+                log.exception(f"Could not load the cogs of {module_name}")
 
 
 command = commands
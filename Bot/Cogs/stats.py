@@ -0,0 +1,87 @@
+from Bot import APIRequest
+from Bot import bot_config
+from Bot.API import CircuitState
+from Bot.Cogs import BaseCog
+from Bot.Cogs import command
+from Bot.Config.Permissions import Permissions
+
+
+def timing_lines(histograms: dict, amount: int = 8) -> str:
+    """The `amount` most used keys with their count, mean, p50 and p95, slowest p95 first"""
+    busiest = sorted(histograms.items(), key=lambda item: item[1].count, reverse=True)[:amount]
+    lines = []
+    for key, histogram in sorted(busiest, key=lambda item: item[1].quantile(0.95), reverse=True):
+        name = " ".join(key) if isinstance(key, tuple) else key
+        lines.append(f"`{name[:60]}` x{histogram.count}: mean `{histogram.mean * 1000:.0f}ms`, "
+                     f"p50 `{histogram.quantile(0.5) * 1000:.0f}ms`, p95 `{histogram.quantile(0.95) * 1000:.0f}ms`")
+    return "\n".join(lines)[:1024] or "None yet"
+
+
+def hit_rate(hits: int, misses: int) -> str:
+    return f"{hits / (hits + misses):.0%}" if hits + misses else "n/a"
+
+
+class Stats(BaseCog):
+
+    @command.group(name="stats")
+    async def stats(self, ctx: command.Context):
+        """A group containing the bot's own statistics"""
+
+    @stats.command(name="perf")
+    @Permissions.is_permitted()
+    async def performance(self, ctx: command.Context):
+        """Shows command, API and Discord timings and the state of the bot's caches and queues"""
+        metrics = self.bot.metrics
+        api_calls = sum(histogram.sum for histogram in metrics.command_api_calls.values())
+        invocations = sum(histogram.count for histogram in metrics.command_api_calls.values())
+        failed = sum(count for (_, outcome), count in metrics.command_outcomes.items() if outcome == "failed")
+        api_errors = sum(count for (_, _, status), count in metrics.api_statuses.items()
+                         if status in ("error", "timeout"))
+        discord_errors = sum(count for (_, _, status), count in metrics.discord_statuses.items() if status != "ok")
+
+        cache = APIRequest.cache_stats()
+        single_flight = APIRequest.single_flight_stats()
+        resilience = APIRequest.resilience_stats()
+        outbox = self.bot.outbox.stats()
+        renders = self.bot.embed_renders.stats()
+        guild_index = self.bot.guild_index.stats()
+        config = bot_config.stats()
+        jobs = self.bot.scheduler.stats()
+
+        embed = self.bot.default_embed(
+            title="Performance",
+            description=f"**Commands:** `{invocations}` run, `{failed}` failed, "
+                        f"`{api_calls / invocations if invocations else 0:.1f}` API requests each\n"
+                        f"**API errors:** `{api_errors}`, **Discord REST errors:** `{discord_errors}`"
+        )
+        embed.add_field(name="Commands", value=timing_lines(metrics.commands), inline=False)
+        embed.add_field(name="API endpoints", value=timing_lines(metrics.api), inline=False)
+        embed.add_field(name="Discord routes", value=timing_lines(metrics.discord, amount=5), inline=False)
+        circuit = f"`{CircuitState(resilience['state']).name.replace('_', ' ').lower()}`"
+        if resilience["retry_after"]:
+            circuit += f", probing the API in `{resilience['retry_after']:.0f}s`"
+        embed.add_field(name="API circuit",
+                        value=f"{circuit}\n"
+                              f"Opened `{resilience['opened']}` times, refused `{resilience['rejected']}` requests\n"
+                              f"Retried `{resilience['retried_gets']}` GETs, `{resilience['timeouts']}` timeouts")
+        embed.add_field(name="API cache",
+                        value=f"Hit rate `{hit_rate(cache['hits'], cache['misses'])}`\n"
+                              f"`{cache['entries']}` entries, `{cache['bytes'] / 1024:.0f}KiB`\n"
+                              f"Coalesced `{single_flight['coalesced']}` of "
+                              f"`{single_flight['issued'] + single_flight['coalesced']}` GETs")
+        embed.add_field(name="Outbox",
+                        value=f"`{outbox['queued']}` queued over `{outbox['channels']}` channels\n" + "\n".join(
+                            f"{route}: `{outbox['writes'][route]}`, waited `{wait * 1000:.0f}ms`"
+                            for route, wait in outbox["mean_queue_time"].items()))
+        embed.add_field(name="Caches",
+                        value=f"Embed renders hit rate `{hit_rate(renders['hits'], renders['misses'])}`\n"
+                              f"Guild index `{guild_index['guilds']}` guilds, "
+                              f"`{guild_index['rest_fallbacks']}` REST fallbacks\n"
+                              f"Config reloads `{config['reloads']}`, writes `{config['writes']}`")
+        embed.add_field(name="Jobs",
+                        value="\n".join(f"`{name}` runs `{job['runs']}`, failures `{job['failures']}`, "
+                                        f"mean `{job['mean_duration'] * 1000:.0f}ms`"
+                                        for name, job in jobs.items()) or "None scheduled",
+                        inline=False)
+        await ctx.send(embed=embed)
+
@@ -1,14 +1,11 @@
-import json
 import logging
 
 from discord.ext import commands
 
-from Bot import config_path
+from Bot import bot_config
 
 log = logging.getLogger(__name__)
 
-config_dict: dict = json.loads(open(config_path).read())
-
 
 class BasePerm:
 
@@ -17,14 +14,14 @@ class BasePerm:
 
 
 class Admin(BasePerm):
-    permitted_commands = config_dict["MFC-Guild"]["Admins"]["Commands"]
+    permitted_commands = bot_config.config_dict["MFC-Guild"]["Admins"]["Commands"]
 
     def __init__(self, role_id: int):
         super().__init__(role_id)
 
 
 class Moderator(BasePerm):
-    permitted_commands = config_dict["MFC-Guild"]["Moderators"]["Commands"]
+    permitted_commands = bot_config.config_dict["MFC-Guild"]["Moderators"]["Commands"]
 
     def __init__(self, role_id: int):
         super().__init__(role_id)
@@ -36,29 +33,77 @@ class CustomPerm(BasePerm):
         super().__init__(role_id)
 
 
+class PermissionIndex:
+    """
+    Maps each configured role id to the commands it permits, either a frozenset of command names or every command
+
+    A check intersects the member's role ids with the roles permitting the command, those roles are worked out once
+    per command. Results are memoised per (member role ids, command), the memo is dropped once it holds
+    `memo_size` results.
+    """
+    wildcard = "*"
+
+    memo_size = 4096
+
+    def __init__(self, perms: list[BasePerm]):
+        self.roles: dict[int, frozenset] = {}
+        for perm in perms:
+            self.roles[perm.id] = self.roles.get(perm.id, frozenset()) | frozenset(perm.permitted_commands)
+        self.wildcard_roles = frozenset(role_id for role_id, permitted in self.roles.items()
+                                        if self.wildcard in permitted)
+        self._command_roles: dict[str, frozenset] = {}
+        self._memo: dict[tuple[frozenset, str], bool] = {}
+
+    def command_roles(self, command_name: str) -> frozenset:
+        """Every role id permitted to run the command"""
+        if (role_ids := self._command_roles.get(command_name)) is None:
+            role_ids = self._command_roles[command_name] = self.wildcard_roles | frozenset(
+                role_id for role_id, permitted in self.roles.items() if command_name in permitted
+            )
+        return role_ids
+
+    def is_permitted(self, role_ids: frozenset, command_name: str) -> bool:
+        key = (role_ids, command_name)
+        if (permitted := self._memo.get(key)) is None:
+            if len(self._memo) >= self.memo_size:
+                self._memo.clear()
+            permitted = self._memo[key] = not role_ids.isdisjoint(self.command_roles(command_name))
+        return permitted
+
+
 class Permissions:
-    admins: list[Admin] = [Admin(int(role_id)) for role_id in config_dict["MFC-Guild"]["Admins"]["Ids"]]
-    moderators: list[Moderator] = [Moderator(int(role_id)) for role_id in config_dict["MFC-Guild"]["Moderators"]["Ids"]]
-    custom_roles: list[CustomPerm] = [CustomPerm(role_id=int(role_id), permitted_commands=perms) for role_id, perms, in
-                                      config_dict["MFC-Guild"]["Custom-Role-Perm"].items()]
+    admins: list[Admin] = []
+    moderators: list[Moderator] = []
+    custom_roles: list[CustomPerm] = []
+    index = PermissionIndex([])
+
+    @classmethod
+    def rebuild(cls, config_dict: dict):
+        """Rebuilds the configured roles and the permission index, run again whenever the config is reloaded"""
+        guild_config = config_dict["MFC-Guild"]
+        Admin.permitted_commands = guild_config["Admins"]["Commands"]
+        Moderator.permitted_commands = guild_config["Moderators"]["Commands"]
+        cls.admins = [Admin(int(role_id)) for role_id in guild_config["Admins"]["Ids"]]
+        cls.moderators = [Moderator(int(role_id)) for role_id in guild_config["Moderators"]["Ids"]]
+        cls.custom_roles = [CustomPerm(role_id=int(role_id), permitted_commands=perms) for role_id, perms, in
+                            guild_config["Custom-Role-Perm"].items()]
+        cls.index = PermissionIndex(cls.admins + cls.moderators + cls.custom_roles)
 
     @staticmethod
     def is_permitted():
         async def predicate(ctx: commands.Context):
             command_name = str(ctx.command)
             member = ctx.author
-            check_roles = [Permissions.admins, Permissions.moderators, Permissions.custom_roles]
             if ctx.guild:
-                for internal_role in check_roles:
-                    for role in internal_role:
-                        for discord_role in member.roles:
-                            if role.id == discord_role.id and \
-                                    ("*" in role.permitted_commands or command_name in role.permitted_commands):
-                                log.info(
-                                    f"{ctx.author} ({ctx.author.id}) passed the necessary permissions check to run the "
-                                    f"command \"{ctx.command}\""
-                                )
-                                return True
+                role_ids = frozenset(discord_role.id for discord_role in member.roles)
+                if Permissions.index.is_permitted(role_ids, command_name):
+                    log.info("%s (%s) passed the necessary permissions check to run the command \"%s\"",
+                             ctx.author, ctx.author.id, command_name)
+                    return True
             return False
 
         return commands.check(predicate)
+
+
+Permissions.rebuild(bot_config.config_dict)
+bot_config.subscribe(Permissions.rebuild)
@@ -1,18 +1,272 @@
-import json
+import asyncio
+import logging
+import os
+
+from pathlib import Path
+from typing import Callable
+from typing import Optional
+
 import aiofiles
+import orjson
+
+log = logging.getLogger(__name__)
+
+
+async def write_atomically(path: Path, data: bytes):
+    """
+    Writes `data` to a temporary file beside `path`, fsyncs it and replaces `path` with it, so a crash mid write leaves
+    the previous file in place. The temporary file is named after the process, so processes writing the same file
+    never write into each other's, the last replace wins.
+    """
+    path = Path(path)
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        async with aiofiles.open(temp_path, "wb") as f:
+            await f.write(data)
+            await f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except OSError:
+        temp_path.unlink(missing_ok=True)
+        raise
 
 
 class Config:
+    """
+    The bot's configuration, loaded from config.json and reloaded whenever the file changes
+
+    `watch` polls the file every `poll_interval` seconds. When another process changes it the file is read again and
+    every callback registered with `subscribe` is handed the new config, so dependents such as the permission index
+    rebuild without a restart.
+
+    `write` only marks the config dirty and the latest config is written `write_delay` seconds after the first pending
+    change, so a burst of changes is coalesced into a single write. Each write goes to a temporary file beside
+    config.json that replaces it atomically, so a crash mid write leaves the previous config in place.
+
+    Callbacks registered with `subscribe_writes` run after each write this process makes, so other processes sharing
+    the file can be told to `refresh` rather than waiting for their next poll.
+
+    The file is only read once the config is first used, so constructing a Config costs nothing at import time.
+    """
 
-    def __init__(self, config_path):
-        self.config_path = config_path
-        self.config_dict = json.loads(open(config_path).read())
-        self.prefix = self.config_dict["MFC-Guild"]["Prefix"]
+    # Every key the bot reads from the config, with its type, a reloaded config missing any of them is rejected
+    schema = {
+        "Embed-Color": {"r": int, "g": int, "b": int},
+        "MFC-Guild": {
+            "Prefix": str,
+            "Admins": {"Ids": list, "Commands": list},
+            "Moderators": {"Ids": list, "Commands": list},
+            "Custom-Role-Perm": dict,
+            "Automated-ELO-Output": {"Channel-ID": (int, str)},
+            "Match-Planning": {
+                "Ping-Role": (int, str),
+                "Channel-ID": (int, str),
+                "Post-Day": str,
+                "Posted": bool,
+                "Timezone": str,
+                "Message-IDs": list,
+                "Days": dict
+            }
+        }
+    }
 
-    async def write(self, new_data: dict):
-        async with aiofiles.open(self.config_path, "w+", encoding="utf-8") as f:
-            await f.write(json.dumps(new_data, indent=4, ensure_ascii=False, allow_nan=True))
+    poll_interval = 5
+
+    write_delay = 1
+
+    def __init__(self, config_path: Path):
+        self.config_path = Path(config_path)
+        self.callbacks: list[Callable[[dict], None]] = []
+        self.write_callbacks: list[Callable[[], None]] = []
+        self.reloads = 0
+        self.writes = 0
+        self.coalesced_writes = 0
+        self._config_dict: Optional[dict] = None
+        self._file_signature: Optional[tuple[int, int]] = None
+        self._dirty = False
+        self._write_task: Optional[asyncio.Task] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._watch_task: Optional[asyncio.Task] = None
+
+    @property
+    def config_dict(self) -> dict:
+        if self._config_dict is None:
+            self._file_signature = self.file_signature()
+            self._config_dict = self.load()
+        return self._config_dict
+
+    @config_dict.setter
+    def config_dict(self, config_dict: dict):
+        self._config_dict = config_dict
+
+    @property
+    def prefix(self) -> str:
+        return self.config_dict["MFC-Guild"]["Prefix"]
+
+    def load(self) -> dict:
+        with open(self.config_path, "rb") as f:
+            return orjson.loads(f.read())
 
     async def read(self) -> dict:
-        async with aiofiles.open(self.config_path, encoding="utf-8", errors="ignore") as f:
-            return json.loads(await f.read())
+        async with aiofiles.open(self.config_path, "rb") as f:
+            return orjson.loads(await f.read())
+
+    def file_signature(self) -> Optional[tuple[int, int]]:
+        try:
+            stat = self.config_path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def subscribe(self, callback: Callable[[dict], None]):
+        """Registers a callback run with the new config every time the config file is reloaded"""
+        self.callbacks.append(callback)
+
+    def unsubscribe(self, callback: Callable[[dict], None]):
+        if callback in self.callbacks:
+            self.callbacks.remove(callback)
+
+    def subscribe_writes(self, callback: Callable[[], None]):
+        """Registers a callback run every time this process writes the config file"""
+        self.write_callbacks.append(callback)
+
+    def unsubscribe_writes(self, callback: Callable[[], None]):
+        if callback in self.write_callbacks:
+            self.write_callbacks.remove(callback)
+
+    @classmethod
+    def validate(cls, new_data) -> None:
+        """Raises ValueError if a config is missing what the bot needs to run, any key of `schema`"""
+        if not isinstance(new_data, dict):
+            raise ValueError("the config is not a JSON object")
+        cls.check_keys(new_data, cls.schema, "")
+
+    @classmethod
+    def check_keys(cls, data: dict, schema: dict, path: str):
+        for key, expected in schema.items():
+            key_path = f"{path}[{key}]"
+            if key not in data:
+                raise ValueError(f"the config has no {key_path}")
+            if isinstance(expected, dict):
+                if not isinstance(data[key], dict):
+                    raise ValueError(f"{key_path} of the config is not a JSON object")
+                cls.check_keys(data[key], expected, key_path)
+            elif not isinstance(data[key], expected):
+                raise ValueError(f"{key_path} of the config is a {type(data[key]).__name__}")
+
+    def run_callbacks(self, config_dict: dict) -> bool:
+        """Runs the reload callbacks with a config, returns False if any of them failed"""
+        succeeded = True
+        for callback in self.callbacks:
+            try:
+                callback(config_dict)
+            except Exception:
+                log.exception(f"A config reload callback, {callback}, failed")
+                succeeded = False
+        return succeeded
+
+    def apply(self, new_data: dict):
+        """
+        Installs a new config and runs the reload callbacks. A config failing `validate` is rejected untouched, one a
+        callback fails on is rejected and the previous config is installed again.
+        """
+        self.validate(new_data)
+        previous = self._config_dict
+        self.config_dict = new_data
+        if not self.run_callbacks(new_data) and previous is not None:
+            self.config_dict = previous
+            self.run_callbacks(previous)
+            raise ValueError("a config reload callback failed on it")
+
+    async def reload(self) -> bool:
+        """Reads the config file again and applies it, returns False if the file could not be parsed"""
+        signature = self.file_signature()
+        try:
+            new_data = await self.read()
+        except (OSError, orjson.JSONDecodeError) as error:
+            log.error(f"Could not reload the config at {self.config_path}, keeping the current config, error: {error}")
+            self._file_signature = signature
+            return False
+        self._file_signature = signature
+        try:
+            self.apply(new_data)
+        except ValueError as error:
+            log.error(f"The reloaded config at {self.config_path} is invalid, keeping the current config, "
+                      f"error: {error}")
+            return False
+        self.reloads += 1
+        log.info(f"Reloaded the config from {self.config_path}")
+        return True
+
+    def start_watching(self):
+        if self._watch_task is None or self._watch_task.done():
+            self._watch_task = asyncio.ensure_future(self.watch())
+
+    async def watch(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self.refresh()
+
+    async def refresh(self) -> bool:
+        """Reloads the config if the file changed since it was last read or written, returns True if it was reloaded"""
+        if self._dirty:
+            return False  # A pending write wins over edits made to the file in the meantime
+        if self.file_signature() == self._file_signature:
+            return False
+        return await self.reload()
+
+    async def write(self, new_data: dict = None):
+        """Schedules the config, or `new_data` in its place, to be written once no other write arrives for a while"""
+        if new_data is not None:
+            self.config_dict = new_data
+        if self._dirty:
+            self.coalesced_writes += 1
+        self._dirty = True
+        if self._write_task is None or self._write_task.done():
+            self._write_task = asyncio.ensure_future(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(self.write_delay)
+        await asyncio.shield(self.flush())  # Cancelling the delay must not interrupt a write already under way
+
+    async def flush(self):
+        """Writes the config now if a write is pending"""
+        if self._flush_lock is None:
+            self._flush_lock = asyncio.Lock()
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            self._dirty = False
+            try:
+                await write_atomically(self.config_path, orjson.dumps(self.config_dict, option=orjson.OPT_INDENT_2))
+            except OSError as error:
+                self._dirty = True
+                log.error(f"Could not write the config to {self.config_path}, error: {error}")
+                return
+            self._file_signature = self.file_signature()
+            self.writes += 1
+            for callback in self.write_callbacks:
+                try:
+                    callback()
+                except Exception:
+                    log.exception(f"A config write callback, {callback}, failed")
+
+    async def close(self):
+        if self._watch_task:
+            self._watch_task.cancel()
+        if self._write_task and not self._write_task.done():
+            self._write_task.cancel()
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "reloads": self.reloads,
+            "writes": self.writes,
+            "coalesced_writes": self.coalesced_writes
+        }
+
+
+__all__ = [
+    "write_atomically",
+    "Config"
+]
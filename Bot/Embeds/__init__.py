@@ -0,0 +1,81 @@
+from collections import OrderedDict
+from typing import Callable
+from typing import Hashable
+
+from discord import Color
+from discord import Embed
+
+
+class EmbedTemplate:
+    """
+    The colour, author, thumbnail and footer shared by every default embed, resolved once
+
+    `create` sets the template's parts on a new embed instead of resolving them again, `key` records the bot user and
+    config it was built from so a stale template can be told apart. The parts are kept as the arguments of Embed's
+    `set_author`, `set_thumbnail` and `set_footer`.
+    """
+
+    def __init__(self, key: Hashable, color: Color, author: dict, thumbnail: dict, footer: dict):
+        self.key = key
+        self.color = color
+        self.author = author
+        self.thumbnail = thumbnail
+        self.footer = footer
+
+    @classmethod
+    def build(cls, key: Hashable, color_rgb: dict, name: str, url: str, avatar_url: str, footer_text: str):
+        return cls(key,
+                   Color.from_rgb(r=color_rgb["r"], g=color_rgb["g"], b=color_rgb["b"]),
+                   {"name": name, "url": url, "icon_url": avatar_url},
+                   {"url": avatar_url},
+                   {"text": footer_text, "icon_url": avatar_url})
+
+    def create(self, **embed_kwargs) -> Embed:
+        embed_kwargs.setdefault("color", self.color)
+        embed = Embed(**embed_kwargs)
+        embed.set_author(**self.author)
+        embed.set_thumbnail(**self.thumbnail)
+        embed.set_footer(**self.footer)
+        return embed
+
+
+class RenderCache:
+    """
+    Remembers the embeds rendered for the last `max_size` inputs, least recently used first out
+
+    A renderer is only memoised if it always renders the same embeds from the same key. Cached embeds are shared
+    between callers and must not be changed once rendered.
+    """
+
+    def __init__(self, max_size: int = 64):
+        self.max_size = max_size
+        self.renders: OrderedDict[Hashable, list[Embed]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key: Hashable, render: Callable[[], list[Embed]]) -> list[Embed]:
+        if (embeds := self.renders.get(key)) is not None:
+            self.renders.move_to_end(key)
+            self.hits += 1
+            return embeds
+        self.misses += 1
+        embeds = self.renders[key] = render()
+        if len(self.renders) > self.max_size:
+            self.renders.popitem(last=False)
+        return embeds
+
+    def clear(self):
+        self.renders.clear()
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self.renders),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+__all__ = [
+    "EmbedTemplate",
+    "RenderCache"
+]
@@ -0,0 +1,75 @@
+import logging
+
+from typing import Callable
+from typing import Optional
+
+from discord import Intents
+from discord import MemberCacheFlags
+
+log = logging.getLogger(__name__)
+
+
+class CacheProfile:
+    """
+    The gateway intents the bot subscribes to and what discord.py caches from them
+
+    `member_cache_flags` decides which members are kept in a guild's member cache, `chunk_guilds_at_startup` whether
+    every guild's full member list is requested once connected and `max_messages` how many messages are kept, across
+    every guild, None keeping none. The flags are built by a factory as discord.py's flag objects are mutable.
+    """
+
+    def __init__(self, name: str, intents: Callable[[], Intents], member_cache_flags: Callable[[], MemberCacheFlags],
+                 chunk_guilds_at_startup: bool, max_messages: Optional[int]):
+        self.name = name
+        self.intents = intents
+        self.member_cache_flags = member_cache_flags
+        self.chunk_guilds_at_startup = chunk_guilds_at_startup
+        self.max_messages = max_messages
+
+    def options(self) -> dict:
+        """The options to construct the bot (or any discord.py client) with"""
+        return {
+            "intents": self.intents(),
+            "member_cache_flags": self.member_cache_flags(),
+            "chunk_guilds_at_startup": self.chunk_guilds_at_startup,
+            "max_messages": self.max_messages
+        }
+
+
+def command_intents() -> Intents:
+    """
+    What the cogs use: guilds and their roles, member joins and leaves, messages for commands and reactions for sign
+    ups. Presences, typing, voice, invites and the rest are left out.
+    """
+    return Intents(guilds=True, members=True, guild_messages=True, dm_messages=True, guild_reactions=True)
+
+
+cache_profiles = {
+    # Everything, as the bot ran before the profiles: every member chunked in and their presences kept
+    "full": CacheProfile("full", Intents.all, MemberCacheFlags.all, chunk_guilds_at_startup=True, max_messages=1000),
+    # Members are cached as they join or are looked up, the guild index queries them on demand
+    "lean": CacheProfile("lean", command_intents, lambda: MemberCacheFlags(online=False, voice=False, joined=True),
+                         chunk_guilds_at_startup=False, max_messages=100),
+    # Only members looked up by the bot are cached and no messages are kept
+    "minimal": CacheProfile("minimal", command_intents, MemberCacheFlags.none,
+                            chunk_guilds_at_startup=False, max_messages=None)
+}
+
+default_cache_profile = "lean"
+
+
+def get_cache_profile(name: Optional[str]) -> CacheProfile:
+    if name and name.casefold() in cache_profiles:
+        return cache_profiles[name.casefold()]
+    if name:
+        log.warning(f"There is no cache profile named {name}, using {default_cache_profile}. "
+                    f"The profiles are: {', '.join(cache_profiles)}")
+    return cache_profiles[default_cache_profile]
+
+
+__all__ = [
+    "CacheProfile",
+    "command_intents",
+    "cache_profiles",
+    "get_cache_profile"
+]
@@ -0,0 +1,144 @@
+import asyncio
+import logging
+
+from typing import Iterable
+from typing import Optional
+
+import discord
+
+log = logging.getLogger(__name__)
+
+
+class GuildState:
+    """
+    What the index knows about one guild beyond discord.py's own cache
+
+    `roles` holds roles found through the REST fallback, `missing_roles` and `missing_members` the ids known not to be
+    in the guild. Both are corrected by gateway events, so an id only costs a REST lookup once.
+    """
+
+    def __init__(self):
+        self.roles: dict[int, discord.Role] = {}
+        self.missing_roles: set[int] = set()
+        self.missing_members: set[int] = set()
+        self.role_fetch: Optional[asyncio.Future] = None
+
+
+class GuildIndex:
+    """
+    Resolves discord role ids to team roles and member ids to player members in memory
+
+    Lookups are served from discord.py's gateway cache and the per guild state, which the gateway listeners in
+    `listeners` keep up to date. Ids found in neither are resolved with a single batched REST call per resolve, the
+    roles of a guild or member queries of up to `member_query_size` ids.
+    """
+
+    member_query_size = 100  # The gateway caps a single member query at 100 user ids
+
+    def __init__(self):
+        self.guilds: dict[int, GuildState] = {}
+        self.rest_fallbacks = 0
+
+    def state(self, guild: discord.Guild) -> GuildState:
+        if not (state := self.guilds.get(guild.id)):
+            state = self.guilds[guild.id] = GuildState()
+        return state
+
+    def role(self, guild: discord.Guild, role_id: int) -> Optional[discord.Role]:
+        return guild.get_role(role_id) or self.state(guild).roles.get(role_id)
+
+    async def resolve_roles(self, guild: discord.Guild, role_ids: Iterable) -> dict[int, discord.Role]:
+        """Resolves role ids to the guild's roles, fetching the guild's roles at most once for ids not yet known"""
+        state = self.state(guild)
+        roles = {}
+        unknown = []
+        for role_id in {int(role_id) for role_id in role_ids}:
+            if role := self.role(guild, role_id):
+                roles[role_id] = role
+            elif role_id not in state.missing_roles:
+                unknown.append(role_id)
+        if unknown:
+            # Renders resolving roles at the same time share a single fetch of the guild's roles
+            if state.role_fetch is None or state.role_fetch.done():
+                self.rest_fallbacks += 1
+                state.role_fetch = asyncio.ensure_future(guild.fetch_roles())
+            try:
+                fetched = {role.id: role for role in await asyncio.shield(state.role_fetch)}
+            except discord.HTTPException as error:
+                log.warning(f"Could not fetch the roles of the guild {guild} ({guild.id}), error: {error}")
+                return roles
+            for role_id in unknown:
+                if role := fetched.get(role_id):
+                    roles[role_id] = state.roles[role_id] = role
+                else:
+                    state.missing_roles.add(role_id)
+        return roles
+
+    async def resolve_members(self, guild: discord.Guild, member_ids: Iterable) -> dict[int, discord.Member]:
+        """Resolves member ids to the guild's members, querying ids not yet known in batches of `member_query_size`"""
+        state = self.state(guild)
+        members = {}
+        unknown = []
+        for member_id in {int(member_id) for member_id in member_ids}:
+            if member := guild.get_member(member_id):
+                members[member_id] = member
+            elif member_id not in state.missing_members:
+                unknown.append(member_id)
+        if unknown:
+            self.rest_fallbacks += 1
+        for chunk_start in range(0, len(unknown), self.member_query_size):
+            chunk = unknown[chunk_start:chunk_start + self.member_query_size]
+            try:
+                found = await guild.query_members(user_ids=chunk, limit=len(chunk), cache=True)
+            except (discord.ClientException, asyncio.TimeoutError) as error:
+                log.warning(f"Could not query {len(chunk)} members in the guild {guild} ({guild.id}), error: {error}")
+                continue
+            for member in found:
+                members[member.id] = member
+            state.missing_members.update(set(chunk) - {member.id for member in found})
+        return members
+
+    async def on_guild_role_create(self, role: discord.Role):
+        self.state(role.guild).missing_roles.discard(role.id)
+
+    async def on_guild_role_update(self, before: discord.Role, after: discord.Role):
+        state = self.state(after.guild)
+        if after.id in state.roles:
+            state.roles[after.id] = after
+
+    async def on_guild_role_delete(self, role: discord.Role):
+        state = self.state(role.guild)
+        state.roles.pop(role.id, None)
+        state.missing_roles.add(role.id)
+
+    async def on_member_join(self, member: discord.Member):
+        self.state(member.guild).missing_members.discard(member.id)
+
+    async def on_member_remove(self, member: discord.Member):
+        self.state(member.guild).missing_members.add(member.id)
+
+    async def on_guild_remove(self, guild: discord.Guild):
+        self.guilds.pop(guild.id, None)
+
+    @property
+    def listeners(self) -> dict:
+        return {
+            "on_guild_role_create": self.on_guild_role_create,
+            "on_guild_role_update": self.on_guild_role_update,
+            "on_guild_role_delete": self.on_guild_role_delete,
+            "on_member_join": self.on_member_join,
+            "on_member_remove": self.on_member_remove,
+            "on_guild_remove": self.on_guild_remove
+        }
+
+    def stats(self) -> dict:
+        return {
+            "guilds": len(self.guilds),
+            "rest_fallbacks": self.rest_fallbacks
+        }
+
+
+__all__ = [
+    "GuildState",
+    "GuildIndex"
+]
@@ -0,0 +1,105 @@
+import atexit
+import logging
+import queue
+
+from datetime import datetime
+from datetime import timezone
+from logging.handlers import QueueHandler
+from logging.handlers import QueueListener
+from typing import Optional
+
+import orjson
+
+# The attributes every LogRecord has, anything else on a record was passed through `extra`
+record_attributes = frozenset(logging.LogRecord("", 0, "", 0, "", (), None).__dict__) | {"message", "asctime"}
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Formats each record as a single line JSON object with orjson
+
+    The object holds the time in ISO 8601 UTC, level, logger, message and source location, the formatted exception
+    or stack if there is one, and any values passed through `extra`.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "function": record.funcName,
+            "line": record.lineno,
+            "thread": record.threadName
+        }
+        if record.exc_info:
+            entry["exception"] = record.exc_text or self.formatException(record.exc_info)
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        for key, value in record.__dict__.items():
+            if key not in record_attributes:
+                entry[key] = value
+        return orjson.dumps(entry, default=str).decode()
+
+
+class LoopQueueHandler(QueueHandler):
+    """
+    Puts records on a queue as they are, leaving formatting to the handlers behind the QueueListener
+
+    The stock QueueHandler formats the message on the logging thread so records can be pickled, records here only
+    cross threads, so formatting (and the `%` arguments) is deferred to the listener's thread. Arguments are
+    formatted after the call returns, log immutable values or copies rather than objects about to be changed.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class QueueLogging:
+    """
+    Moves a logger's handlers behind a queue, so formatting and file writes happen on a listener thread
+
+    `start` swaps the logger's handlers (as set up by the log config) for a single LoopQueueHandler, `stop` flushes
+    the queue and puts the handlers back. The listener honours each handler's level.
+    """
+
+    def __init__(self, logger: logging.Logger = None):
+        self.logger = logger or logging.getLogger()
+        self.handlers: list[logging.Handler] = []
+        self.queue_handler: Optional[LoopQueueHandler] = None
+        self.listener: Optional[QueueListener] = None
+
+    @property
+    def running(self) -> bool:
+        return self.listener is not None
+
+    def start(self):
+        if self.running or not self.logger.handlers:
+            return
+        self.handlers = list(self.logger.handlers)
+        log_queue = queue.SimpleQueue()
+        self.queue_handler = LoopQueueHandler(log_queue)
+        self.listener = QueueListener(log_queue, *self.handlers, respect_handler_level=True)
+        for handler in self.handlers:
+            self.logger.removeHandler(handler)
+        self.logger.addHandler(self.queue_handler)
+        self.listener.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        if not self.running:
+            return
+        self.listener.stop()
+        self.logger.removeHandler(self.queue_handler)
+        for handler in self.handlers:
+            self.logger.addHandler(handler)
+        self.listener = None
+        self.queue_handler = None
+        atexit.unregister(self.stop)
+
+
+__all__ = [
+    "JSONFormatter",
+    "LoopQueueHandler",
+    "QueueLogging"
+]
@@ -0,0 +1,264 @@
+import bisect
+import contextvars
+import logging
+import time
+
+from collections import Counter
+from typing import Callable
+from typing import Iterator
+from typing import Optional
+
+import discord
+
+log = logging.getLogger(__name__)
+
+latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+call_buckets = (0, 1, 2, 5, 10, 25, 50, 100)
+
+
+class Histogram:
+    """Counts observations into buckets bounded above by `bounds`, the way Prometheus histograms do"""
+
+    def __init__(self, bounds: tuple = latency_buckets):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> Iterator[tuple[str, int]]:
+        """Yields (le, observations at or below it) for every bucket, the last one being +Inf"""
+        total = 0
+        for bound, count in zip(self.bounds + ("+Inf",), self.counts):
+            total += count
+            yield str(bound), total
+
+    def quantile(self, fraction: float) -> float:
+        """Estimates a quantile by interpolating inside the bucket it falls in, capped at the largest bound"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        total = 0
+        for index, count in enumerate(self.counts):
+            if total + count >= rank and count:
+                if index == len(self.bounds):
+                    return self.bounds[-1]
+                lower = self.bounds[index - 1] if index else 0.0
+                return lower + (self.bounds[index] - lower) * (rank - total) / count
+            total += count
+        return self.bounds[-1]
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+
+class CommandScope:
+    """The API requests made while a command runs, set for the command's task through `current_command`"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.api_calls = 0
+
+
+current_command: contextvars.ContextVar[Optional[CommandScope]] = contextvars.ContextVar("current_command",
+                                                                                         default=None)
+
+
+def escape(label_value) -> str:
+    return str(label_value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f"{name}=\"{escape(value)}\"" for name, value in labels.items()) + "}"
+
+
+class Metrics:
+    """
+    Command, API and Discord REST timings plus the stats of the bot's other components
+
+    Commands are timed per qualified name along with the API requests they made, API requests per method and path
+    (without the query) and Discord REST calls per method and route. Components register a `stats` callable with
+    `add_source`, their numeric values are exported as gauges. Everything is exposed in the Prometheus text format by
+    `exposition`, which `serve` makes available over HTTP.
+    """
+
+    namespace = "mfc"
+
+    def __init__(self):
+        self.commands: dict[str, Histogram] = {}
+        self.command_api_calls: dict[str, Histogram] = {}
+        self.command_outcomes: Counter = Counter()
+        self.api: dict[tuple[str, str], Histogram] = {}
+        self.api_statuses: Counter = Counter()
+        self.discord: dict[tuple[str, str], Histogram] = {}
+        self.discord_statuses: Counter = Counter()
+        self.sources: dict[str, tuple[Callable[[], dict], str, bool]] = {}
+        self.runner: Optional["web.AppRunner"] = None
+
+    @staticmethod
+    def histogram(histograms: dict, key, bounds: tuple = latency_buckets) -> Histogram:
+        if (histogram := histograms.get(key)) is None:
+            histogram = histograms[key] = Histogram(bounds)
+        return histogram
+
+    def start_command(self, name: str) -> tuple[CommandScope, contextvars.Token]:
+        scope = CommandScope(name)
+        return scope, current_command.set(scope)
+
+    def finish_command(self, scope: CommandScope, token: contextvars.Token, seconds: float, outcome: str):
+        current_command.reset(token)
+        self.histogram(self.commands, scope.name).observe(seconds)
+        self.histogram(self.command_api_calls, scope.name, call_buckets).observe(scope.api_calls)
+        self.command_outcomes[scope.name, outcome] += 1
+
+    def observe_api(self, method: str, path: str, status, seconds: float):
+        """Records an API request that went out over the network, `status` is its status code or "error\""""
+        self.histogram(self.api, (method, path)).observe(seconds)
+        self.api_statuses[method, path, str(status)] += 1
+        if scope := current_command.get():
+            scope.api_calls += 1
+
+    def observe_discord(self, method: str, route: str, status, seconds: float):
+        self.histogram(self.discord, (method, route)).observe(seconds)
+        self.discord_statuses[method, route, str(status)] += 1
+
+    def instrument_http(self, http: discord.http.HTTPClient):
+        """Times every Discord REST call the client makes, by the route template it was made on"""
+        request = http.request
+
+        async def timed_request(route: discord.http.Route, **kwargs):
+            start = time.perf_counter()
+            status = "error"
+            try:
+                response = await request(route, **kwargs)
+                status = "ok"
+                return response
+            except discord.HTTPException as error:
+                status = error.status
+                raise
+            finally:
+                self.observe_discord(route.method, route.path, status, time.perf_counter() - start)
+
+        http.request = timed_request
+
+    def add_source(self, name: str, stats: Callable[[], dict], label: str = "key", per_label: bool = False):
+        """
+        Exports the numeric values of a component's stats as gauges named `<namespace>_<name>_<key>`
+
+        The keys of nested dicts go in the `label` label. With `per_label` the stats are read as
+        {label value: {key: value}} instead, the way the scheduler reports its jobs.
+        """
+        self.sources[name] = (stats, label, per_label)
+
+    def source_samples(self, name: str) -> Iterator[tuple[str, dict, float]]:
+        stats, label, per_label = self.sources[name]
+        for key, value in stats().items():
+            if isinstance(value, dict):
+                for inner_key, inner_value in value.items():
+                    if is_number(inner_value):
+                        if per_label:
+                            yield f"{name}_{inner_key}", {label: key}, inner_value
+                        else:
+                            yield f"{name}_{key}", {label: inner_key}, inner_value
+            elif is_number(value):
+                yield f"{name}_{key}", {}, value
+
+    def histogram_lines(self, name: str, help_text: str, histograms: dict, label_names: tuple) -> Iterator[str]:
+        name = f"{self.namespace}_{name}"
+        yield f"# HELP {name} {help_text}"
+        yield f"# TYPE {name} histogram"
+        for key, histogram in histograms.items():
+            labels = dict(zip(label_names, key if isinstance(key, tuple) else (key,)))
+            for bound, count in histogram.cumulative():
+                yield f"{name}_bucket{format_labels({**labels, 'le': bound})} {count}"
+            yield f"{name}_sum{format_labels(labels)} {histogram.sum}"
+            yield f"{name}_count{format_labels(labels)} {histogram.count}"
+
+    def counter_lines(self, name: str, help_text: str, counter: Counter, label_names: tuple) -> Iterator[str]:
+        name = f"{self.namespace}_{name}"
+        yield f"# HELP {name} {help_text}"
+        yield f"# TYPE {name} counter"
+        for key, count in counter.items():
+            yield f"{name}{format_labels(dict(zip(label_names, key)))} {count}"
+
+    def exposition(self) -> str:
+        lines = [
+            *self.histogram_lines("command_duration_seconds", "Time taken by each command invocation",
+                                  self.commands, ("command",)),
+            *self.histogram_lines("command_api_requests", "API requests made per command invocation",
+                                  self.command_api_calls, ("command",)),
+            *self.counter_lines("command_invocations_total", "Command invocations by outcome",
+                                self.command_outcomes, ("command", "outcome")),
+            *self.histogram_lines("api_request_duration_seconds", "Time taken by each API request",
+                                  self.api, ("method", "endpoint")),
+            *self.counter_lines("api_requests_total", "API requests by status",
+                                self.api_statuses, ("method", "endpoint", "status")),
+            *self.histogram_lines("discord_request_duration_seconds", "Time taken by each Discord REST call",
+                                  self.discord, ("method", "route")),
+            *self.counter_lines("discord_requests_total", "Discord REST calls by outcome",
+                                self.discord_statuses, ("method", "route", "status"))
+        ]
+        for source in self.sources:
+            try:
+                samples = list(self.source_samples(source))
+            except Exception as error:
+                log.warning(f"Could not collect the stats of {source}, error: {error}")
+                continue
+            typed = set()
+            for name, labels, value in samples:
+                name = f"{self.namespace}_{name}"
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name}{format_labels(labels)} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+    async def handle_metrics(self, request) -> "web.Response":
+        from aiohttp import web
+        return web.Response(text=self.exposition(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    async def serve(self, host: str, port: int):
+        """Serves `exposition` at http://host:port/metrics, only the first call starts the server"""
+        if self.runner is not None:
+            return
+        from aiohttp import web  # Slow to import, so only imported once metrics are served
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        try:
+            await web.TCPSite(self.runner, host, port).start()
+        except OSError as error:
+            log.warning(f"Could not serve metrics at {host}:{port}, error: {error}")
+            await self.close()
+            return
+        log.info(f"Serving metrics at http://{host}:{port}/metrics")
+
+    async def close(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+
+def is_number(value) -> bool:
+    return isinstance(value, (int, float))
+
+
+metrics = Metrics()
+
+__all__ = [
+    "Histogram",
+    "CommandScope",
+    "current_command",
+    "Metrics",
+    "metrics"
+]
@@ -0,0 +1,253 @@
+import asyncio
+import inspect
+import itertools
+import logging
+import time
+
+from enum import IntEnum
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Optional
+
+import discord
+
+from discord.ext import commands
+
+from Bot.Scheduler import leadership_guard
+
+log = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    BACKGROUND = 10
+
+
+class RouteBucket:
+    """A token bucket allowing `rate` writes every `per` seconds, mirroring one of Discord's per channel routes"""
+
+    def __init__(self, rate: int, per: float):
+        self.rate = rate
+        self.per = per
+        self.tokens = float(rate)
+        self.updated = time.monotonic()
+
+    def refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate / self.per)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Seconds until a write is allowed on this route"""
+        self.refill()
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) * self.per / self.rate
+
+    def take(self):
+        self.refill()
+        self.tokens -= 1
+
+
+class QueuedWrite:
+
+    def __init__(self, priority: int, order: int, route: str, call: Callable[[], Awaitable],
+                 future: asyncio.Future, guard: Callable[[], None] = None):
+        self.priority = priority
+        self.order = order
+        self.route = route
+        self.call = call
+        self.future = future
+        self.guard = guard
+        self.queued = time.monotonic()
+
+    @property
+    def key(self) -> tuple[int, int]:
+        return self.priority, self.order
+
+
+class ChannelQueue:
+    """
+    The pending writes to one channel, run one at a time so they reach Discord in the order they were made
+
+    The next write run is the highest priority one whose route bucket has a token, so an interactive reply is not
+    held up behind background writes waiting on a different route.
+    """
+
+    def __init__(self, outbox: "Outbox", channel_id: int):
+        self.outbox = outbox
+        self.channel_id = channel_id
+        self.writes: list[QueuedWrite] = []
+        self.buckets = {route: RouteBucket(*limit) for route, limit in outbox.route_limits.items()}
+        self.wake = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def put(self, write: QueuedWrite):
+        self.writes.append(write)
+        self.wake.set()
+
+    def next_write(self) -> tuple[Optional[QueuedWrite], float]:
+        """The write to run now, or None and how long until one of the queued writes may run"""
+        wait = None
+        for write in sorted(self.writes, key=lambda queued: queued.key):
+            delay = self.buckets[write.route].delay()
+            if not delay:
+                return write, 0.0
+            wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    async def work(self):
+        while True:
+            self.writes = [write for write in self.writes if not write.future.done()]
+            if not self.writes:
+                self.wake.clear()
+                try:
+                    await asyncio.wait_for(self.wake.wait(), self.outbox.idle_timeout)
+                except asyncio.TimeoutError:
+                    if not self.writes:
+                        self.outbox.channels.pop(self.channel_id, None)
+                        return
+                continue
+            write, wait = self.next_write()
+            if write is None:
+                self.wake.clear()
+                try:
+                    await asyncio.wait_for(self.wake.wait(), wait)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            self.writes.remove(write)
+            self.buckets[write.route].take()
+            self.outbox.record(write)
+            try:
+                if write.guard:
+                    write.guard()
+                result = await write.call()
+            except asyncio.CancelledError:
+                write.future.cancel()
+                raise
+            except Exception as error:
+                if not write.future.done():
+                    write.future.set_exception(error)
+            else:
+                if not write.future.done():
+                    write.future.set_result(result)
+
+
+class Outbox:
+    """
+    Queues every message send, edit, delete and reaction the bot makes, per channel
+
+    Writes are paced by per channel buckets shaped like Discord's routes in `route_limits`, (writes, per seconds), so
+    the bot does not run into 429s when a match planning post and an ELO board refresh hit the same channel.
+    discord.py still honours the rate limit headers Discord returns, the buckets only keep the queue from bursting
+    into them. Interactive command replies are queued ahead of background writes.
+
+    A write made by a singleton job's run checks, just before it reaches Discord, that this process is still the
+    cluster's leader, so a run outliving the lease does not write after waiting in the queue.
+    """
+
+    route_limits = {
+        "send": (5, 5.0),
+        "edit": (5, 5.0),
+        "delete": (5, 1.0),
+        "reaction": (1, 0.25)
+    }
+
+    max_embeds = 10
+
+    idle_timeout = 60
+
+    def __init__(self, loop: asyncio.AbstractEventLoop = None):
+        self.loop = loop
+        self.channels: dict[int, ChannelQueue] = {}
+        self._order = itertools.count()
+        self.writes: dict[str, int] = {route: 0 for route in self.route_limits}
+        self.queue_time: dict[str, float] = {route: 0.0 for route in self.route_limits}
+
+    def record(self, write: QueuedWrite):
+        self.writes[write.route] += 1
+        self.queue_time[write.route] += time.monotonic() - write.queued
+
+    async def submit(self, channel_id: int, route: str, call: Callable[[], Awaitable],
+                     priority: Priority = Priority.BACKGROUND) -> Any:
+        """Queues a write to a channel on one of the routes in `route_limits`, returns its result once it has run"""
+        loop = self.loop or asyncio.get_event_loop()
+        if not (channel := self.channels.get(channel_id)) or channel.task.done():
+            channel = self.channels[channel_id] = ChannelQueue(self, channel_id)
+            channel.task = loop.create_task(channel.work(), name=f"outbox:{channel_id}")
+        future = loop.create_future()
+        channel.put(QueuedWrite(priority, next(self._order), route, call, future, leadership_guard()))
+        return await future
+
+    @staticmethod
+    async def destination(channel: discord.abc.Messageable) -> discord.abc.Messageable:
+        """The channel a Messageable sends to, a context's channel or a user's DM channel"""
+        if isinstance(channel, commands.Context):
+            return channel.channel
+        if isinstance(channel, (discord.User, discord.Member)):
+            return channel.dm_channel or await channel.create_dm()
+        return channel
+
+    async def send(self, channel: discord.abc.Messageable, priority: Priority = Priority.BACKGROUND, **kwargs) \
+            -> discord.Message:
+        target = await self.destination(channel)
+        return await self.submit(target.id, "send", lambda: target.send(**kwargs), priority)
+
+    async def edit(self, message: discord.Message, priority: Priority = Priority.BACKGROUND, **kwargs):
+        return await self.submit(message.channel.id, "edit", lambda: message.edit(**kwargs), priority)
+
+    async def delete(self, message: discord.Message, priority: Priority = Priority.BACKGROUND):
+        return await self.submit(message.channel.id, "delete", message.delete, priority)
+
+    async def add_reactions(self, message: discord.Message, emojis: list, priority: Priority = Priority.BACKGROUND):
+        """Queues every reaction at once, they are added in order as the reaction route allows"""
+        await asyncio.gather(*(
+            self.submit(message.channel.id, "reaction", lambda emoji=emoji: message.add_reaction(emoji), priority)
+            for emoji in emojis
+        ))
+
+    @staticmethod
+    def supports_embeds(channel: discord.abc.Messageable) -> bool:
+        """If this discord.py can send several embeds in one message, 2.0 and later"""
+        return "embeds" in inspect.signature(channel.send).parameters
+
+    async def send_embeds(self, channel: discord.abc.Messageable, embeds: list[discord.Embed],
+                          priority: Priority = Priority.BACKGROUND) -> list[discord.Message]:
+        """Sends the embeds, `max_embeds` to a message where discord.py supports it and one per message otherwise"""
+        if self.supports_embeds(channel):
+            batches = [{"embeds": embeds[start:start + self.max_embeds]}
+                       for start in range(0, len(embeds), self.max_embeds)]
+        else:
+            batches = [{"embed": embed} for embed in embeds]
+        return [await self.send(channel, priority, **batch) for batch in batches]
+
+    async def close(self):
+        for channel in list(self.channels.values()):
+            channel.task.cancel()
+        self.channels.clear()
+
+    def stats(self) -> dict:
+        return {
+            "channels": len(self.channels),
+            "queued": sum(len(channel.writes) for channel in self.channels.values()),
+            "writes": dict(self.writes),
+            "mean_queue_time": {route: self.queue_time[route] / count if (count := self.writes[route]) else 0.0
+                                for route in self.route_limits}
+        }
+
+
+class QueuedContext(commands.Context):
+    """A command context whose replies go through the bot's Outbox ahead of its background writes"""
+
+    async def send(self, content=None, **kwargs) -> discord.Message:
+        return await self.bot.outbox.submit(self.channel.id, "send",
+                                            lambda: self.channel.send(content, **kwargs), Priority.INTERACTIVE)
+
+
+__all__ = [
+    "Priority",
+    "RouteBucket",
+    "ChannelQueue",
+    "Outbox",
+    "QueuedContext"
+]
@@ -0,0 +1,294 @@
+import asyncio
+import logging
+import random
+import time
+
+from abc import ABC
+from abc import abstractmethod
+from contextvars import ContextVar
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from datetime import tzinfo
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Optional
+from zoneinfo import ZoneInfo
+from zoneinfo import ZoneInfoNotFoundError
+
+log = logging.getLogger(__name__)
+
+weekdays = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+def get_timezone(name: str) -> tzinfo:
+    """Returns the IANA timezone with the given name, UTC if there is no such timezone"""
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        log.error(f"Unknown timezone \"{name}\", falling back to UTC")
+        return timezone.utc
+
+
+class LeadershipLost(Exception):
+    """Raised within a singleton job's run once this process is no longer the cluster's leader"""
+
+
+# The singleton job whose run the current task belongs to, tasks started by the run inherit it
+_singleton_run: ContextVar[Optional["Job"]] = ContextVar("singleton_run", default=None)
+
+
+def ensure_leader():
+    """
+    Raises LeadershipLost when called within a singleton job's run once this process is no longer the cluster's
+    leader, does nothing anywhere else. Singleton jobs call it before each write, so a run outliving the lease stops.
+    """
+    if (job := _singleton_run.get()) is not None:
+        job.ensure_leader()
+
+
+def leadership_guard() -> Optional[Callable[[], None]]:
+    """The check `ensure_leader` makes, to be made later from another task, or None outside a singleton job's run"""
+    job = _singleton_run.get()
+    return job.ensure_leader if job is not None else None
+
+
+class Job(ABC):
+    """
+    A coroutine function run repeatedly by the Scheduler
+
+    A job never overlaps itself, a run requested while the previous run is still going is skipped and counted in
+    `skipped`. Each run is delayed by a random amount of up to `jitter` seconds so jobs due at the same time do not
+    all hit the API at once.
+
+    A `singleton` job is one only a single process of a cluster may run, such as posting to a channel. Its runs are
+    skipped, and counted in `standby`, while the scheduler it was added to is not the cluster's leader. A run that
+    outlives the leadership is cancelled, and `ensure_leader` stops it at its next write, counted in `interrupted`.
+    """
+
+    def __init__(self, name: str, callback: Callable[[], Awaitable], jitter: float = 0, owner: Any = None,
+                 singleton: bool = False):
+        self.name = name
+        self.callback = callback
+        self.jitter = jitter
+        self.owner = owner
+        self.singleton = singleton
+        self.scheduler: Optional["Scheduler"] = None
+        self.task: Optional[asyncio.Task] = None
+        self.running = False
+        self.next_run: Optional[datetime] = None
+
+        self.runs = 0
+        self.failures = 0
+        self.skipped = 0
+        self.standby = 0
+        self.interrupted = 0
+        self.last_run: Optional[datetime] = None
+        self.last_duration = 0.0
+        self.max_duration = 0.0
+        self.total_duration = 0.0
+
+    @abstractmethod
+    def due_after(self, now: datetime) -> datetime:
+        """The time of the first run after `now`"""
+
+    def ensure_leader(self):
+        if self.scheduler and not self.scheduler.is_leader():
+            raise LeadershipLost("this process is no longer the cluster leader")
+
+    async def run(self) -> bool:
+        """Runs the job once unless it is already running, returns False if the run was skipped or failed"""
+        if self.singleton and self.scheduler and not self.scheduler.is_leader():
+            self.standby += 1
+            log.debug("Skipped a run of the singleton job %s, this process is not the cluster leader", self.name)
+            return False
+        if self.running:
+            self.skipped += 1
+            log.warning(f"Skipped a run of the job {self.name}, the previous run has not finished")
+            return False
+        self.running = True
+        self.last_run = datetime.now(tz=timezone.utc)
+        start = time.perf_counter()
+        run_token = _singleton_run.set(self) if self.singleton else None
+        try:
+            if self.singleton and self.scheduler and self.scheduler.leader:
+                await self.scheduler.run_while_leader(self)
+            else:
+                await self.callback()
+            return True
+        except LeadershipLost as error:
+            self.interrupted += 1
+            log.warning(f"Stopped a run of the singleton job {self.name}, {error}")
+            return False
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.failures += 1
+            log.exception(f"The job {self.name} raised an exception")
+            return False
+        finally:
+            if run_token is not None:
+                _singleton_run.reset(run_token)
+            self.running = False
+            self.runs += 1
+            self.last_duration = time.perf_counter() - start
+            self.max_duration = max(self.max_duration, self.last_duration)
+            self.total_duration += self.last_duration
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "skipped": self.skipped,
+            "standby": self.standby,
+            "interrupted": self.interrupted,
+            "running": self.running,
+            "last_run": self.last_run.isoformat() if self.last_run else None,
+            "next_run": self.next_run.isoformat() if self.next_run else None,
+            "last_duration": self.last_duration,
+            "max_duration": self.max_duration,
+            "mean_duration": self.total_duration / self.runs if self.runs else 0.0
+        }
+
+
+class IntervalJob(Job):
+    """Runs every `interval` seconds, counted from the end of the previous run"""
+
+    def __init__(self, name: str, callback: Callable[[], Awaitable], interval: float, run_immediately: bool = False,
+                 **kwargs):
+        self.interval = interval
+        self.run_immediately = run_immediately
+        super().__init__(name, callback, **kwargs)
+
+    def due_after(self, now: datetime) -> datetime:
+        if self.run_immediately and not self.runs:
+            return now
+        return now + timedelta(seconds=self.interval)
+
+
+class WeeklyJob(Job):
+    """Runs once a week on `weekday` at `at` (hour, minute) in the timezone `tz`"""
+
+    def __init__(self, name: str, callback: Callable[[], Awaitable], weekday: str, at: tuple[int, int] = (0, 0),
+                 tz: tzinfo = timezone.utc, **kwargs):
+        self.weekday = weekdays.index(weekday.casefold())
+        self.at = at
+        self.tz = tz
+        super().__init__(name, callback, **kwargs)
+
+    def due_after(self, now: datetime) -> datetime:
+        local_now = now.astimezone(self.tz)
+        days_ahead = (self.weekday - local_now.weekday()) % 7
+        day = local_now.date() + timedelta(days=days_ahead)
+        due = datetime(day.year, day.month, day.day, *self.at, tzinfo=self.tz)
+        if due <= local_now:
+            day += timedelta(days=7)
+            due = datetime(day.year, day.month, day.day, *self.at, tzinfo=self.tz)
+        return due.astimezone(timezone.utc)
+
+
+class Scheduler:
+    """
+    Runs the periodic and weekly jobs registered by the cogs, one task per job
+
+    Jobs wait for `ready`, the bot connecting, before their first run. Long waits are slept in chunks of at most
+    `max_sleep` seconds and the due time is checked again after each, so weekly jobs stay on time if the system clock
+    is changed.
+
+    `leader`, when set, tells whether this process is the cluster's leader and may run singleton jobs. Without it the
+    process runs on its own and runs every job.
+    """
+
+    max_sleep = 3600
+
+    leader_poll_interval = 1
+
+    def __init__(self, loop: asyncio.AbstractEventLoop = None, ready: Callable[[], Awaitable] = None):
+        self.loop = loop
+        self.ready = ready
+        self.leader: Optional[Callable[[], bool]] = None
+        self.jobs: dict[str, Job] = {}
+
+    def is_leader(self) -> bool:
+        return self.leader() if self.leader else True
+
+    async def wait_until_leader(self):
+        """Returns once this process may run singleton jobs"""
+        while not self.is_leader():
+            await asyncio.sleep(self.leader_poll_interval)
+
+    async def run_while_leader(self, job: Job):
+        """
+        Runs a singleton job's callback in its own task, checking every `leader_poll_interval` seconds that this
+        process is still the leader and cancelling the task, raising LeadershipLost, as soon as it is not
+        """
+        task = asyncio.ensure_future(job.callback())  # Inherits the run's context, so ensure_leader sees the job
+        try:
+            while not task.done():
+                await asyncio.wait({task}, timeout=self.leader_poll_interval)
+                if not task.done() and not self.is_leader():
+                    task.cancel()
+                    await asyncio.gather(task, return_exceptions=True)
+                    raise LeadershipLost("this process lost the cluster leadership during the run")
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        return task.result()
+
+    def add(self, job: Job) -> Job:
+        """Starts running a job, replacing any job with the same name"""
+        self.cancel(job.name)
+        self.jobs[job.name] = job
+        job.scheduler = self
+        loop = self.loop or asyncio.get_event_loop()
+        job.task = loop.create_task(self.run_job(job), name=f"scheduler:{job.name}")
+        log.debug(f"Scheduled the job {job.name}")
+        return job
+
+    def every(self, seconds: float, callback: Callable[[], Awaitable], name: str = None, **kwargs) -> IntervalJob:
+        return self.add(IntervalJob(name or callback.__qualname__, callback, seconds, **kwargs))
+
+    def weekly(self, weekday: str, callback: Callable[[], Awaitable], at: tuple[int, int] = (0, 0),
+               tz: tzinfo = timezone.utc, name: str = None, **kwargs) -> WeeklyJob:
+        return self.add(WeeklyJob(name or callback.__qualname__, callback, weekday, at, tz, **kwargs))
+
+    def cancel(self, name: str = None, owner: Any = None) -> int:
+        """Cancels the job with the given name or every job registered by `owner`, returns how many were cancelled"""
+        cancelled = [job for job in self.jobs.values()
+                     if job.name == name or (owner is not None and job.owner is owner)]
+        for job in cancelled:
+            if job.task:
+                job.task.cancel()
+            del self.jobs[job.name]
+        return len(cancelled)
+
+    def cancel_all(self):
+        for job in list(self.jobs.values()):
+            self.cancel(job.name)
+
+    async def run_job(self, job: Job):
+        if self.ready:
+            await self.ready()
+        while True:
+            job.next_run = job.due_after(datetime.now(tz=timezone.utc))
+            if job.jitter:
+                job.next_run += timedelta(seconds=random.uniform(0, job.jitter))
+            while (delay := (job.next_run - datetime.now(tz=timezone.utc)).total_seconds()) > 0:
+                await asyncio.sleep(min(delay, self.max_sleep))
+            await job.run()
+
+    def stats(self) -> dict:
+        return {name: job.stats() for name, job in self.jobs.items()}
+
+
+__all__ = [
+    "get_timezone",
+    "LeadershipLost",
+    "ensure_leader",
+    "leadership_guard",
+    "Job",
+    "IntervalJob",
+    "WeeklyJob",
+    "Scheduler"
+]
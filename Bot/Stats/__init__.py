@@ -0,0 +1,281 @@
+import asyncio
+import logging
+import os
+
+from datetime import date
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from pathlib import Path
+from typing import Iterable
+from typing import Optional
+from urllib.parse import urlencode
+
+import aiofiles
+import orjson
+
+from aiohttp import ClientError
+
+from Bot import APIRequest
+from Bot.Config.config import write_atomically
+from Bot.Stats import vectorized
+from Bot.Stats.leaderboard import LeaderboardIndex
+
+log = logging.getLogger(__name__)
+
+stat_keys = ("score", "kills", "assists", "deaths")
+
+leaderboard_keys = ("kd", "kda", "score", "kills", "deaths", "assists")
+
+
+def calculate_ratios(totals: dict) -> dict:
+    """Returns a copy of a player's totals with their kd and kda ratios, 99999 for players without deaths"""
+    player_dict = dict(totals)
+    kills = player_dict["kills"]
+    assists = player_dict["assists"]
+    deaths = player_dict["deaths"]
+    if deaths == 0:
+        player_dict["kda"] = 99999
+        player_dict["kd"] = 99999
+    else:
+        player_dict["kda"] = round((kills + assists) / deaths, 2)
+        player_dict["kd"] = round(kills / deaths, 2)
+    return player_dict
+
+
+def python_sum_player_totals(matches: Iterable[dict], players: dict = None) -> dict:
+    """Sums the score, kills, assists and deaths of every player in every round of the matches into `players`"""
+    players = {} if players is None else players
+    for match in matches:
+        for set in match["sets"]:
+            for _round in set["rounds"]:
+                for team_players in (_round["team1_players"] or [], _round["team2_players"] or []):
+                    for player in team_players:
+                        if not (player_dict := players.get(player["player_id"], None)):
+                            player_dict = players[player["player_id"]] = {key: 0 for key in stat_keys}
+                        player_dict["score"] += player["score"]
+                        player_dict["kills"] += player["kills"]
+                        player_dict["assists"] += player["assists"]
+                        player_dict["deaths"] += player["deaths"]
+    return players
+
+
+def sum_player_totals(matches: Iterable[dict], players: dict = None) -> dict:
+    """
+    Sums player totals with the pure Python engine, or the NumPy engine when STATS_ENGINE is `numpy` and NumPy is
+    installed. Flattening the rounds in Python dominates either way, so NumPy is not faster by default.
+    """
+    if os.getenv("STATS_ENGINE", default="python").casefold() == "numpy" and vectorized.np is not None:
+        return vectorized.sum_player_totals(matches, players)
+    return python_sum_player_totals(matches, players)
+
+
+def calculate_player_data(matches: Iterable[dict]) -> dict:
+    return {player_id: calculate_ratios(totals) for player_id, totals in sum_player_totals(matches).items()}
+
+
+class MatchStatsStore:
+    """
+    Persistent per-player stat totals over every match the API has reported
+
+    Each refresh only asks the API for matches created from the high-water mark on, the creation time of the newest
+    match ingested so far. Matches created exactly at the mark are tracked by id so they are never counted twice,
+    whether the API's `start_time` includes the mark or not and however often a match is repeated in a response.
+
+    Alongside the all time totals, totals are bucketed per UTC day for the last `bucket_days` days so the rolling
+    windows are sums of at most that many buckets. A leaderboard index per (window, stat) is built on first use and
+    dropped whenever new matches are ingested or the day rolls over.
+    """
+
+    windows = {
+        "day": 1,
+        "week": 7,
+        "month": 30,
+        "all": None
+    }
+
+    bucket_days = 30
+
+    ingest_batch_size = 500
+
+    def __init__(self, store_path: Path):
+        self.store_path = store_path
+        self.high_water_mark: Optional[datetime] = None
+        self.boundary_ids: set = set()
+        self.players: dict = {}
+        self.buckets: dict[str, dict] = {}
+        self._leaderboards: dict[tuple[str, str], LeaderboardIndex] = {}
+        self._leaderboards_day: Optional[date] = None
+        self._loaded = False
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def load(self):
+        if self.store_path.exists():
+            async with aiofiles.open(self.store_path, "rb") as f:
+                stored = orjson.loads(await f.read())
+            if "buckets" not in stored:
+                log.info(f"Match stats at {self.store_path} predate daily buckets, rebuilding them from the API")
+            else:
+                if high_water_mark := stored.get("high_water_mark"):
+                    self.high_water_mark = datetime.fromisoformat(high_water_mark)
+                self.boundary_ids = set(stored.get("boundary_ids", []))
+                self.players = stored.get("players", {})
+                self.buckets = stored["buckets"]
+                log.info(f"Loaded match stats for {len(self.players)} players up to {self.high_water_mark}")
+        self._loaded = True
+
+    async def save(self):
+        stored = {
+            "high_water_mark": self.high_water_mark.isoformat() if self.high_water_mark else None,
+            "boundary_ids": list(self.boundary_ids),
+            "players": self.players,
+            "buckets": self.buckets
+        }
+        await write_atomically(self.store_path, orjson.dumps(stored, option=orjson.OPT_NON_STR_KEYS))
+
+    def reset(self):
+        """Drops everything held in memory, the next refresh loads the store from disk again"""
+        self.high_water_mark = None
+        self.boundary_ids = set()
+        self.players = {}
+        self.buckets = {}
+        self._leaderboards.clear()
+        self._loaded = False
+
+    @staticmethod
+    def today() -> date:
+        return datetime.now(tz=timezone.utc).date()
+
+    @staticmethod
+    def match_day(created: datetime) -> date:
+        if created.tzinfo is not None:
+            created = created.astimezone(timezone.utc)
+        return created.date()
+
+    def is_new(self, match: dict, since: tuple[Optional[datetime], set] = None) -> bool:
+        high_water_mark, boundary_ids = since or (self.high_water_mark, self.boundary_ids)
+        if high_water_mark is None:
+            return True
+        created = datetime.fromisoformat(match["creation"])
+        return created > high_water_mark or (created == high_water_mark and match["id"] not in boundary_ids)
+
+    def on_boundary(self, match: dict) -> bool:
+        """Whether the match was already ingested at the current high-water mark"""
+        return match["id"] in self.boundary_ids and datetime.fromisoformat(match["creation"]) == self.high_water_mark
+
+    def ingest(self, matches: Iterable[dict], since: tuple[Optional[datetime], set] = None) -> int:
+        """
+        Adds every match newer than the high-water mark to the totals, returns how many were added
+
+        When a single refresh is ingested in several batches pass the (high-water mark, boundary ids) from before the
+        first batch as `since`, so matches arriving out of order are compared against where the refresh started.
+        """
+        new_matches = list({match["id"]: match for match in matches
+                            if self.is_new(match, since) and not self.on_boundary(match)}.values())
+        if not new_matches:
+            return 0
+        sum_player_totals(new_matches, self.players)
+
+        oldest_bucket = self.today() - timedelta(days=self.bucket_days - 1)
+        matches_by_day: dict[str, list[dict]] = {}
+        for match in new_matches:
+            created = datetime.fromisoformat(match["creation"])
+            if (day := self.match_day(created)) >= oldest_bucket:
+                matches_by_day.setdefault(day.isoformat(), []).append(match)
+            if self.high_water_mark is None or created > self.high_water_mark:
+                self.high_water_mark = created
+                self.boundary_ids = set()
+            if created == self.high_water_mark:
+                self.boundary_ids.add(match["id"])
+        for day, day_matches in matches_by_day.items():
+            sum_player_totals(day_matches, self.buckets.setdefault(day, {}))
+        self.buckets = {day: totals for day, totals in sorted(self.buckets.items())
+                        if day >= oldest_bucket.isoformat()}
+
+        self._leaderboards.clear()
+        return len(new_matches)
+
+    async def refresh(self) -> bool:
+        """Ingests the matches created since the last refresh, returns False if the API could not be reached"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if not self._loaded:
+                await self.load()
+            endpoint = "/match/all"
+            if self.high_water_mark:
+                endpoint += "?" + urlencode({"start_time": self.high_water_mark.isoformat()})
+            try:
+                ingested = await self.ingest_stream(endpoint)
+            except (ClientError, asyncio.TimeoutError, ValueError) as error:
+                log.error(f"Could not read the match stats sent by the API, error: {error}")
+                self.reset()  # Part of the stream may have been ingested, start over from what was last saved
+                return False
+            if ingested is None:
+                return False
+            if ingested:
+                log.debug(f"Ingested {ingested} new matches, high-water mark is now {self.high_water_mark}")
+                await self.save()
+            return True
+
+    async def ingest_stream(self, endpoint: str) -> Optional[int]:
+        """Ingests the matches streamed from an endpoint in batches, returns None if the API could not be reached"""
+        async with APIRequest.stream(endpoint) as response:
+            if response.status != 200:
+                # A 404 is not documented as no new matches, reading it as such would freeze the stats unnoticed
+                log.error(f"Could not refresh match stats from {endpoint}, status: {response.status}")
+                return None
+            since = (self.high_water_mark, set(self.boundary_ids))
+            ingested = 0
+            batch = []
+            async for match in response.items():
+                batch.append(match)
+                if len(batch) == self.ingest_batch_size:
+                    ingested += self.ingest(batch, since)
+                    batch = []
+            return ingested + self.ingest(batch, since)
+
+    def player_stats(self, player_id) -> Optional[dict]:
+        if totals := self.players.get(player_id):
+            return calculate_ratios(totals)
+        return None
+
+    def all_player_stats(self) -> dict:
+        return {player_id: calculate_ratios(totals) for player_id, totals in self.players.items()}
+
+    def window_stats(self, window: str) -> dict:
+        """Returns the stats, with ratios, of every player over a window, one of `windows`"""
+        if (days := self.windows[window]) is None:
+            return self.all_player_stats()
+        first_day = (self.today() - timedelta(days=days - 1)).isoformat()
+        totals = {}
+        for day, bucket in self.buckets.items():
+            if day < first_day:
+                continue
+            for player_id, player_totals in bucket.items():
+                if not (player_dict := totals.get(player_id, None)):
+                    player_dict = totals[player_id] = {key: 0 for key in stat_keys}
+                for key in stat_keys:
+                    player_dict[key] += player_totals[key]
+        return {player_id: calculate_ratios(player_totals) for player_id, player_totals in totals.items()}
+
+    def leaderboard(self, window: str, key_name: str) -> LeaderboardIndex:
+        if self._leaderboards_day != (today := self.today()):
+            self._leaderboards.clear()
+            self._leaderboards_day = today
+        if not (leaderboard := self._leaderboards.get((window, key_name))):
+            stats = next((index.stats for (indexed_window, _), index in self._leaderboards.items()
+                          if indexed_window == window), None) or self.window_stats(window)
+            leaderboard = self._leaderboards[(window, key_name)] = LeaderboardIndex(stats, key_name)
+        return leaderboard
+
+
+__all__ = [
+    "leaderboard_keys",
+    "calculate_ratios",
+    "calculate_player_data",
+    "python_sum_player_totals",
+    "sum_player_totals",
+    "LeaderboardIndex",
+    "MatchStatsStore"
+]
@@ -0,0 +1,44 @@
+import heapq
+
+from itertools import islice
+from typing import Iterator
+
+
+class LeaderboardIndex:
+    """
+    Ranks players by a single stat, highest first
+
+    Building the index only heapifies the players, O(n). Ranks are popped off the heap as they are first asked for
+    and kept, so reading the top k costs O(k log n) once and O(k) afterwards. Players tied on the stat are ranked
+    latest first, matching a reversed stable sort of the stats.
+    """
+
+    def __init__(self, stats: dict, key_name: str):
+        self.stats = stats
+        self.key_name = key_name
+        self._heap = [(-player_stats[key_name], -order, player_id)
+                      for order, (player_id, player_stats) in enumerate(stats.items())]
+        heapq.heapify(self._heap)
+        self._ranked: list = []
+
+    def __len__(self) -> int:
+        return len(self.stats)
+
+    def ranked(self) -> Iterator:
+        """Yields player ids in rank order, ranking more of the heap only as the iterator is advanced"""
+        position = 0
+        while True:
+            if position == len(self._ranked):
+                if not self._heap:
+                    return
+                self._ranked.append(heapq.heappop(self._heap)[-1])
+            yield self._ranked[position]
+            position += 1
+
+    def top(self, amount: int) -> list:
+        return list(islice(self.ranked(), amount))
+
+
+__all__ = [
+    "LeaderboardIndex"
+]
@@ -0,0 +1,68 @@
+"""
+An opt-in NumPy engine for summing player totals, used by Bot.Stats when STATS_ENGINE is `numpy`
+
+Round payloads are flattened into columnar arrays (player index, score, kills, assists, deaths) and group summed with
+`np.bincount`, the kd/kda ratios are then calculated once per player from the totals.
+"""
+from typing import Iterable
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+stat_keys = ("score", "kills", "assists", "deaths")
+
+
+def flatten_rounds(matches: Iterable[dict]) -> tuple[list, "np.ndarray", list["np.ndarray"]]:
+    """
+    Flattens every player row of every round into columns
+
+    Returns the player ids in order of first appearance, the index of each row's player within those ids and one
+    column of values per stat key.
+    """
+    player_indexes: dict = {}
+    row_indexes: list[int] = []
+    columns: list[list] = [[] for _ in stat_keys]
+    score_column, kills_column, assists_column, deaths_column = columns
+    for match in matches:
+        for set in match["sets"]:
+            for _round in set["rounds"]:
+                for team_players in (_round["team1_players"] or [], _round["team2_players"] or []):
+                    for player in team_players:
+                        row_indexes.append(player_indexes.setdefault(player["player_id"], len(player_indexes)))
+                        score_column.append(player["score"])
+                        kills_column.append(player["kills"])
+                        assists_column.append(player["assists"])
+                        deaths_column.append(player["deaths"])
+    return (list(player_indexes),
+            np.array(row_indexes, dtype=np.int64),
+            [np.array(column) if column else np.empty(0, dtype=np.int64) for column in columns])
+
+
+def group_sum(row_indexes: "np.ndarray", column: "np.ndarray", player_count: int) -> list:
+    totals = np.bincount(row_indexes, weights=column, minlength=player_count)
+    if np.issubdtype(column.dtype, np.integer):
+        totals = totals.astype(np.int64)
+    return totals.tolist()
+
+
+def sum_player_totals(matches: Iterable[dict], players: dict = None) -> dict:
+    """Equivalent to Bot.Stats.python_sum_player_totals, summing the flattened rows with NumPy"""
+    players = {} if players is None else players
+    player_ids, row_indexes, columns = flatten_rounds(matches)
+    if not player_ids:
+        return players
+    column_totals = [group_sum(row_indexes, column, len(player_ids)) for column in columns]
+    for player_id, player_totals in zip(player_ids, zip(*column_totals)):
+        if not (player_dict := players.get(player_id, None)):
+            player_dict = players[player_id] = {key: 0 for key in stat_keys}
+        for key, total in zip(stat_keys, player_totals):
+            player_dict[key] += total
+    return players
+
+
+__all__ = [
+    "flatten_rounds",
+    "sum_player_totals"
+]
@@ -1,26 +1,50 @@
+import time
+
+import_started = time.perf_counter()  # Read by `python -m Bot --profile-startup`
+
+import asyncio
 import logging
 import os
 
 import yaml
 import aiofiles
+import orjson
 
+from collections import Counter
+from contextlib import asynccontextmanager
 from logging import config
 from pathlib import Path
+from typing import Optional
 from urllib import parse
 
 from aiohttp import ClientSession
+from aiohttp import ClientTimeout
+from aiohttp import StreamReader
+from aiohttp import TCPConnector
 from aiohttp.client_exceptions import ClientConnectionError
 
-from discord import Embed
-from discord import Color
 from discord.ext import commands
 from discord.ext.commands import AutoShardedBot
 from discord.ext.commands import Context
-from discord import Intents
 
 from dotenv import load_dotenv
 
+from Bot.API import APIUnavailable
+from Bot.API import CircuitBreaker
+from Bot.API import JSONArrayDecoder
+from Bot.API import ResponseCache
+from Bot.API import RetryPolicy
+from Bot.Cluster import ClusterClient
 from Bot.Config.config import Config
+from Bot.Embeds import EmbedTemplate
+from Bot.Embeds import RenderCache
+from Bot.Gateway import get_cache_profile
+from Bot.Guilds import GuildIndex
+from Bot.Logging import QueueLogging
+from Bot.Metrics import metrics
+from Bot.Outbox import Outbox
+from Bot.Outbox import QueuedContext
+from Bot.Scheduler import Scheduler
 
 root_path = Path(__file__).parent
 log = logging.getLogger(__name__)
@@ -29,21 +53,99 @@ environment_path = root_path.parent / ".env"
 
 config_path = root_path.parent / "config.json"
 
+stats_path = root_path.parent / "match_stats.json"
+
+signups_path = root_path.parent / "signups.json"
+
 bot_config = Config(config_path)
 
-if environment_path.exists():
-    load_dotenv(environment_path)
-else:
-    log.warning("A .env file is not defined in the Bot directory, "
-                "ensure your variables are exported in the environment")
+queue_logging = QueueLogging()
+
+environment_loaded = False
+
+
+def load_environment() -> None:
+    """Loads the .env file into the environment, only the first call reads it"""
+    global environment_loaded
+    if environment_loaded:
+        return
+    environment_loaded = True
+    if environment_path.exists():
+        load_dotenv(environment_path)
+    else:
+        log.warning("A .env file is not defined in the Bot directory, "
+                    "ensure your variables are exported in the environment")
 
 
 class Bot(AutoShardedBot):
 
     def __init__(self,
-                 command_prefix: str = (bot_config.prefix or "-"),
+                 command_prefix: str = None,
                  **options):
-        super().__init__(command_prefix, **options)
+        super().__init__(command_prefix or bot_config.prefix or "-", **options)
+        self.scheduler = Scheduler(self.loop, self.wait_until_ready)
+        self.outbox = Outbox(self.loop)
+        self.embed_renders = RenderCache()
+        self.guild_index = GuildIndex()
+        for event_name, guild_index_listener in self.guild_index.listeners.items():
+            self.add_listener(guild_index_listener, event_name)
+        self._embed_template: Optional[EmbedTemplate] = None
+        self.cluster: Optional[ClusterClient] = None
+        bot_config.subscribe(self.reload_config)
+        self.metrics = metrics
+        self.metrics.instrument_http(self.http)
+        self.metrics.add_source("scheduler", self.scheduler.stats, label="job", per_label=True)
+        self.metrics.add_source("outbox", self.outbox.stats, label="route")
+        self.metrics.add_source("api_cache", APIRequest.cache_stats)
+        self.metrics.add_source("api_single_flight", APIRequest.single_flight_stats, label="endpoint")
+        self.metrics.add_source("api_resilience", APIRequest.resilience_stats)
+        self.metrics.add_source("config", bot_config.stats)
+        self.metrics.add_source("guild_index", self.guild_index.stats)
+        self.metrics.add_source("embed_renders", self.embed_renders.stats)
+
+    def join_cluster(self, cluster: ClusterClient):
+        """
+        Runs the bot as a worker of a cluster, sharing API responses and config writes with the other workers and
+        running singleton jobs only while it is the leader
+        """
+        self.cluster = cluster
+        self.scheduler.leader = cluster.is_leader
+        APIRequest.cluster = cluster
+        self.metrics.add_source("cluster", cluster.stats)
+        cluster.start()
+
+    def reload_config(self, config_dict: dict):
+        self.command_prefix = config_dict["MFC-Guild"]["Prefix"] or "-"
+        self._embed_template = None
+        self.embed_renders.clear()
+
+    async def get_context(self, message, *, cls=QueuedContext):
+        return await super().get_context(message, cls=cls)
+
+    async def invoke(self, ctx: Context):
+        """
+        Times the invocation, from where `on_command` is dispatched to where `on_command_completion` or
+        `on_command_error` is, and counts the API requests the command made
+        """
+        if ctx.command is None:
+            return await super().invoke(ctx)
+        scope, token = self.metrics.start_command(ctx.command.qualified_name)
+        start = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        finally:
+            self.metrics.finish_command(scope, token, time.perf_counter() - start,
+                                        "failed" if ctx.command_failed else "completed")
+
+    async def close(self):
+        self.scheduler.cancel_all()
+        await self.outbox.close()
+        await bot_config.close()
+        if self.cluster:
+            await self.cluster.close()
+        await APIRequest.close_session()
+        await self.metrics.close()
+        await super().close()
 
     @staticmethod
     async def write(path, data: str):
@@ -55,26 +157,34 @@ class Bot(AutoShardedBot):
         async with aiofiles.open(path, encoding="UTF-8") as f:
             return await f.read()
 
-    def default_embed(self, **embed_kwargs):
-        class DefaultEmbed(Embed):
-
-            def __init__(self, **kwargs):
-                color_rgb = bot_config.config_dict["Embed-Color"]
-                super().__init__(color=Color.from_rgb(r=color_rgb["r"], g=color_rgb["g"], b=color_rgb["b"]),
-                                 **kwargs)
+    def embed_template(self) -> EmbedTemplate:
+        """The default embed template, rebuilt after a config reload or when the bot's name or avatar changes"""
+        key = (self.user.id, self.user.avatar, self.user.display_name)
+        if self._embed_template is None or self._embed_template.key != key:
+            self._embed_template = EmbedTemplate.build(
+                key,
+                bot_config.config_dict["Embed-Color"],
+                name=self.user.display_name,
+                url=os.getenv("API_URL", default="https://www.discord.com"),
+                avatar_url=str(self.user.avatar_url),
+                footer_text=f"Written by Sbinalla (Price Hiller)"
+            )
+            self.embed_renders.clear()
+        return self._embed_template
 
-        embed = DefaultEmbed(**embed_kwargs)
+    def default_embed(self, **embed_kwargs):
+        return self.embed_template().create(**embed_kwargs)
 
-        embed.set_author(name=self.user.display_name,
-                         url=os.getenv("API_URL", default="https://www.discord.com"),
-                         icon_url=self.user.avatar_url)
-        embed.set_thumbnail(url=self.user.avatar_url)
-        embed.set_footer(text=f"Written by Sbinalla (Price Hiller)", icon_url=self.user.avatar_url)
-        return embed
+    def render_embeds(self, key, render) -> list:
+        """Memoises a renderer of default embeds that renders the same embeds for the same key"""
+        self.embed_template()  # Drops the memoised embeds if the template they were built on is out of date
+        return self.embed_renders.get_or_render(key, render)
 
     async def on_command_error(self, ctx: commands.Context, exception: commands.errors.CommandInvokeError):
         error = getattr(exception, "original", exception)
-        if isinstance(error, commands.errors.CheckFailure):
+        if isinstance(error, APIUnavailable):
+            await ctx.send(str(error))
+        elif isinstance(error, commands.errors.CheckFailure):
             log.debug(f"Check function checking command {ctx.command} failed")
         elif isinstance(error, commands.errors.MissingRequiredArgument):
             log.debug(f"Argument was missing for {ctx.command}, {exception}")
@@ -103,15 +213,19 @@ class Bot(AutoShardedBot):
         Override the on_command function to log all command usages through the Bot
         """
 
-        try:
-            log.info(f'{ctx.author} ({ctx.author.id}) invoked a command '
-                     f'\"{ctx.message.content}\" in the guild {ctx.guild} ({ctx.guild.id}) '
-                     f'in channel {ctx.channel.name} ({ctx.channel.id})')
-        except AttributeError:
-            log.info(f'{ctx.author} ({ctx.author.id}) invoked a command '
-                     f'\"{ctx.message.content}\" in DMs ({ctx.channel.id})')
+        if ctx.guild:
+            log.info("%s (%s) invoked a command \"%s\" in the guild %s (%s) in channel %s (%s)",
+                     ctx.author, ctx.author.id, ctx.message.content, ctx.guild, ctx.guild.id,
+                     ctx.channel.name, ctx.channel.id)
+        else:
+            log.info("%s (%s) invoked a command \"%s\" in DMs (%s)",
+                     ctx.author, ctx.author.id, ctx.message.content, ctx.channel.id)
 
     async def on_ready(self):
+        bot_config.start_watching()
+        self.embed_template()
+        if metrics_port := os.getenv("METRICS_PORT"):
+            await self.metrics.serve(os.getenv("METRICS_HOST", default="127.0.0.1"), int(metrics_port))
         response = await APIRequest.post("/user/verify")
         if response.status == 200:
             log.info(f"Connected and authenticated with the API at: {APIRequest.api_url}")
@@ -125,10 +239,68 @@ class Bot(AutoShardedBot):
 
 
 class APIRequest:
-    api_url = os.getenv("API_URL").strip("/")
-    log.debug(f"API url registered as {api_url}")
-    api_token = os.getenv("API_TOKEN")
-    headers = {"Authorization": "Bearer " + api_token}
+    # Read from the environment by `configure`
+    api_url: str = None
+    api_token: str = None
+    headers: dict = None
+
+    pool_size = 100
+    pool_size_per_host = 20
+    keepalive_timeout = 30.0
+    dns_cache_ttl = 300
+
+    configured = False
+
+    stream_chunk_size = 64 * 1024
+
+    session: ClientSession = None
+
+    # Set when the bot runs as a cluster worker, responses are then shared with the other workers
+    cluster: Optional[ClusterClient] = None
+
+    in_flight: dict[str, asyncio.Task] = {}
+    issued_gets = 0
+    coalesced_gets = 0
+    coalesced_by_endpoint: Counter = Counter()
+
+    # Seconds a request may take from connecting to reading the whole body, by endpoint path, `timeout` for the
+    # endpoints not listed. Streamed responses are read for as long as data keeps arriving, for them the timeout
+    # bounds each read instead. Every connection attempt is bounded by `connect_timeout`.
+    timeout = 10.0
+    connect_timeout = 3.0
+    endpoint_timeouts = {
+        "/team/all": 15.0
+    }
+
+    # GETs are retried when the API can't be reached, times out or answers with one of `retry_statuses`, which
+    # along with those errors count as failures towards opening the circuit. Other requests are never retried.
+    retry = RetryPolicy(attempts=3, base_delay=0.2, max_delay=2.0)
+    retry_statuses = frozenset({502, 503, 504})
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    retried_gets = 0
+    timeouts = 0
+
+    # Seconds a successful GET of each read-only endpoint is cached for, endpoints not listed here are never cached
+    cache_ttls = {
+        "/team/all": 60,
+        "/team/discord-id": 300,
+        "/team/id": 300,
+        "/player/discord-id": 300,
+        "/player/playfab-id": 300,
+        "/player/id": 300
+    }
+    cache = ResponseCache(cache_ttls, max_bytes=8 * 1024 * 1024)
+
+    # The query parameters of each mutating endpoint naming the API objects it changes, as (parameter, tag kind)
+    cache_invalidations = {
+        "/team/create": (),
+        "/team/add-player-to-team": (("player_id", "player"), ("team_id", "team")),
+        "/team/remove-player-from-team": (("player_id", "player"), ("team_id", "team")),
+        "/team/update-elo": (("team_id", "team"),),
+        "/team/name": (("team_id", "team"),),
+        "/team/delete": (("team_id", "team"),),
+        "/player/update-discord-id": (("player_id", "player"),)
+    }
 
     class Response:
 
@@ -136,47 +308,388 @@ class APIRequest:
             self.json = json
             self.status = status
 
+    class StreamResponse:
+
+        def __init__(self, status: int, content: StreamReader = None):
+            self.status = status
+            self.content = content
+
+        async def items(self):
+            """Yields the elements of the response's JSON array as the body is read"""
+            if self.content is None:
+                return
+            decoder = JSONArrayDecoder()
+            async for chunk in self.content.iter_chunked(APIRequest.stream_chunk_size):
+                for item in decoder.feed(chunk):
+                    yield item
+            for item in decoder.close():
+                yield item
+
+    @classmethod
+    def configure(cls):
+        """Reads the API's url, token and connection settings from the environment, run before the first request"""
+        load_environment()
+        cls.api_url = os.getenv("API_URL", default="").strip("/")
+        if not cls.api_url:
+            log.warning("API_URL is not set, every API request will fail")
+        cls.api_token = os.getenv("API_TOKEN", default="")
+        cls.headers = {"Authorization": "Bearer " + cls.api_token}
+        cls.pool_size = int(os.getenv("API_POOL_SIZE", default=cls.pool_size))
+        cls.pool_size_per_host = int(os.getenv("API_POOL_SIZE_PER_HOST", default=cls.pool_size_per_host))
+        cls.keepalive_timeout = float(os.getenv("API_KEEPALIVE_TIMEOUT", default=cls.keepalive_timeout))
+        cls.dns_cache_ttl = int(os.getenv("API_DNS_CACHE_TTL", default=cls.dns_cache_ttl))
+        cls.cache.max_bytes = int(os.getenv("API_CACHE_MAX_BYTES", default=cls.cache.max_bytes))
+        cls.timeout = float(os.getenv("API_TIMEOUT", default=cls.timeout))
+        cls.connect_timeout = float(os.getenv("API_CONNECT_TIMEOUT", default=cls.connect_timeout))
+        for endpoint_timeout in os.getenv("API_ENDPOINT_TIMEOUTS", default="").split(","):
+            if endpoint_timeout.strip():
+                path, seconds = endpoint_timeout.rsplit("=", 1)
+                cls.endpoint_timeouts[path.strip()] = float(seconds)
+        cls.retry.attempts = int(os.getenv("API_RETRY_ATTEMPTS", default=cls.retry.attempts))
+        if cls.retry.attempts < 1:
+            log.warning(f"API_RETRY_ATTEMPTS is {cls.retry.attempts}, every GET is still attempted once")
+            cls.retry.attempts = 1
+        cls.breaker.failure_threshold = int(os.getenv("API_BREAKER_THRESHOLD", default=cls.breaker.failure_threshold))
+        cls.breaker.reset_timeout = float(os.getenv("API_BREAKER_RESET", default=cls.breaker.reset_timeout))
+        cls.configured = True
+        log.debug("API url registered as %s", cls.api_url)
+
+    @classmethod
+    def url(cls, endpoint: str) -> str:
+        if not cls.configured:
+            cls.configure()
+        return cls.api_url + endpoint
+
+    @classmethod
+    def request_timeout(cls, endpoint: str, stream: bool = False) -> ClientTimeout:
+        seconds = cls.endpoint_timeouts.get(parse.urlparse(endpoint).path, cls.timeout)
+        if stream:
+            return ClientTimeout(total=None, sock_connect=cls.connect_timeout, sock_read=seconds)
+        return ClientTimeout(total=seconds, sock_connect=cls.connect_timeout)
+
+    @staticmethod
+    def is_available():
+        """A command check failing at once, with APIUnavailable, while the API circuit is open"""
+        async def predicate(ctx: Context):
+            if not APIRequest.breaker.available():
+                raise APIUnavailable(APIRequest.breaker.retry_after())
+            return True
+
+        return commands.check(predicate)
+
+    @classmethod
+    def resilience_stats(cls) -> dict:
+        return {
+            **cls.breaker.stats(),
+            "retried_gets": cls.retried_gets,
+            "timeouts": cls.timeouts
+        }
+
+    @staticmethod
+    def decode(body: bytes):
+        return orjson.loads(body) if body.strip() else {}
+
     @staticmethod
     def verify_url(url: str, checks=("scheme", "netloc")):
         valid_url = parse.urlparse(url)
         return all([getattr(valid_url, check_attr) for check_attr in checks])
 
+    @classmethod
+    def get_session(cls) -> ClientSession:
+        """
+        Returns the shared session for the API, creating it on first use
+
+        The session (and its connection pool) lives for as long as the bot does, see `close_session`
+        """
+        if cls.session is None or cls.session.closed:
+            if not cls.configured:
+                cls.configure()
+            connector = TCPConnector(limit=cls.pool_size,
+                                     limit_per_host=cls.pool_size_per_host,
+                                     keepalive_timeout=cls.keepalive_timeout,
+                                     use_dns_cache=True,
+                                     ttl_dns_cache=cls.dns_cache_ttl)
+            cls.session = ClientSession(headers=cls.headers,
+                                        connector=connector,
+                                        json_serialize=lambda data: orjson.dumps(data).decode())
+            log.debug(f"Opened API session, pool size {cls.pool_size} ({cls.pool_size_per_host} per host)")
+        return cls.session
+
+    @classmethod
+    async def close_session(cls):
+        if cls.session is not None and not cls.session.closed:
+            await cls.session.close()
+            log.debug(f"Closed API session")
+        cls.session = None
+
     @classmethod
     async def get(cls, endpoint: str = "/") -> Response:
-        full_url = cls.api_url + endpoint
+        """
+        Issues a GET request to the API
+
+        Concurrent GETs for the same URL are coalesced, they share a single request and the same Response object, so
+        callers must not mutate the returned json.
+        """
+        full_url = cls.url(endpoint)
+        if cached := cls.cache.get(endpoint):
+            log.debug("GET request to %s served from the cache", full_url)
+            return cached
+        if pending := cls.in_flight.get(full_url):
+            cls.coalesced_gets += 1
+            cls.coalesced_by_endpoint[parse.urlparse(full_url).path] += 1
+            log.debug("GET request to %s coalesced with the request already in flight", full_url)
+            return await asyncio.shield(pending)
+
+        cls.issued_gets += 1
+        request = cls.in_flight[full_url] = asyncio.ensure_future(cls._get(full_url, endpoint))
+
+        def remove_in_flight(_):
+            if cls.in_flight.get(full_url) is request:
+                del cls.in_flight[full_url]
+
+        request.add_done_callback(remove_in_flight)
+        return await asyncio.shield(request)
+
+    @classmethod
+    def single_flight_stats(cls) -> dict:
+        return {
+            "issued": cls.issued_gets,
+            "coalesced": cls.coalesced_gets,
+            "in_flight": len(cls.in_flight),
+            "coalesced_by_endpoint": dict(cls.coalesced_by_endpoint)
+        }
+
+    @staticmethod
+    def cache_tags(endpoint: str, json) -> set[tuple]:
+        """Tags a cached response with the teams and players it contains"""
+        path = parse.urlparse(endpoint).path
+        tags = set()
+        if path == "/team/all":
+            tags.add(("teams",))
+        for item in (json if isinstance(json, list) else [json]):
+            if not isinstance(item, dict) or "id" not in item:
+                continue
+            if path.startswith("/team/"):
+                tags.add(("team", str(item["id"])))
+                tags.update(("player", str(player["id"])) for player in item.get("players") or [] if "id" in player)
+            elif path.startswith("/player/"):
+                tags.add(("player", str(item["id"])))
+        return tags
+
+    @classmethod
+    def invalidate_cache(cls, endpoint: str, data: dict = None) -> int:
+        """Invalidates the cached responses holding what a mutating request to the endpoint changes"""
+        url = parse.urlparse(endpoint)
+        if url.path not in cls.cache_invalidations:
+            return 0
+        query = dict(parse.parse_qsl(url.query))
+        tags = {("teams",)}
+        endpoints = set()
+        for parameter, kind in cls.cache_invalidations[url.path]:
+            if parameter in query:
+                tags.add((kind, query[parameter]))
+        if url.path == "/player/update-discord-id" and "discord_id" in query:
+            endpoints.add(f"/player/discord-id?discord_id={query['discord_id']}")
+        if url.path == "/team/create" and data and "discord_id" in data:
+            endpoints.add(f"/team/discord-id?discord_id={data['discord_id']}")
+        invalidated = cls.cache.invalidate(endpoints=endpoints, tags=tags)
+        if cls.cluster:
+            cls.cluster.publish_invalidation(endpoints, tags)
+        log.debug("Invalidated %s cached responses after a request to %s", invalidated, endpoint)
+        return invalidated
+
+    @classmethod
+    def cache_stats(cls) -> dict:
+        return cls.cache.stats()
+
+    @staticmethod
+    def observe(method: str, endpoint: str, status, start: float):
+        """Records the time taken by a request to the endpoint since `start`, by the endpoint's path"""
+        metrics.observe_api(method, parse.urlparse(endpoint).path, status, time.perf_counter() - start)
+
+    @classmethod
+    async def _get(cls, full_url: str, endpoint: str) -> Response:
         if not cls.verify_url(full_url):
             return cls.Response({}, 418)
-        async with ClientSession(headers=cls.headers) as session:
-            try:
-                log.debug(f"GET request issued to {full_url}")
-                async with session.get(full_url, ssl=False) as get_session:
-                    json_dict = await get_session.json() or {}
-                    return cls.Response(json_dict, get_session.status)
-            except ClientConnectionError as error:
-                log.warning(f"Could not connect to the API at url {cls.api_url}, error: {error}")
-                return cls.Response({}, 400)
-            except UnicodeError:
-                log.warning(f"Unicode error thrown due to URL, likely malformed, URL: {full_url}")
-                return cls.Response({}, 400)
+        cache_version = cls.cache.version
+        shared_version = None
+        if cls.cluster and cls.cache.cacheable(endpoint):
+            shared_version = cls.cluster.shared_version
+            if shared := await cls.cluster.cache_get(endpoint):
+                log.debug("GET request to %s served from the cluster's shared cache", full_url)
+                response = cls.Response(shared.json, 200)
+                cls.cache.put(endpoint, response, size=shared.size, tags=cls.cache_tags(endpoint, shared.json),
+                              version=cache_version, ttl=shared.ttl)
+                return response
+        response = None
+        for attempt in range(cls.retry.attempts):
+            if attempt:
+                await asyncio.sleep(cls.retry.delay(attempt - 1))
+                cls.retried_gets += 1
+            if not cls.breaker.allow():
+                log.debug("GET request to %s refused, the API circuit is open", full_url)
+                return response or cls.Response({}, 503)
+            response, retry = await cls._attempt_get(full_url, endpoint, cache_version, shared_version)
+            if not retry:
+                break
+        return response
+
+    @classmethod
+    async def _attempt_get(cls, full_url: str, endpoint: str, cache_version: int,
+                           shared_version: Optional[int]) -> tuple[Response, bool]:
+        """Makes one attempt at a GET the circuit breaker let through, returns the response and whether to retry it"""
+        session = cls.get_session()
+        start = time.perf_counter()
+        status = "error"
+        verdict = None
+        try:
+            log.debug("GET request issued to %s", full_url)
+            async with session.get(full_url, ssl=False, timeout=cls.request_timeout(endpoint)) as get_session:
+                status = get_session.status
+                verdict = get_session.status not in cls.retry_statuses
+                body = await get_session.read()
+                json_dict = cls.decode(body) or {}
+                response = cls.Response(json_dict, get_session.status)
+                if response.status == 200:
+                    tags = cls.cache_tags(endpoint, json_dict)
+                    cached = cls.cache.put(endpoint, response, size=len(body), tags=tags, version=cache_version)
+                    if cached and shared_version is not None:
+                        cls.cluster.publish_cache(endpoint, json_dict, len(body), tags, shared_version)
+                return response, not verdict
+        except (asyncio.TimeoutError, ClientConnectionError) as error:
+            verdict = False
+            if cls.timed_out(error):
+                status = "timeout"
+                cls.timeouts += 1
+                log.warning(f"The API did not respond in time for the URL: {full_url}")
+                return cls.Response({}, 504), True
+            log.warning(f"Could not connect to the API at url {cls.api_url}, error: {error!r}")
+            return cls.Response({}, 503), True
+        except UnicodeError:
+            log.warning(f"Unicode error thrown due to URL, likely malformed, URL: {full_url}")
+            return cls.Response({}, 400), False
+        except orjson.JSONDecodeError as error:
+            log.warning(f"The API responded with invalid JSON for the URL: {full_url}, error: {error}")
+            return cls.Response({}, 400), False
+        finally:
+            cls.record(verdict)
+            cls.observe("GET", endpoint, status, start)
+
+    @staticmethod
+    def timed_out(error: Exception) -> bool:
+        """
+        Whether a request failed by timing out, aiohttp raises ServerTimeoutError, a ClientConnectionError, for read
+        timeouts and on Python 3.11, where TimeoutError is an OSError, wraps the total timeout in a ClientOSError
+        """
+        return isinstance(error, asyncio.TimeoutError) or isinstance(error.__cause__, asyncio.TimeoutError)
+
+    @classmethod
+    def record(cls, verdict: Optional[bool]):
+        """Tells the circuit breaker how a request it let through went, None if it never reached the API"""
+        if verdict is None:
+            cls.breaker.release()
+        elif verdict:
+            cls.breaker.record_success()
+        else:
+            cls.breaker.record_failure()
+
+    @classmethod
+    @asynccontextmanager
+    async def stream(cls, endpoint: str = "/"):
+        """
+        Issues a GET request whose JSON array body is decoded incrementally, use as an async context manager
+
+        >>> async with APIRequest.stream("/match/all") as response:
+        >>>     if response.status == 200:
+        >>>         async for match in response.items():
+        >>>             ...
+
+        Errors raised while reading the body (ClientError, ValueError) propagate out of `items`. The request is timed
+        until the response's headers arrive, reading the body is left to the caller.
+        """
+        full_url = cls.url(endpoint)
+        if not cls.verify_url(full_url):
+            yield cls.StreamResponse(418)
+            return
+        if not cls.breaker.allow():
+            log.debug("Streaming GET request to %s refused, the API circuit is open", full_url)
+            yield cls.StreamResponse(503)
+            return
+        session = cls.get_session()
+        start = time.perf_counter()
+        try:
+            log.debug("Streaming GET request issued to %s", full_url)
+            get_session = await session.get(full_url, ssl=False, timeout=cls.request_timeout(endpoint, stream=True))
+        except (asyncio.TimeoutError, ClientConnectionError) as error:
+            cls.record(False)
+            if cls.timed_out(error):
+                log.warning(f"The API did not respond in time for the URL: {full_url}")
+                cls.timeouts += 1
+                cls.observe("GET", endpoint, "timeout", start)
+                yield cls.StreamResponse(504)
+            else:
+                log.warning(f"Could not connect to the API at url {cls.api_url}, error: {error!r}")
+                cls.observe("GET", endpoint, "error", start)
+                yield cls.StreamResponse(503)
+            return
+        except UnicodeError:
+            log.warning(f"Unicode error thrown due to URL, likely malformed, URL: {full_url}")
+            cls.record(None)
+            cls.observe("GET", endpoint, "error", start)
+            yield cls.StreamResponse(400)
+            return
+        except BaseException:
+            cls.record(None)  # Cancelled while connecting
+            raise
+        cls.record(get_session.status not in cls.retry_statuses)
+        cls.observe("GET", endpoint, get_session.status, start)
+        try:
+            yield cls.StreamResponse(get_session.status, get_session.content)
+        finally:
+            get_session.release()
 
     @classmethod
     async def post(cls, endpoint: str = "/", data: dict = None) -> Response:
-        full_url = cls.api_url + endpoint
+        full_url = cls.url(endpoint)
         if not cls.verify_url(full_url):
             log.warning(f"URL {full_url} is not a valid url!")
             return cls.Response({}, 400)
-        async with ClientSession(headers=cls.headers) as session:
-            try:
-                log.debug(f"POST request issued to {full_url}")
-                async with session.post(full_url, json=data, ssl=False) as post_session:
-                    json_dict = await post_session.json() or {}
-                    return cls.Response(json_dict, post_session.status)
-            except UnicodeError:
-                log.warning(f"Unicode error thrown due to URL, likely malformed, URL: {full_url}")
-                return cls.Response({}, 400)
-            except ClientConnectionError as error:
-                log.warning(f"Could not connect to the API at url {cls.api_url}, error: {error}")
-                return cls.Response({}, 400)
+        if not cls.breaker.allow():
+            log.debug("POST request to %s refused, the API circuit is open", full_url)
+            return cls.Response({}, 503)
+        session = cls.get_session()
+        start = time.perf_counter()
+        status = "error"
+        verdict = None
+        try:
+            log.debug("POST request issued to %s", full_url)
+            async with session.post(full_url, json=data, ssl=False,
+                                    timeout=cls.request_timeout(endpoint)) as post_session:
+                status = post_session.status
+                verdict = post_session.status not in cls.retry_statuses
+                json_dict = cls.decode(await post_session.read()) or {}
+                return cls.Response(json_dict, post_session.status)
+        except UnicodeError:
+            log.warning(f"Unicode error thrown due to URL, likely malformed, URL: {full_url}")
+            return cls.Response({}, 400)
+        except (asyncio.TimeoutError, ClientConnectionError) as error:
+            verdict = False
+            if cls.timed_out(error):
+                # The write may still have been made, the caller can't tell, so it is not retried
+                status = "timeout"
+                cls.timeouts += 1
+                log.warning(f"The API did not respond in time for the URL: {full_url}")
+                return cls.Response({}, 504)
+            log.warning(f"Could not connect to the API at url {cls.api_url}, error: {error!r}")
+            return cls.Response({}, 503)
+        except orjson.JSONDecodeError as error:
+            log.warning(f"The API responded with invalid JSON for the URL: {full_url}, error: {error}")
+            return cls.Response({}, 400)
+        finally:
+            cls.record(verdict)
+            cls.observe("POST", endpoint, status, start)
+            # After the write, so reads racing it can't cache what it replaced
+            cls.invalidate_cache(endpoint, data)
 
 
 def setup_logging() -> None:
@@ -193,6 +706,8 @@ def setup_logging() -> None:
         return
 
     config.dictConfig(log_config)
+    if os.getenv("LOG_QUEUE", default="true").casefold() != "false":
+        queue_logging.start()
 
 
 def dynamic_env_parse(instance_vars, base_match: str, object):
@@ -224,10 +739,35 @@ def dynamic_env_parse(instance_vars, base_match: str, object):
     return instance_vars
 
 
-bot = Bot(intents=Intents.all())
+_bot: Optional[Bot] = None
+
+
+def get_bot(**options) -> Bot:
+    """
+    The bot, constructed on first use so importing the package does not create it or its event loop
+
+    The intents and caches come from the CACHE_PROFILE environment variable's profile, see `Bot.Gateway`. `options`
+    are passed to the bot when this call constructs it, such as the `loop` to run on, and override the profile's.
+    """
+    global _bot
+    if _bot is None:
+        profile = get_cache_profile(os.getenv("CACHE_PROFILE"))
+        log.info(f"Using the {profile.name} cache profile")
+        _bot = Bot(**{**profile.options(), **options})
+    return _bot
+
+
+def __getattr__(name: str):
+    # `from Bot import bot` keeps working, it constructs the bot if nothing did yet
+    if name == "bot":
+        return get_bot()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
+# `bot` is left out, `from Bot import *` must not construct the bot
 __all__ = [
-    "bot",
+    "get_bot",
+    "load_environment",
     "dynamic_env_parse",
     "setup_logging",
     "Bot",
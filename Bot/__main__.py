@@ -1,34 +1,185 @@
+import argparse
 import os
 import asyncio
 import logging
+import signal
+import sys
+import time
+
+from contextlib import contextmanager
+from typing import Optional
 
 import uvloop
 
-from Bot import bot
+import Bot as bot_package
+from Bot import APIRequest
+from Bot import bot_config
+from Bot import root_path
+from Bot import get_bot
+from Bot import load_environment
 from Bot import setup_logging
+from Bot.API import ResponseCache
 from Bot.Cogs import BaseCog
+from Bot.Cogs import cog_manifest
+from Bot.Cluster import ClusterClient
+from Bot.Cluster import ClusterCoordinator
+from Bot.Cluster import Supervisor
+from Bot.Cluster import shard_of
+from Bot.Cluster import worker_shard_ids
 
 log = logging.getLogger(__name__)
 
 
-def main():
-    setup_logging()
+class StartupProfile:
+    """The time taken by each phase of startup, from the first import of the Bot package until the bot is ready"""
+
+    def __init__(self, started: float):
+        self.started = started
+        self.finished: Optional[float] = None
+        self.phases: list[tuple[str, float]] = []
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.perf_counter() - start))
+
+    def record(self, name: str, seconds: float):
+        self.phases.append((name, seconds))
+
+    def finish(self):
+        """Marks the bot ready, the end of startup"""
+        self.finished = time.perf_counter()
+
+    def report(self) -> str:
+        """The phases so far, and the total up to the bot being ready, or until now if it never was"""
+        lines = [f"{name:<40} {seconds * 1000:10.1f}ms" for name, seconds in self.phases]
+        lines.append(f"{'total':<40} {((self.finished or time.perf_counter()) - self.started) * 1000:10.1f}ms")
+        return "\n".join(lines)
+
+
+def cog_groups(variable: str, default: str) -> list[str]:
+    return [group.strip() for group in os.getenv(variable, default=default).split(",") if group.strip()]
+
+
+class ClusterSettings:
+    """How the bot is split across worker processes, read from the environment and the command line"""
+
+    def __init__(self, workers: int = None):
+        self.workers = workers or int(os.getenv("CLUSTER_WORKERS", default=1))
+        self.shard_count = int(os.getenv("CLUSTER_SHARDS", default=self.workers))
+        self.socket_path = os.getenv("CLUSTER_SOCKET", default=str(root_path.parent / ".cluster.sock"))
+        self.lease = float(os.getenv("CLUSTER_LEASE", default=10))
+
+    def worker_command(self, index: int) -> list[str]:
+        return [sys.executable, "-m", "Bot", "--worker-index", str(index), *sys.argv[1:]]
 
-    loop = bot.loop
+    def environment(self) -> dict:
+        # Passed to the workers, so they split the shards the same way whether set by flag or environment
+        return {"CLUSTER_WORKERS": str(self.workers), "CLUSTER_SHARDS": str(self.shard_count),
+                "CLUSTER_SOCKET": self.socket_path}
+
+
+def supervise(cluster: ClusterSettings):
+    """Runs the cluster coordinator and a process for each worker until interrupted"""
+    setup_logging()
     uvloop.install()
-    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    shared_cache = ResponseCache(APIRequest.cache_ttls, max_bytes=APIRequest.cache.max_bytes)
+    coordinator = ClusterCoordinator(cluster.socket_path, shared_cache, lease=cluster.lease)
+    supervisor = Supervisor(cluster.workers, cluster.worker_command, coordinator, env=cluster.environment())
+    log.info(f"Running {cluster.workers} workers over {cluster.shard_count} shards")
+    try:
+        loop.run_until_complete(supervisor.run())
+    except KeyboardInterrupt:
+        log.info("Shutting down the cluster")
+    finally:
+        loop.run_until_complete(supervisor.stop())
+        log.info("Successfully ended")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m Bot", description="Runs the MFC discord bot")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print how long each phase of startup took, up to the bot being ready, on shutdown")
+    parser.add_argument("--workers", type=int,
+                        help="Run the bot as a cluster of this many worker processes, overrides CLUSTER_WORKERS")
+    parser.add_argument("--worker-index", type=int, help=argparse.SUPPRESS)  # Set by the supervisor for its workers
+    args = parser.parse_args()
+
+    profile = StartupProfile(bot_package.import_started)
+    profile.record("import Bot", time.perf_counter() - bot_package.import_started)
+    with profile.phase("environment"):
+        load_environment()
+        APIRequest.configure()
+        cluster = ClusterSettings(args.workers)
+    if cluster.workers > 1 and args.worker_index is None:
+        supervise(cluster)
+        return
+    with profile.phase("logging"):
+        setup_logging()
+    with profile.phase("config"):
+        bot_config.config_dict  # Read here rather than on first use, so reading it is timed on its own
+
+    with profile.phase("event loop and bot"):
+        # Before the bot is constructed, so it runs on a uvloop loop
+        uvloop.install()
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        if args.worker_index is None:
+            bot = get_bot(loop=loop)
+        else:
+            shard_ids = worker_shard_ids(args.worker_index, cluster.workers, cluster.shard_count)
+            bot = get_bot(loop=loop, shard_ids=shard_ids, shard_count=cluster.shard_count)
+            # Only the worker receiving the MFC guild's events can post to its channels, so only it may lead
+            guild_id = bot_config.config_dict["MFC-Guild"].get("Id")
+            candidate = not guild_id or shard_of(guild_id, cluster.shard_count) in shard_ids
+            bot.join_cluster(ClusterClient(args.worker_index, cluster.socket_path, APIRequest.cache, bot_config,
+                                           candidate=candidate))
+            log.info(f"Running as worker {args.worker_index} of {cluster.workers} with the shards {shard_ids}")
+
+    lazy_groups = cog_groups("LAZY_COG_GROUPS", "")
+    groups = [group for group in cog_groups("COG_GROUPS", ",".join(cog_manifest)) if group not in lazy_groups]
+    for module_name in BaseCog.group_modules(groups):
+        with profile.phase(f"cogs {module_name}"):
+            BaseCog.load_module(bot, module_name)
+
+    async def on_ready():
+        bot.remove_listener(on_ready)
+        profile.record("gateway to ready", time.perf_counter() - connect_started)
+        profile.finish()
+        log.info(f"Ready {time.perf_counter() - profile.started:.2f}s after startup began")
+        if lazy_modules := BaseCog.group_modules(lazy_groups):
+            await BaseCog.load_modules_lazily(bot, lazy_modules)
+
+    bot.add_listener(on_ready)
 
-    BaseCog.find_subclasses()
-    BaseCog.load_cogs(bot)
+    async def start():
+        nonlocal connect_started
+        with profile.phase("login"):
+            await bot.login(os.environ["DISCORD_BOT_TOKEN"])
+        connect_started = time.perf_counter()
+        await bot.connect()
 
-    loop.create_task(bot.start(os.environ["DISCORD_BOT_TOKEN"]))
+    connect_started = time.perf_counter()
+    loop.create_task(start())
+    # The supervisor stops its workers with SIGTERM, they close the bot as on an interrupt
+    loop.add_signal_handler(signal.SIGTERM, loop.stop)
 
     try:
         loop.run_forever()
     except KeyboardInterrupt:
+        pass
+    finally:
+        # Closing flushes a pending config write, so a Posted flag or message ids set just before are not lost
         log.info("Shutting down")
-        loop.create_task(bot.close())
+        loop.run_until_complete(bot.close())
         log.info("Successfully ended")
+        if args.profile_startup:
+            print(profile.report())  # Once, whether or not the bot became ready
 
 
 if __name__ == "__main__":
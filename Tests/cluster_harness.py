@@ -0,0 +1,189 @@
+"""
+A stand-in for Discord shared by the workers of a test cluster
+
+`DiscordStandIn` holds the messages of every channel and serves them over HTTP, so the workers of a cluster post to
+and edit the same board. Each write is recorded with the worker that made it and whether that worker was the
+coordinator's leader when the write arrived. On the `stall_at`th write it stops (SIGSTOP) the worker that made it
+for `stall` seconds before answering, so the worker's job outlives its lease mid-run.
+
+The workers reach it through RemoteGuild, a fake guild whose channels and messages make their REST calls to it.
+"""
+import asyncio
+import itertools
+import os
+import signal
+import time
+
+from types import SimpleNamespace
+from typing import Optional
+
+import discord
+
+from aiohttp import ClientSession
+from aiohttp import web
+
+import Benchmarks  # noqa: F401, sets the environment the Bot package expects
+from Benchmarks.fake_discord import FakeChannel
+from Benchmarks.fake_discord import FakeGuild
+from Benchmarks.fake_discord import FakeMessage
+from Bot.Cluster import ClusterCoordinator
+
+
+class DiscordStandIn:
+    """The messages of every channel, written to by the workers over HTTP"""
+
+    def __init__(self, coordinator: ClusterCoordinator, latency: float = 0.0, stall_at: int = None,
+                 stall: float = 0.0):
+        self.coordinator = coordinator
+        self.latency = latency
+        self.stall_at = stall_at
+        self.stall = stall
+        self.channels: dict[int, dict[int, dict]] = {}
+        self.writes: list[dict] = []
+        self.stalled: Optional[dict] = None
+        self.port = None
+        self._ids = itertools.count(900000000)
+        self._runner = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def find(self, message_id: int) -> Optional[dict]:
+        return next((messages for messages in self.channels.values() if message_id in messages), None)
+
+    async def record(self, request: web.Request, route: str):
+        """Records a write, stalling the worker that made it if it is the `stall_at`th"""
+        pid = int(request.headers["X-Pid"])
+        self.writes.append({"route": route, "worker": int(request.headers["X-Worker"]), "pid": pid,
+                            "leader": pid == self.coordinator.leader_pid, "received": time.monotonic()})
+        if len(self.writes) == self.stall_at:
+            # Stopped while it waits for the answer to this write, it resumes with the rest of its run ahead of it
+            os.kill(pid, signal.SIGSTOP)
+            self.stalled = {"pid": pid, "worker": self.writes[-1]["worker"], "stopped": time.monotonic()}
+            asyncio.get_event_loop().call_later(self.stall, self.resume, pid)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+    def resume(self, pid: int):
+        os.kill(pid, signal.SIGCONT)
+        self.stalled["resumed"] = time.monotonic()
+
+    async def send(self, request: web.Request) -> web.Response:
+        body = await request.json()  # A write takes effect once all of it has arrived
+        await self.record(request, "send")
+        message = {**body, "id": next(self._ids), "worker": int(request.headers["X-Worker"])}
+        self.channels.setdefault(int(request.match_info["channel"]), {})[message["id"]] = message
+        return web.json_response(message)
+
+    async def purge(self, request: web.Request) -> web.Response:
+        await self.record(request, "purge")
+        self.channels.pop(int(request.match_info["channel"]), None)
+        return web.json_response({})
+
+    async def fetch(self, request: web.Request) -> web.Response:
+        message_id = int(request.match_info["message"])
+        if (messages := self.find(message_id)) is None:
+            return web.json_response({}, status=404)
+        return web.json_response(messages[message_id])
+
+    async def edit(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await self.record(request, "edit")
+        message_id = int(request.match_info["message"])
+        if (messages := self.find(message_id)) is None:
+            return web.json_response({}, status=404)
+        messages[message_id].update(body)
+        return web.json_response(messages[message_id])
+
+    async def delete(self, request: web.Request) -> web.Response:
+        await self.record(request, "delete")
+        message_id = int(request.match_info["message"])
+        if (messages := self.find(message_id)) is None:
+            return web.json_response({}, status=404)
+        del messages[message_id]
+        return web.json_response({})
+
+    async def react(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        await self.record(request, "reaction")
+        message_id = int(request.match_info["message"])
+        if (messages := self.find(message_id)) is None:
+            return web.json_response({}, status=404)
+        messages[message_id].setdefault("reactions", []).append(body["emoji"])
+        return web.json_response({})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/channels/{channel}/messages", self.send)
+        app.router.add_post("/channels/{channel}/purge", self.purge)
+        app.router.add_get("/messages/{message}", self.fetch)
+        app.router.add_patch("/messages/{message}", self.edit)
+        app.router.add_delete("/messages/{message}", self.delete)
+        app.router.add_post("/messages/{message}/reactions", self.react)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        self.port = self._runner.addresses[0][1]
+
+    async def stop(self):
+        if self.stalled and "resumed" not in self.stalled:
+            self.resume(self.stalled["pid"])
+        await self._runner.cleanup()
+
+
+class RemoteGuild(FakeGuild):
+    """A fake guild whose channels live in a DiscordStandIn"""
+
+    def __init__(self, session: ClientSession, url: str, worker: int):
+        super().__init__()
+        self.session = session
+        self.url = url
+        self.headers = {"X-Worker": str(worker), "X-Pid": str(os.getpid())}
+
+    async def request(self, method: str, path: str, json: dict = None) -> dict:
+        self.calls[f"{method} {path.split('/')[1]}"] += 1
+        async with self.session.request(method, self.url + path, json=json, headers=self.headers) as response:
+            if response.status == 404:
+                raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Message")
+            return await response.json()
+
+    def add_channel(self, name: str, channel_id: int = None) -> "RemoteChannel":
+        channel = RemoteChannel(self, name)
+        channel.id = channel_id or channel.id
+        self.channels[channel.id] = channel
+        return channel
+
+
+class RemoteMessage(FakeMessage):
+
+    def __init__(self, channel: "RemoteChannel", stored: dict):
+        embed = discord.Embed.from_dict(stored["embed"]) if stored.get("embed") else None
+        super().__init__(channel, stored.get("content"), embed)
+        self.id = stored["id"]
+
+    async def edit(self, embed=None, **kwargs):
+        await self.guild.request("PATCH", f"/messages/{self.id}", {"embed": embed.to_dict() if embed else None})
+        if embed:
+            self.embeds = [embed]
+
+    async def delete(self, **kwargs):
+        await self.guild.request("DELETE", f"/messages/{self.id}")
+
+    async def add_reaction(self, emoji):
+        await self.guild.request("POST", f"/messages/{self.id}/reactions", {"emoji": str(emoji)})
+
+
+class RemoteChannel(FakeChannel):
+
+    async def send(self, content=None, *, embed=None, file=None, delete_after=None, **kwargs) -> RemoteMessage:
+        stored = await self.guild.request("POST", f"/channels/{self.id}/messages",
+                                          {"content": content, "embed": embed.to_dict() if embed else None})
+        return RemoteMessage(self, stored)
+
+    async def fetch_message(self, message_id: int) -> RemoteMessage:
+        return RemoteMessage(self, await self.guild.request("GET", f"/messages/{message_id}"))
+
+    async def purge(self, **kwargs):
+        await self.guild.request("POST", f"/channels/{self.id}/purge")
@@ -0,0 +1,83 @@
+"""
+A worker of the test cluster, running the real Team or MatchPlanning cog against a DiscordStandIn
+
+Run by the cluster tests as: python -m Tests.cluster_worker
+"""
+import argparse
+import asyncio
+import logging
+import tempfile
+
+from pathlib import Path
+from unittest import mock
+
+import discord
+
+from aiohttp import ClientSession
+
+import Benchmarks  # noqa: F401, sets the environment the Bot package expects
+from Benchmarks.fake_discord import FakeRole
+from Benchmarks.fake_discord import fake_bot_user
+from Bot import APIRequest
+from Bot import bot
+from Bot import bot_config
+from Bot.Cluster import ClusterClient
+from Bot.Cogs.MFC.match_planning import MatchPlanning
+from Bot.Cogs.MFC.team import Team
+from Tests.cluster_harness import RemoteChannel
+from Tests.cluster_harness import RemoteGuild
+
+
+async def ready():
+    """The bot never connects to Discord here"""
+
+
+async def run_worker(index: int, socket_path: str, discord_url: str, api_url: str, config_path: str, job: str,
+                     teams: int, board_interval: float):
+    bot_config.config_path = Path(config_path)
+    bot_config.config_dict = bot_config.load()
+    APIRequest.configure()
+    APIRequest.api_url = api_url
+    bot._connection.user = fake_bot_user()
+    bot.wait_until_ready = ready
+    bot.scheduler.ready = None
+    async with ClientSession() as session:
+        guild = RemoteGuild(session, discord_url, index)
+        guild_dict = bot_config.config_dict["MFC-Guild"]
+        ping_role_id = guild_dict["Match-Planning"]["Ping-Role"]
+        guild.roles[ping_role_id] = FakeRole(ping_role_id, "Sign Ups")
+        # The mock API's teams have the discord ids 1000 onwards
+        guild.roles.update((1000 + team, FakeRole(1000 + team, f"Team {team}")) for team in range(teams))
+        for name in ("Match-Planning", "Automated-ELO-Output"):
+            guild.add_channel(name, int(guild_dict[name]["Channel-ID"]))
+        bot.get_channel = lambda channel_id: guild.get_channel(int(channel_id))
+        cluster = ClusterClient(index, Path(socket_path), APIRequest.cache, bot_config)
+        cluster.reconnect_delay = 0.1
+        bot.join_cluster(cluster)
+        # The team board only updates channels that really are text channels
+        with mock.patch.object(discord, "TextChannel", RemoteChannel):
+            if job == "board":
+                Team.board_interval = board_interval
+                Team.board_jitter = 0
+                Team(bot)
+            else:
+                planning = MatchPlanning(bot)
+                planning.tally.tally_path = Path(tempfile.mkdtemp()) / "signups.json"
+            await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--worker", type=int, required=True)
+    parser.add_argument("--socket", required=True)
+    parser.add_argument("--discord-url", required=True)
+    parser.add_argument("--api-url", required=True)
+    parser.add_argument("--config", required=True)
+    parser.add_argument("--job", choices=("board", "planning"), required=True)
+    parser.add_argument("--teams", type=int, default=0, help="How many of the mock API's teams have a role")
+    parser.add_argument("--board-interval", type=float, default=0.5)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    # The bot's scheduler and outbox are bound to its loop, so run there rather than in a new one
+    bot.loop.run_until_complete(run_worker(args.worker, args.socket, args.discord_url, args.api_url, args.config,
+                                           args.job, args.teams, args.board_interval))
@@ -0,0 +1,16 @@
+"""
+Checks how APIRequest reads its settings from the environment
+"""
+import Benchmarks  # noqa: F401, sets the environment the Bot package expects
+from Bot import APIRequest
+
+
+def test_retry_attempts_below_one_still_attempt_once(monkeypatch):
+    attempts = APIRequest.retry.attempts
+    for configured in ("0", "-2"):
+        monkeypatch.setenv("API_RETRY_ATTEMPTS", configured)
+        try:
+            APIRequest.configure()
+            assert APIRequest.retry.attempts == 1
+        finally:
+            APIRequest.retry.attempts = attempts
@@ -0,0 +1,121 @@
+"""
+Runs the team board and match planning jobs in a cluster of worker processes and stops the leader mid-run for twice
+its lease, checking every write reaching the stand-in for Discord came from the coordinator's leader of the moment
+"""
+import asyncio
+import copy
+import sys
+import tempfile
+import time
+
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+from typing import Callable
+
+import orjson
+
+import Benchmarks  # noqa: F401, sets the environment the Bot package expects
+from Benchmarks.mock_api import MockMFCAPI
+from Bot import bot_config
+from Bot.API import ResponseCache
+from Bot.Cluster import ClusterCoordinator
+from Bot.Cluster import Supervisor
+from Tests.cluster_harness import DiscordStandIn
+
+root_path = Path(__file__).parents[1]
+
+lease = 1.0
+
+
+async def run_cluster(job: str, config_dict: dict, done: Callable[[DiscordStandIn, dict], bool], latency: float,
+                      stall_at: int, teams: int = 10, workers: int = 2,
+                      timeout: float = 30) -> tuple[DiscordStandIn, dict]:
+    """
+    Runs `workers` workers of `job` until `done` is given the stand-in and the config they share and returns True,
+    then for one more lease to catch writes made late, returns the stand-in and the final config
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        config_path = Path(directory) / "config.json"
+        config_path.write_bytes(orjson.dumps(config_dict))
+        coordinator = ClusterCoordinator(Path(directory) / "cluster.sock", ResponseCache({}, max_bytes=0), lease=lease)
+        discord = DiscordStandIn(coordinator, latency=latency, stall_at=stall_at, stall=lease * 2)
+        api = MockMFCAPI(teams=teams)
+        await api.start()
+        await discord.start()
+
+        def command(index: int) -> list[str]:
+            return [sys.executable, "-m", "Tests.cluster_worker", "--worker", str(index),
+                    "--socket", str(coordinator.socket_path), "--discord-url", discord.url, "--api-url", api.url,
+                    "--config", str(config_path), "--job", job, "--teams", str(teams)]
+
+        supervisor = Supervisor(workers, command, coordinator, env={"PYTHONPATH": str(root_path)})
+        await supervisor.start()
+        try:
+            deadline = time.monotonic() + timeout
+            while not done(discord, orjson.loads(config_path.read_bytes())):
+                assert time.monotonic() < deadline, f"The {job} job did not finish in {timeout}s"
+                await asyncio.sleep(0.1)
+            await asyncio.sleep(lease)
+        finally:
+            await discord.stop()
+            await supervisor.stop()
+            await api.stop()
+        assert supervisor.restarts == 0, "A worker exited"
+        return discord, orjson.loads(config_path.read_bytes())
+
+
+def check_failover(discord: DiscordStandIn) -> list[dict]:
+    """Checks the stalled leader stopped writing and was replaced, returns the writes of its replacement"""
+    stalled = discord.stalled
+    assert stalled and "resumed" in stalled, "The leader was never stalled"
+    not_leader = [write for write in discord.writes if not write["leader"]]
+    assert not not_leader, f"Writes were made by workers that were not the leader: {not_leader}"
+    assert not [write for write in discord.writes if write["pid"] == stalled["pid"] and
+                write["received"] > stalled["stopped"]], "The stalled leader wrote after it lost its lease"
+    replacement = [write for write in discord.writes if write["pid"] != stalled["pid"]]
+    assert replacement, "No other worker took over"
+    assert replacement[-1]["received"] - replacement[0]["received"] > lease, "The job did not outlive the lease"
+    return replacement
+
+
+def test_team_board_survives_a_stalled_leader():
+    config_dict = copy.deepcopy(bot_config.config_dict)
+    board_dict = config_dict["MFC-Guild"]["Automated-ELO-Output"]
+    board_dict["Message-IDs"] = []
+
+    def done(discord: DiscordStandIn, shared_config: dict) -> bool:
+        return bool(discord.stalled and "resumed" in discord.stalled and
+                    shared_config["MFC-Guild"]["Automated-ELO-Output"]["Message-IDs"])
+
+    discord, shared_config = asyncio.run(run_cluster("board", config_dict, done, latency=0.3, stall_at=2, teams=400))
+    replacement = check_failover(discord)
+    board = discord.channels[int(board_dict["Channel-ID"])]
+    message_ids = shared_config["MFC-Guild"]["Automated-ELO-Output"]["Message-IDs"]
+    assert len(message_ids) > 1
+    # The replacement purged the pages the stalled leader had posted, only its own board is left
+    assert list(board) == message_ids
+    assert {message["worker"] for message in board.values()} == {replacement[0]["worker"]}
+
+
+def test_match_planning_survives_a_stalled_leader():
+    config_dict = copy.deepcopy(bot_config.config_dict)
+    planning_dict = config_dict["MFC-Guild"]["Match-Planning"]
+    planning_dict.update({"Posted": False, "Timezone": "UTC", "Message-IDs": [],
+                          "Post-Day": datetime.now(tz=timezone.utc).strftime("%A")})
+
+    def done(discord: DiscordStandIn, shared_config: dict) -> bool:
+        return shared_config["MFC-Guild"]["Match-Planning"]["Posted"]
+
+    discord, shared_config = asyncio.run(run_cluster("planning", config_dict, done, latency=0.1, stall_at=3))
+    replacement = check_failover(discord)
+    days = planning_dict["Days"]
+    assert [write["route"] for write in replacement].count("send") == 2 + len(days)
+    assert [write["route"] for write in replacement].count("reaction") == sum(len(times) for times in days.values())
+    # The stalled leader's partial post is left in the channel, the sign ups are the replacement's messages
+    planning = discord.channels[int(planning_dict["Channel-ID"])]
+    message_ids = shared_config["MFC-Guild"]["Match-Planning"]["Message-IDs"]
+    assert len(message_ids) == len(days)
+    assert all(planning[message_id]["worker"] == replacement[0]["worker"] for message_id in message_ids)
+    assert [len(planning[message_id]["reactions"]) for message_id in message_ids] == \
+           [len(times) for times in days.values()]
@@ -0,0 +1,59 @@
+"""
+Checks a reloaded config is only installed once it has every key the bot reads and the reload callbacks accept it
+"""
+import asyncio
+import copy
+
+from pathlib import Path
+
+import orjson
+import pytest
+
+import Benchmarks  # noqa: F401, sets the environment the Bot package expects
+from Bot import bot_config
+from Bot.Config.config import Config
+
+
+def config_at(path: Path, config_dict: dict) -> Config:
+    path.write_bytes(orjson.dumps(config_dict))
+    config = Config(path)
+    config.config_dict  # Loaded before the file is edited, as a running bot's config is
+    return config
+
+
+def test_the_shipped_config_is_valid():
+    Config.validate(bot_config.load())
+
+
+@pytest.mark.parametrize("keys", [("MFC-Guild", "Admins"), ("MFC-Guild", "Match-Planning", "Days"),
+                                  ("MFC-Guild", "Automated-ELO-Output"), ("Embed-Color",)])
+def test_a_reload_missing_a_key_is_rejected(tmp_path: Path, keys: tuple):
+    original = copy.deepcopy(bot_config.load())
+    config = config_at(tmp_path / "config.json", original)
+    broken = copy.deepcopy(original)
+    parent = broken
+    for key in keys[:-1]:
+        parent = parent[key]
+    del parent[keys[-1]]
+    config.config_path.write_bytes(orjson.dumps(broken))
+    assert not asyncio.run(config.reload())
+    assert config.config_dict == original
+
+
+def test_a_reload_a_callback_fails_on_is_rolled_back(tmp_path: Path):
+    original = copy.deepcopy(bot_config.load())
+    config = config_at(tmp_path / "config.json", original)
+    applied = []
+
+    def callback(config_dict: dict):
+        if config_dict["MFC-Guild"]["Prefix"] == "!":
+            raise KeyError("Prefix")
+        applied.append(config_dict["MFC-Guild"]["Prefix"])
+
+    config.subscribe(callback)
+    changed = copy.deepcopy(original)
+    changed["MFC-Guild"]["Prefix"] = "!"
+    config.config_path.write_bytes(orjson.dumps(changed))
+    assert not asyncio.run(config.reload())
+    assert config.config_dict == original
+    assert applied == [original["MFC-Guild"]["Prefix"]]
@@ -0,0 +1,21 @@
+"""
+Checks default embeds built from the embed template
+"""
+from discord import Embed
+
+import Benchmarks  # noqa: F401, sets the environment the Bot package expects
+from Bot.Embeds import EmbedTemplate
+
+
+def test_a_template_embed_matches_one_built_by_hand():
+    avatar_url = "https://cdn.discordapp.com/avatars/1/avatar.png"
+    template = EmbedTemplate.build(1, {"r": 144, "g": 0, "b": 255}, name="MFC Bot", url="https://mfc.example",
+                                   avatar_url=avatar_url, footer_text="Written by Sbinalla (Price Hiller)")
+    by_hand = Embed(title="Teams", description="All teams", color=template.color)
+    by_hand.set_author(name="MFC Bot", url="https://mfc.example", icon_url=avatar_url)
+    by_hand.set_thumbnail(url=avatar_url)
+    by_hand.set_footer(text="Written by Sbinalla (Price Hiller)", icon_url=avatar_url)
+    first = template.create(title="Teams", description="All teams")
+    assert first.to_dict() == by_hand.to_dict()
+    first.set_footer(text="Changed")
+    assert template.create(title="Teams", description="All teams").to_dict() == by_hand.to_dict()
@@ -0,0 +1,114 @@
+"""
+Checks the match planning sign ups harvested from the sign up messages, through the reconcile and the dump fallback
+"""
+import asyncio
+import copy
+import tempfile
+
+from pathlib import Path
+from types import SimpleNamespace
+
+import Benchmarks  # noqa: F401, sets the environment the Bot package expects
+from Benchmarks.fake_discord import FakeGuild
+from Benchmarks.fake_discord import FakeReaction
+from Benchmarks.fake_discord import FakeRole
+from Benchmarks.fake_discord import FakeUser
+from Benchmarks.fake_discord import fake_bot_user
+from Bot import bot_config
+from Bot.Cogs.MFC.match_planning import MatchPlanning
+from Bot.Cogs.MFC.match_planning import SignupTally
+from Bot.Guilds import GuildIndex
+
+days = copy.deepcopy(bot_config.config_dict["MFC-Guild"]["Match-Planning"]["Days"])
+
+
+class PlainUser:
+    """What Discord returns as a reaction user for a member missing from the member cache, a user without roles"""
+
+    def __init__(self, user_id: int):
+        self.id = user_id
+        self.bot = False
+
+
+def planning_cog() -> MatchPlanning:
+    cog = MatchPlanning.__new__(MatchPlanning)
+    cog.bot = SimpleNamespace(guild_index=GuildIndex())
+    return cog
+
+
+def sign_up_guild(teams: int = 4, members_per_team: int = 1, cached: bool = False):
+    """
+    A guild of `teams` team roles whose members, and the bot, all react to every time of every day. Reaction users
+    are plain users unless the members are `cached`. Returns the guild, its sign up channel and the team role ids
+    """
+    guild = FakeGuild()
+    team_roles = [FakeRole(1000 + team, f"Team {team}") for team in range(teams)]
+    guild.roles.update((role.id, role) for role in team_roles)
+    members = [FakeUser(100 * (team + 1) + member, f"Player {team}.{member}", [role])
+               for team, role in enumerate(team_roles) for member in range(members_per_team)]
+    guild.members.update((member.id, member) for member in members)
+    if cached:
+        guild.cached_members.update(guild.members)
+    channel = guild.add_channel("match-planning")
+    for times in days.values():
+        channel.add_message(reactions=[
+            FakeReaction(guild, emoji, [fake_bot_user()] + [member if cached else PlainUser(member.id)
+                                                            for member in members])
+            for emoji in times.values()
+        ])
+    return guild, channel, [role.id for role in team_roles]
+
+
+def everyone_signed_up(team_role_ids: list[int]) -> dict:
+    return {day: {time: [f"Team {role_id - 1000}" for role_id in team_role_ids] for time in times}
+            for day, times in days.items()}
+
+
+def test_dump_fallback_resolves_uncached_members():
+    guild, channel, team_role_ids = sign_up_guild()
+    cog = planning_cog()
+    harvested = asyncio.run(cog.harvest_reactions(channel, list(channel.messages)))
+    react_dict, signed_up_teams = cog.tally_signups(days, harvested, set(team_role_ids))
+    assert signed_up_teams == set(team_role_ids)
+    assert {day: {time: sorted(teams) for time, teams in times.items()} for day, times in react_dict.items()} == \
+           everyone_signed_up(team_role_ids)
+
+
+def test_reconcile_resolves_uncached_members():
+    guild, channel, team_role_ids = sign_up_guild()
+    message_ids = list(channel.messages)
+    harvested = asyncio.run(planning_cog().harvest_reactions(channel, message_ids))
+    with tempfile.TemporaryDirectory() as directory:
+        tally = SignupTally(Path(directory) / "signups.json")
+        tally.begin_rebuild(message_ids, days)
+        tally.rebuild(message_ids, days, harvested, team_role_ids)
+    react_dict, signed_up_teams = tally.react_dict(guild)
+    assert signed_up_teams == set(team_role_ids)
+    assert {day: {time: sorted(teams) for time, teams in times.items()} for day, times in react_dict.items()} == \
+           everyone_signed_up(team_role_ids)
+
+
+def test_members_that_left_the_guild_are_not_signed_up():
+    guild, channel, team_role_ids = sign_up_guild()
+    guild.members.clear()
+    cog = planning_cog()
+    harvested = asyncio.run(cog.harvest_reactions(channel, list(channel.messages)))
+    react_dict, signed_up_teams = cog.tally_signups(days, harvested, set(team_role_ids))
+    assert not signed_up_teams
+
+
+def test_the_dump_fallback_matches_the_tally():
+    guild, channel, team_role_ids = sign_up_guild(members_per_team=3, cached=True)
+    message_ids = list(channel.messages)
+    cog = planning_cog()
+    harvested = asyncio.run(cog.harvest_reactions(channel, message_ids))
+    fallback = cog.tally_signups(days, harvested, set(team_role_ids))
+    with tempfile.TemporaryDirectory() as directory:
+        tally = SignupTally(Path(directory) / "signups.json")
+        tally.begin_rebuild(message_ids, days)
+        tally.rebuild(message_ids, days, harvested, team_role_ids)
+    assert fallback == tally.react_dict(guild)
+    assert fallback[0] == everyone_signed_up(team_role_ids)
+    for output_format in ("csv", "json"):
+        assert cog.render_dump(fallback[0], [], output_format).fp.read() == \
+               cog.render_dump(tally.react_dict(guild)[0], [], output_format).fp.read()
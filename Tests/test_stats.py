@@ -0,0 +1,54 @@
+"""
+Checks the match stats store counts every match once across refreshes and does not mistake a 404 for no new matches
+"""
+import asyncio
+
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+import Benchmarks  # noqa: F401, sets the environment the Bot package expects
+from Bot import APIRequest
+from Bot.Stats import MatchStatsStore
+
+
+def match(match_id: str, creation: str, kills: int = 1) -> dict:
+    player = {"player_id": "player-1", "score": 10, "kills": kills, "assists": 0, "deaths": 1}
+    return {"id": match_id, "creation": creation,
+            "sets": [{"rounds": [{"team1_players": [player], "team2_players": []}]}]}
+
+
+def stream_of(status: int, matches: list[dict]):
+    """An APIRequest.stream answering every request with `status` and `matches`"""
+
+    async def items():
+        for streamed in matches:
+            yield streamed
+
+    @asynccontextmanager
+    async def stream(endpoint: str):
+        yield SimpleNamespace(status=status, items=items)
+
+    return stream
+
+
+def test_matches_on_the_high_water_mark_are_counted_once(tmp_path: Path, monkeypatch):
+    store = MatchStatsStore(tmp_path / "match_stats.json")
+    store.ingest_batch_size = 1
+    boundary = match("match-1", "2026-10-17T12:00:00+00:00")
+    monkeypatch.setattr(APIRequest, "stream", stream_of(200, [match("match-0", "2026-10-17T11:00:00+00:00"),
+                                                              boundary, boundary]))
+    assert asyncio.run(store.refresh())
+    assert store.players["player-1"]["kills"] == 2
+    # An inclusive start_time sends the match on the mark again, with the one played since
+    monkeypatch.setattr(APIRequest, "stream", stream_of(200, [boundary, match("match-2", "2026-10-17T13:00:00+00:00")]))
+    assert asyncio.run(store.refresh())
+    assert store.players["player-1"]["kills"] == 3
+
+
+def test_a_404_is_not_read_as_no_new_matches(tmp_path: Path, monkeypatch):
+    store = MatchStatsStore(tmp_path / "match_stats.json")
+    monkeypatch.setattr(APIRequest, "stream", stream_of(404, []))
+    assert not asyncio.run(store.refresh())
+    monkeypatch.setattr(APIRequest, "stream", stream_of(200, []))
+    assert asyncio.run(store.refresh())
@@ -0,0 +1,59 @@
+"""
+Checks the ELO board only edits the embeds that changed and forgets board messages deleted by hand
+"""
+import asyncio
+
+from types import SimpleNamespace
+
+import discord
+
+import Benchmarks  # noqa: F401, sets the environment the Bot package expects
+from Benchmarks.fake_discord import FakeGuild
+from Bot import bot_config
+from Bot.Cogs.MFC.team import Team
+
+
+def board_embed(**changes) -> discord.Embed:
+    embed = discord.Embed(title="MFC Teams", description="All teams registered in MFC by ELO.")
+    embed.set_author(name=changes.get("author", "MFC Bot"), icon_url="https://cdn.discordapp.com/avatar.png")
+    embed.set_thumbnail(url=changes.get("thumbnail", "https://cdn.discordapp.com/thumbnail.png"))
+    embed.set_footer(text=changes.get("footer", "Written by Sbinalla"))
+    embed.add_field(name="Teams", value="<@&1000>")
+    return embed
+
+
+def test_every_rendered_part_of_an_embed_is_in_its_signature():
+    signature = Team.embed_signature(board_embed())
+    assert Team.embed_signature(board_embed()) == signature
+    for part in ("author", "thumbnail", "footer"):
+        assert Team.embed_signature(board_embed(**{part: "changed"})) != signature, part
+
+
+def test_a_board_message_deleted_by_hand_is_forgotten_in_the_saved_config(monkeypatch):
+    channel = FakeGuild().add_channel("elo-board")
+    message = channel.add_message(embed=board_embed())
+
+    async def edit(*args, **kwargs):
+        raise discord.NotFound(SimpleNamespace(status=404, reason="Not Found"), "Unknown Message")
+
+    async def render_team_embeds(guild):
+        return [board_embed(footer="changed")]
+
+    written = []
+
+    async def write(config_dict: dict = None):
+        written.append(list(config_dict["MFC-Guild"]["Automated-ELO-Output"]["Message-IDs"]))
+
+    board_dict = bot_config.config_dict["MFC-Guild"]["Automated-ELO-Output"]
+    monkeypatch.setitem(board_dict, "Message-IDs", [message.id])
+    monkeypatch.setattr(bot_config, "write", write)
+    team = Team.__new__(Team)
+    team.bot = SimpleNamespace(outbox=SimpleNamespace(edit=edit))
+    team.render_team_embeds = render_team_embeds
+    team.board_channel_id = channel.id
+    team.board_messages = [message]
+    team.board_signatures = [Team.embed_signature(board_embed())]
+
+    assert not asyncio.run(team.update_team_board(channel))
+    assert written == [[]]
+    assert team.board_channel_id is None